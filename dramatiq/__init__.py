@@ -18,10 +18,10 @@
 from .actor import Actor, actor
 from .broker import Broker, Consumer, MessageProxy, get_broker, set_broker
 from .composition import group, pipeline
-from .encoder import Encoder, JSONEncoder, PickleEncoder
+from .encoder import CompressingEncoder, Encoder, JSONEncoder, MsgPackEncoder, PickleEncoder
 from .errors import (
     ActorNotFound, BrokerError, ConnectionClosed, ConnectionError, ConnectionFailed, DecodeError, DramatiqError,
-    QueueJoinTimeout, QueueNotFound, RateLimitExceeded, Retry
+    EnqueueFailed, QueueJoinTimeout, QueueNotFound, RateLimitExceeded, Retry
 )
 from .generic import GenericActor
 from .logging import get_logger
@@ -40,11 +40,11 @@ __all__ = [
     "group", "pipeline",
 
     # Encoding
-    "Encoder", "JSONEncoder", "PickleEncoder",
+    "CompressingEncoder", "Encoder", "JSONEncoder", "MsgPackEncoder", "PickleEncoder",
 
     # Errors
     "DramatiqError",
-    "BrokerError", "DecodeError",
+    "BrokerError", "DecodeError", "EnqueueFailed",
     "ActorNotFound", "QueueNotFound", "QueueJoinTimeout",
     "ConnectionError", "ConnectionClosed", "ConnectionFailed",
     "RateLimitExceeded", "Retry",
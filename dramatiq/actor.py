@@ -16,10 +16,13 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 from __future__ import annotations
 
+import asyncio
+import inspect
 import re
 import time
-from typing import TYPE_CHECKING, Any, Callable, Dict, Generic, Optional, TypeVar, Union, overload
+from typing import TYPE_CHECKING, Any, Callable, Dict, Generic, Iterable, List, Optional, TypeVar, Union, overload
 
+from .asyncio import get_event_loop_thread
 from .broker import Broker, get_broker
 from .logging import get_logger
 from .message import Message
@@ -44,6 +47,8 @@ class Actor(Generic[P, R]):
     Attributes:
       logger(Logger): The actor's logger.
       fn(callable): The underlying callable.
+      is_async(bool): Whether the underlying callable is an ``async``
+        function.
       broker(Broker): The broker this actor is bound to.
       actor_name(str): The actor's name.
       queue_name(str): The actor's queue.
@@ -64,6 +69,7 @@ class Actor(Generic[P, R]):
     ) -> None:
         self.logger = get_logger(fn.__module__, actor_name)
         self.fn = fn
+        self.is_async = inspect.iscoroutinefunction(fn)
         self.broker = broker
         self.actor_name = actor_name
         self.queue_name = queue_name
@@ -161,9 +167,79 @@ class Actor(Generic[P, R]):
         message = self.message_with_options(args=args, kwargs=kwargs, **options)
         return self.broker.enqueue(message, delay=delay)
 
+    async def send_async(self, *args: P.args, **kwargs: P.kwargs) -> Message[R]:
+        """Asynchronously send a message to this actor from a
+        coroutine.  See :meth:`Broker.enqueue_async<dramatiq.Broker.enqueue_async>`.
+
+        Parameters:
+          *args: Positional arguments to send to the actor.
+          **kwargs: Keyword arguments to send to the actor.
+
+        Returns:
+          Message: The enqueued message.
+        """
+        return await self.send_with_options_async(args=args, kwargs=kwargs)
+
+    async def send_with_options_async(
+        self, *,
+        args: tuple = (),
+        kwargs: Optional[Dict[str, Any]] = None,
+        delay: Optional[int] = None,
+        **options,
+    ) -> Message[R]:
+        """Asynchronously send a message to this actor from a
+        coroutine, along with an arbitrary set of processing options
+        for the broker and middleware.
+
+        Parameters:
+          args(tuple): Positional arguments that are passed to the actor.
+          kwargs(dict): Keyword arguments that are passed to the actor.
+          delay(int): The minimum amount of time, in milliseconds, the
+            message should be delayed by.
+          **options: Arbitrary options that are passed to the
+            broker and any registered middleware.
+
+        Returns:
+          Message: The enqueued message.
+        """
+        message = self.message_with_options(args=args, kwargs=kwargs, **options)
+        return await self.broker.enqueue_async(message, delay=delay)
+
+    def send_many(
+        self,
+        args_list: Iterable[tuple],
+        *,
+        delay: Optional[int] = None,
+        **options,
+    ) -> List[Message[R]]:
+        """Asynchronously send many messages to this actor at once.
+        Brokers that support it enqueue all of the messages in bulk.
+
+        Examples:
+          >>> add.send_many([(1, 2), (3, 4)])
+          [Message(...), Message(...)]
+
+        Parameters:
+          args_list(Iterable[tuple]): The positional arguments for
+            each message.
+          delay(int): The minimum amount of time, in milliseconds, the
+            messages should be delayed by.
+          **options: Arbitrary options that are passed to the
+            broker and any registered middleware.
+
+        Returns:
+          list[Message]: The enqueued messages.
+        """
+        messages = [self.message_with_options(args=args, **options) for args in args_list]
+        return self.broker.enqueue_many(messages, delay=delay)
+
     def __call__(self, *args: P.args, **kwargs: P.kwargs) -> R:
         """Synchronously call this actor.
 
+        Async actors are run on the event loop thread started by the
+        :class:`AsyncIO<dramatiq.middleware.AsyncIO>` middleware if
+        there is one, and on a fresh event loop otherwise.
+
         Parameters:
           *args: Positional arguments to send to the actor.
           **kwargs: Keyword arguments to send to the actor.
@@ -174,6 +250,11 @@ class Actor(Generic[P, R]):
         try:
             self.logger.debug("Received args=%r kwargs=%r.", args, kwargs)
             start = time.perf_counter()
+            if self.is_async:
+                event_loop_thread = get_event_loop_thread()
+                if event_loop_thread is None:
+                    return asyncio.run(self.fn(*args, **kwargs))
+                return event_loop_thread.run_coroutine(self.fn(*args, **kwargs))
             return self.fn(*args, **kwargs)
         finally:
             delta = time.perf_counter() - start
@@ -231,7 +312,9 @@ def actor(
         message_timestamp=1497862448685)
 
     Parameters:
-      fn(callable): The function to wrap.
+      fn(callable): The function to wrap.  ``async`` functions are
+        run on the event loop thread started by the
+        :class:`AsyncIO<dramatiq.middleware.AsyncIO>` middleware.
       actor_class(type): Type created by the decorator.  Defaults to
         :class:`Actor` but can be any callable as long as it returns an
         actor and takes the same arguments as the :class:`Actor` class.
@@ -0,0 +1,183 @@
+# This file is a part of Dramatiq.
+#
+# Copyright (C) 2017,2018 CLEARTYPE SRL <bogdan@cleartype.io>
+#
+# Dramatiq is free software; you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or (at
+# your option) any later version.
+#
+# Dramatiq is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU Lesser General Public
+# License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import asyncio
+import threading
+from concurrent.futures import Future
+from typing import Any, Coroutine, Dict, Hashable, List, Optional, Tuple, Type
+
+from .logging import get_logger
+
+#: The global event loop thread instance.
+global_event_loop_thread: Optional["EventLoopThread"] = None
+
+
+def get_event_loop_thread() -> Optional["EventLoopThread"]:
+    """Get the global event loop thread.
+
+    Returns:
+      EventLoopThread: The thread or ``None`` if async actors aren't
+      being run on an event loop thread.
+    """
+    return global_event_loop_thread
+
+
+def set_event_loop_thread(event_loop_thread: Optional["EventLoopThread"]) -> None:
+    """Set the global event loop thread.
+
+    Parameters:
+      event_loop_thread(EventLoopThread): The thread to run async
+        actors on, or ``None``.
+    """
+    global global_event_loop_thread
+    global_event_loop_thread = event_loop_thread
+
+
+class EventLoopThread(threading.Thread):
+    """A thread that runs an asyncio event loop.  Workers run the
+    coroutines of async actors on it so that many of them can run
+    concurrently without each one tying up a worker thread.
+
+    Coroutines can be interrupted with an exception, similar to how
+    worker threads are interrupted by
+    :func:`raise_thread_exception<dramatiq.middleware.raise_thread_exception>`.
+    This is used to enforce time limits and shutdown notifications.
+    """
+
+    def __init__(self):
+        super().__init__(name="EventLoopThread", daemon=True)
+        self.logger = get_logger(__name__, type(self))
+        self.loop = asyncio.new_event_loop()
+
+        # These are only ever accessed from the event loop thread.
+        self.tasks: Dict[Hashable, "_InterruptibleTask"] = {}
+        self.pending_interrupts: Dict[Hashable, List[Tuple[float, Type[BaseException]]]] = {}
+
+    def run(self):
+        self.logger.debug("Running event loop...")
+        asyncio.set_event_loop(self.loop)
+        try:
+            self.loop.run_forever()
+        finally:
+            tasks = asyncio.all_tasks(self.loop)
+            for task in tasks:
+                task.cancel()
+
+            self.loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
+            self.loop.close()
+            self.logger.debug("Event loop stopped.")
+
+    def stop(self):
+        """Stop the event loop, cancelling any coroutines that are
+        still running.  Code calling this method should then join on
+        the thread.
+        """
+        self.loop.call_soon_threadsafe(self.loop.stop)
+
+    def run_coroutine(self, coroutine: Coroutine[Any, Any, Any]) -> Any:
+        """Run a coroutine on the event loop and block the current
+        thread until it's done.  If the current thread is interrupted
+        while waiting, the coroutine is cancelled.
+
+        Returns:
+          object: Whatever the coroutine returns.
+        """
+        if threading.current_thread() is self:
+            coroutine.close()
+            raise RuntimeError("run_coroutine() cannot be called from the event loop thread.")
+
+        future = asyncio.run_coroutine_threadsafe(coroutine, self.loop)
+        try:
+            return future.result()
+        except BaseException:
+            future.cancel()
+            raise
+
+    def submit(self, key: Hashable, coroutine: Coroutine[Any, Any, Any]) -> Future:
+        """Schedule a coroutine on the event loop without waiting for
+        it to finish.
+
+        Parameters:
+          key(Hashable): The key with which the coroutine can be
+            interrupted.  Only one coroutine may be running under any
+            given key at a time.
+          coroutine(Coroutine): The coroutine to run.
+
+        Returns:
+          Future: A future that completes once the coroutine is done.
+        """
+        return asyncio.run_coroutine_threadsafe(self._run(key, coroutine), self.loop)
+
+    def interrupt(self, key: Hashable, exception: Type[BaseException]) -> None:
+        """Interrupt the coroutine running under the given key by
+        raising an exception inside of it.  Has no effect if there is
+        no such coroutine.
+        """
+        self.loop.call_soon_threadsafe(self._interrupt, key, exception)
+
+    def interrupt_after(self, key: Hashable, delay: float, exception: Type[BaseException]) -> None:
+        """Interrupt the coroutine running under the given key after
+        ``delay`` seconds.  The coroutine doesn't have to have been
+        submitted yet, in which case the delay starts counting once
+        it is.
+        """
+        self.loop.call_soon_threadsafe(self._interrupt_after, key, delay, exception)
+
+    def cancel_interrupts(self, key: Hashable) -> None:
+        """Cancel the interrupts scheduled for a coroutine that was
+        never submitted.  Interrupts scheduled for coroutines that were
+        submitted are cancelled automatically once they're done.
+        """
+        self.loop.call_soon_threadsafe(self.pending_interrupts.pop, key, None)
+
+    async def _run(self, key, coroutine):
+        task = self.tasks[key] = _InterruptibleTask(asyncio.ensure_future(coroutine))
+        for delay, exception in self.pending_interrupts.pop(key, []):
+            task.timers.append(self.loop.call_later(delay, self._interrupt, key, exception))
+
+        try:
+            return await task.task
+        except asyncio.CancelledError:
+            if task.exception is not None:
+                raise task.exception() from None
+            raise
+        finally:
+            for timer in task.timers:
+                timer.cancel()
+
+            del self.tasks[key]
+
+    def _interrupt(self, key, exception):
+        task = self.tasks.get(key)
+        if task is not None and task.exception is None:
+            self.logger.warning("Raising %s in coroutine %r.", exception.__name__, key)
+            task.exception = exception
+            task.task.cancel()
+
+    def _interrupt_after(self, key, delay, exception):
+        task = self.tasks.get(key)
+        if task is None:
+            self.pending_interrupts.setdefault(key, []).append((delay, exception))
+        else:
+            task.timers.append(self.loop.call_later(delay, self._interrupt, key, exception))
+
+
+class _InterruptibleTask:
+    def __init__(self, task):
+        self.task = task
+        self.timers = []
+        self.exception = None
@@ -15,6 +15,8 @@
 # You should have received a copy of the GNU Lesser General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+import asyncio
+from functools import partial
 from typing import cast
 
 from .errors import ActorNotFound
@@ -212,6 +214,36 @@ class Broker:
         """
         raise NotImplementedError
 
+    def enqueue_many(self, messages, *, delay=None):
+        """Enqueue many messages on this broker.  The default
+        implementation enqueues each message individually, but brokers
+        may override it to enqueue messages in bulk.
+
+        Parameters:
+          messages(Iterable[Message]): The messages to enqueue.
+          delay(int): The number of milliseconds to delay the messages for.
+
+        Returns:
+          list[Message]: The enqueued messages or copies of them.
+        """
+        return [self.enqueue(message, delay=delay) for message in messages]
+
+    async def enqueue_async(self, message, *, delay=None):
+        """Enqueue a message on this broker from a coroutine.  The
+        default implementation runs :meth:`enqueue` on the event loop's
+        default executor, but brokers may override it to enqueue
+        messages without blocking any threads.
+
+        Parameters:
+          message(Message): The message to enqueue.
+          delay(int): The number of milliseconds to delay the message for.
+
+        Returns:
+          Message: Either the original message or a copy of it.
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, partial(self.enqueue, message, delay=delay))
+
     def get_actor(self, actor_name):  # pragma: no cover
         """Look up an actor by its name.
 
@@ -281,6 +313,14 @@ class Consumer:
     Consumers and their MessageProxies are *not* thread-safe.
     """
 
+    #: How long (in seconds) the last round trip this consumer made to
+    #: fetch messages from the broker took, not counting any time it
+    #: spent waiting for messages to be enqueued.  Consumers that
+    #: can't tell the two apart leave this set to None, in which case
+    #: workers keep their prefetch static even if adaptive prefetch
+    #: is turned on.
+    fetch_time = None
+
     def __iter__(self):  # pragma: no cover
         """Returns this instance as a Message iterator.
         """
@@ -312,6 +352,17 @@ class Consumer:
           messages(list[MessageProxy]): The messages to requeue.
         """
 
+    def set_prefetch(self, prefetch):
+        """Change the number of messages this consumer prefetches.
+        This is only ever called from the thread that iterates over
+        the consumer.  The default implementation sets the
+        ``prefetch`` attribute of the consumer.
+
+        Parameters:
+          prefetch(int): The new number of messages to prefetch.
+        """
+        self.prefetch = prefetch
+
     def __next__(self):  # pragma: no cover
         """Retrieve the next message off of the queue.  This method
         blocks until a message becomes available.
@@ -334,6 +385,7 @@ class MessageProxy:
 
     def __init__(self, message):
         self.failed = False
+        self.deferred = False
         self._message = message
         self._exception = None
 
@@ -345,13 +397,19 @@ class MessageProxy:
     def clear_exception(self):
         """Remove the exception from this message.
         """
-        del self._exception
+        self._exception = None
 
     def fail(self):
         """Mark this message for rejection.
         """
         self.failed = True
 
+    def defer(self):
+        """Mark this message to be held in worker memory and processed
+        again later, instead of being retried via the broker.
+        """
+        self.deferred = True
+
     def __getattr__(self, name):
         return getattr(self._message, name)
 
@@ -19,6 +19,7 @@ import logging
 import os
 import time
 import warnings
+from collections import OrderedDict, deque
 from functools import partial
 from itertools import chain
 from threading import Event, local
@@ -27,7 +28,7 @@ import pika
 
 from ..broker import Broker, Consumer, MessageProxy
 from ..common import current_millis, dq_name, xq_name
-from ..errors import ConnectionClosed, DecodeError, QueueJoinTimeout
+from ..errors import ConnectionClosed, DecodeError, EnqueueFailed, QueueJoinTimeout
 from ..logging import get_logger
 from ..message import Message, get_encoder
 
@@ -39,6 +40,11 @@ DEAD_MESSAGE_TTL = int(os.getenv("dramatiq_dead_message_ttl", 86400000 * 7))
 MAX_ENQUEUE_ATTEMPTS = 6
 MAX_DECLARE_ATTEMPTS = 2
 
+#: The TTLs, in milliseconds, of the queues that delayed messages are
+#: routed through when ``ttl_delays`` is set.  The buckets double in
+#: size from one second up to about six days.
+DEFAULT_DELAY_BUCKETS = tuple(1000 * 2 ** i for i in range(20))
+
 
 class RabbitmqBroker(Broker):
     """A broker that can be used with RabbitMQ.
@@ -69,14 +75,24 @@ class RabbitmqBroker(Broker):
 
     Parameters:
       confirm_delivery(bool): Wait for RabbitMQ to confirm that
-        messages have been committed on every call to enqueue.
-        Defaults to False.
+        messages have been committed on every call to enqueue.  Calls
+        to :meth:`.enqueue_many` wait once per batch.  Defaults to
+        False.
       url(str|list[str]): An optional connection URL.  If both a URL
         and connection parameters are provided, the URL is used.
       middleware(list[Middleware]): The set of middleware that apply
         to this broker.
       max_priority(int): Configure queues with ``x-max-priority`` to
         support queue-global priority queueing.
+      ttl_delays(bool): When True, delayed messages wait inside of
+        RabbitMQ, in a set of queues with fixed TTLs that dead-letter
+        messages back onto their original queue, instead of being held
+        in worker memory until their eta.  Only the final stretch of
+        each delay, shorter than the smallest bucket, is spent in
+        worker memory.  Defaults to False.
+      delay_buckets(list[int]): The TTLs, in milliseconds, of the
+        queues used when ``ttl_delays`` is set.  Every bucket
+        requires a queue per declared queue.
       parameters(list[dict]): A sequence of (pika) connection parameters
         to determine which Rabbit server(s) to connect to.
       **kwargs: The (pika) connection parameters to use to
@@ -85,7 +101,10 @@ class RabbitmqBroker(Broker):
     .. _ConnectionParameters: https://pika.readthedocs.io/en/0.12.0/modules/parameters.html
     """
 
-    def __init__(self, *, confirm_delivery=False, url=None, middleware=None, max_priority=None, parameters=None, **kwargs):
+    def __init__(
+            self, *, confirm_delivery=False, url=None, middleware=None, max_priority=None,
+            ttl_delays=False, delay_buckets=DEFAULT_DELAY_BUCKETS, parameters=None, **kwargs
+    ):
         super().__init__(middleware=middleware)
 
         if max_priority is not None and not (0 < max_priority <= 255):
@@ -115,6 +134,8 @@ class RabbitmqBroker(Broker):
 
         self.confirm_delivery = confirm_delivery
         self.max_priority = max_priority
+        self.ttl_delays = ttl_delays
+        self.delay_buckets = sorted(delay_buckets)
         self.connections = set()
         self.channels = set()
         self.queues = set()
@@ -140,6 +161,7 @@ class RabbitmqBroker(Broker):
     @connection.deleter
     def connection(self):
         del self.channel
+        del self._confirm_channel
         try:
             connection = self.state.connection
         except AttributeError:
@@ -182,6 +204,44 @@ class RabbitmqBroker(Broker):
             except Exception:
                 self.logger.exception("Encountered exception while closing Channel.")
 
+    @property
+    def _confirm_channel(self):
+        """The channel used to publish batches of messages in confirm
+        mode on the current thread.  Blocking channels wait for a
+        confirmation after every publish, so confirmations are tracked
+        on the underlying channel instead.
+        """
+        channel = getattr(self.state, "confirm_channel", None)
+        if channel is None:
+            channel = self.state.confirm_channel = self.connection.channel()
+            confirms = self.state.confirms = _DeliveryConfirmations()
+            confirms_enabled = Event()
+            _get_channel_impl(channel).confirm_delivery(
+                ack_nack_callback=confirms.on_confirmation,
+                callback=lambda _: confirms_enabled.set(),
+            )
+            while not confirms_enabled.is_set():
+                self.connection.process_data_events(time_limit=None)
+
+            self.channels.add(channel)
+        return channel
+
+    @_confirm_channel.deleter
+    def _confirm_channel(self):
+        try:
+            channel = self.state.confirm_channel
+        except AttributeError:
+            return
+
+        del self.state.confirm_channel
+        del self.state.confirms
+        self.channels.discard(channel)
+        if channel.is_open:
+            try:
+                channel.close()
+            except Exception:
+                self.logger.exception("Encountered exception while closing Channel.")
+
     def close(self):
         """Close all open RabbitMQ connections.
         """
@@ -217,7 +277,11 @@ class RabbitmqBroker(Broker):
           Consumer: A consumer that retrieves messages from RabbitMQ.
         """
         self.declare_queue(queue_name, ensure=True)
-        return self.consumer_class(self.parameters, queue_name, prefetch, timeout)
+        return self.consumer_class(
+            self.parameters, queue_name, prefetch, timeout,
+            delay_buckets=self.delay_buckets if self.ttl_delays else None,
+            forward=self._forward,
+        )
 
     def declare_queue(self, queue_name, *, ensure=False):
         """Declare a queue.  Has no effect if a queue with the given
@@ -253,6 +317,7 @@ class RabbitmqBroker(Broker):
                     self._declare_queue(queue_name)
                     self._declare_dq_queue(queue_name)
                     self._declare_xq_queue(queue_name)
+                    self._declare_delay_bucket_queues(queue_name)
                     self.queues_pending.discard(queue_name)
 
                 break
@@ -289,6 +354,21 @@ class RabbitmqBroker(Broker):
         arguments = self._build_queue_arguments(queue_name)
         return self.channel.queue_declare(queue=dq_name(queue_name), durable=True, arguments=arguments)
 
+    def _declare_delay_bucket_queues(self, queue_name):
+        if not self.ttl_delays:
+            return []
+
+        # Messages are expired in order inside of RabbitMQ, so every
+        # bucket needs its own queue with a static TTL.
+        return [
+            self.channel.queue_declare(queue=_delay_bucket_name(queue_name, ttl), durable=True, arguments={
+                "x-message-ttl": ttl,
+                "x-dead-letter-exchange": "",
+                "x-dead-letter-routing-key": queue_name,
+            })
+            for ttl in self.delay_buckets
+        ]
+
     def _declare_xq_queue(self, queue_name):
         return self.channel.queue_declare(queue=xq_name(queue_name), durable=True, arguments={
             # This HAS to be a static value since messages are expired
@@ -308,33 +388,14 @@ class RabbitmqBroker(Broker):
           ConnectionClosed: If the underlying channel or connection
             has been closed.
         """
-        queue_name = message.queue_name
-        self.declare_queue(queue_name, ensure=True)
-
-        if delay is not None:
-            queue_name = dq_name(queue_name)
-            message_eta = current_millis() + delay
-            message = message.copy(
-                queue_name=queue_name,
-                options={
-                    "eta": message_eta,
-                },
-            )
+        message = self._prepare_message(message, delay)
 
         attempts = 1
         while True:
             try:
-                self.logger.debug("Enqueueing message %r on queue %r.", message.message_id, queue_name)
+                self.logger.debug("Enqueueing message %r on queue %r.", message.message_id, message.queue_name)
                 self.emit_before("enqueue", message, delay)
-                self.channel.basic_publish(
-                    exchange="",
-                    routing_key=queue_name,
-                    body=message.encode(),
-                    properties=pika.BasicProperties(
-                        delivery_mode=2,
-                        priority=message.options.get("broker_priority"),
-                    ),
-                )
+                self._publish(self.channel, message)
                 self.emit_after("enqueue", message, delay)
                 return message
 
@@ -353,6 +414,165 @@ class RabbitmqBroker(Broker):
                     attempts, MAX_ENQUEUE_ATTEMPTS,
                 )
 
+    def enqueue_many(self, messages, *, delay=None):
+        """Enqueue many messages at once.  Every message is published
+        before waiting on any delivery confirmations so, when
+        ``confirm_delivery`` is set, the whole batch only waits on
+        RabbitMQ once.  Messages that are lost due to connection
+        errors are published again.
+
+        Parameters:
+          messages(Iterable[Message]): The messages to enqueue.
+          delay(int): The minimum amount of time, in milliseconds, to
+            delay the messages by.
+
+        Raises:
+          ConnectionClosed: If the underlying channel or connection
+            has been closed.
+          EnqueueFailed: If RabbitMQ rejected any of the messages.
+
+        Returns:
+          list[Message]: The enqueued messages.
+        """
+        messages = [self._prepare_message(message, delay) for message in messages]
+        for message in messages:
+            self.emit_before("enqueue", message, delay)
+
+        attempts = 1
+        pending, nacked = deque(messages), []
+        while pending:
+            try:
+                self.logger.debug("Enqueueing %d messages.", len(pending))
+                nacked.extend(self._publish_many(pending))
+
+            except (pika.exceptions.AMQPConnectionError,
+                    pika.exceptions.AMQPChannelError) as e:
+                del self.connection
+
+                attempts += 1
+                if attempts > MAX_ENQUEUE_ATTEMPTS:
+                    raise ConnectionClosed(e) from None
+
+                self.logger.debug(
+                    "Retrying enqueue of %d messages due to closed connection. [%d/%d]",
+                    len(pending), attempts, MAX_ENQUEUE_ATTEMPTS,
+                )
+
+        nacked_ids = {id(message) for message in nacked}
+        enqueued = [message for message in messages if id(message) not in nacked_ids]
+        for message in enqueued:
+            self.emit_after("enqueue", message, delay)
+
+        if nacked:
+            raise EnqueueFailed(
+                "%d out of %d messages were rejected by RabbitMQ." % (len(nacked), len(messages)),
+                enqueued, nacked,
+            )
+
+        return enqueued
+
+    def _prepare_message(self, message, delay):
+        self.declare_queue(message.queue_name, ensure=True)
+        if delay is not None:
+            message_eta = current_millis() + delay
+            message = message.copy(
+                queue_name=dq_name(message.queue_name),
+                options={
+                    "eta": message_eta,
+                },
+            )
+
+        return message
+
+    def _get_routing_key(self, message):
+        if self.ttl_delays and "eta" in message.options:
+            ttl = _find_delay_bucket(self.delay_buckets, message.options["eta"] - current_millis())
+            if ttl is not None:
+                return _delay_bucket_name(message.queue_name, ttl)
+
+        return message.queue_name
+
+    def _publish(self, channel, message):
+        channel.basic_publish(
+            exchange="",
+            routing_key=self._get_routing_key(message),
+            body=message.encode(),
+            properties=pika.BasicProperties(
+                delivery_mode=2,
+                priority=message.options.get("broker_priority"),
+            ),
+        )
+
+    def _publish_many(self, pending):
+        """Publish every message in ``pending``, removing messages
+        from it as they are published.  In confirm mode, messages are
+        only considered published once RabbitMQ confirms them.
+
+        Returns:
+          list[Message]: The messages that RabbitMQ rejected.
+        """
+        if not self.confirm_delivery:
+            channel = self.channel
+            while pending:
+                self._publish(channel, pending[0])
+                pending.popleft()
+            return []
+
+        channel = self._confirm_channel
+        confirms = self.state.confirms
+        try:
+            while pending:
+                self._publish(channel, pending[0])
+                confirms.track(pending.popleft())
+
+            while confirms.outstanding:
+                self.connection.process_data_events(time_limit=None)
+
+            nacked, confirms.nacked = confirms.nacked, []
+            return nacked
+        except BaseException:
+            # Anything that hasn't been confirmed yet has to be
+            # published again on the next attempt.
+            pending.extendleft(reversed([*confirms.nacked, *confirms.outstanding.values()]))
+            confirms.nacked = []
+            confirms.outstanding.clear()
+            raise
+
+    def _forward(self, routing_key, body, priority):
+        """Publish an encoded message on the confirm channel of the
+        current thread and wait for RabbitMQ to confirm it.  Consumers
+        use this to move delayed messages between delay buckets.
+
+        Raises:
+          ConnectionClosed: If the underlying channel or connection
+            has been closed.
+
+        Returns:
+          bool: True if RabbitMQ confirmed the message.
+        """
+        try:
+            channel = self._confirm_channel
+            confirms = self.state.confirms
+            channel.basic_publish(
+                exchange="",
+                routing_key=routing_key,
+                body=body,
+                properties=pika.BasicProperties(
+                    delivery_mode=2,
+                    priority=priority,
+                ),
+            )
+            confirms.track(body)
+            while confirms.outstanding:
+                self.connection.process_data_events(time_limit=None)
+
+            nacked, confirms.nacked = confirms.nacked, []
+            return not nacked
+        except (pika.exceptions.AMQPConnectionError,
+                pika.exceptions.AMQPChannelError) as e:
+            del self.connection
+            raise ConnectionClosed(e) from None
+
     def get_declared_queues(self):
         """Get all declared queues.
 
@@ -371,14 +591,16 @@ class RabbitmqBroker(Broker):
 
         Returns:
           tuple: A triple representing the number of messages in the
-          queue, its delayed queue and its dead letter queue.
+          queue, its delayed queue (including any delay buckets) and
+          its dead letter queue.
         """
         queue_response = self._declare_queue(queue_name)
         dq_queue_response = self._declare_dq_queue(queue_name)
         xq_queue_response = self._declare_xq_queue(queue_name)
+        bucket_queue_responses = self._declare_delay_bucket_queues(queue_name)
         return (
             queue_response.method.message_count,
-            dq_queue_response.method.message_count,
+            dq_queue_response.method.message_count + sum(r.method.message_count for r in bucket_queue_responses),
             xq_queue_response.method.message_count,
         )
 
@@ -388,7 +610,11 @@ class RabbitmqBroker(Broker):
         Parameters:
           queue_name(str): The queue to flush.
         """
-        for name in (queue_name, dq_name(queue_name), xq_name(queue_name)):
+        names = [queue_name, dq_name(queue_name), xq_name(queue_name)]
+        if self.ttl_delays:
+            names.extend(_delay_bucket_name(queue_name, ttl) for ttl in self.delay_buckets)
+
+        for name in names:
             if queue_name not in self.queues_pending:
                 self.channel.queue_purge(name)
 
@@ -448,15 +674,99 @@ def URLRabbitmqBroker(url, *, middleware=None):
     return RabbitmqBroker(url=url, middleware=middleware)
 
 
+def _find_delay_bucket(delay_buckets, delay):
+    """Find the largest delay bucket that fits inside ``delay``.
+    Returns None if none of them do.
+    """
+    for ttl in reversed(delay_buckets):
+        if ttl <= delay:
+            return ttl
+    return None
+
+
+def _delay_bucket_name(queue_name, ttl):
+    return "%s.%d" % (dq_name(queue_name), ttl)
+
+
 class _IgnoreScaryLogs(logging.Filter):
     def filter(self, record):
         return "Broken pipe" not in record.getMessage()
 
 
+#: The range of pika versions whose blocking channels are known to
+#: wrap an asynchronous channel that supports confirmation callbacks.
+_PIKA_CONFIRMS_VERSIONS = ((1, 0), (2, 0))
+
+
+def _get_channel_impl(channel):
+    """Get the asynchronous channel underlying a blocking channel.
+
+    Pika's blocking channels wait for a confirmation after every
+    publish and don't expose a way to receive confirmations through a
+    callback, so batches are confirmed on the underlying channel.
+    That channel isn't part of pika's public API, so make sure it's
+    what we expect before using it.
+
+    Raises:
+      RuntimeError: If the installed version of pika isn't supported.
+    """
+    version = tuple(int(part) for part in pika.__version__.split(".")[:2] if part.isdigit())
+    min_version, max_version = _PIKA_CONFIRMS_VERSIONS
+    impl = getattr(channel, "_impl", None)
+    if not min_version <= version < max_version or not isinstance(impl, pika.channel.Channel):
+        raise RuntimeError(
+            "Publishing batches with confirm_delivery requires pika>=%d.%d,<%d.%d, but pika %s is installed." % (
+                *min_version, *max_version, pika.__version__,
+            )
+        )
+
+    return impl
+
+
+class _DeliveryConfirmations:
+    """Keeps track of the messages published on a channel in confirm
+    mode that RabbitMQ hasn't confirmed yet.
+    """
+
+    def __init__(self):
+        self.delivery_tag = 0
+        self.outstanding = OrderedDict()
+        self.nacked = []
+
+    def track(self, message):
+        self.delivery_tag += 1
+        self.outstanding[self.delivery_tag] = message
+
+    def on_confirmation(self, frame):
+        method = frame.method
+        if method.multiple:
+            tags = []
+            for tag in self.outstanding:
+                if tag > method.delivery_tag:
+                    break
+                tags.append(tag)
+        else:
+            tags = [method.delivery_tag]
+
+        for tag in tags:
+            message = self.outstanding.pop(tag, None)
+            if message is not None and isinstance(method, pika.spec.Basic.Nack):
+                self.nacked.append(message)
+
+
 class _RabbitmqConsumer(Consumer):
-    def __init__(self, parameters, queue_name, prefetch, timeout):
+    """Consumes messages that RabbitMQ pushes over a channel.
+
+    Since messages are pushed as they're enqueued, there's no round
+    trip to time and ``fetch_time`` is never set, so adaptive
+    prefetch has no effect on these consumers.
+    """
+
+    def __init__(self, parameters, queue_name, prefetch, timeout, *, delay_buckets=None, forward=None):
         try:
             self.logger = get_logger(__name__, type(self))
+            self.delay_buckets = delay_buckets
+            self.forward = forward
             self.connection = pika.BlockingConnection(parameters=parameters)
             self.channel = self.connection.channel()
             self.channel.basic_qos(prefetch_count=prefetch)
@@ -524,6 +834,25 @@ class _RabbitmqConsumer(Consumer):
             self._nack(method.delivery_tag)
             return None
 
+        # Delayed messages come back from their delay bucket once it
+        # expires.  If they still have a long way to go, they get sent
+        # off to the next bucket rather than held in memory.  They're
+        # only acked once RabbitMQ confirms they've been forwarded;
+        # otherwise they're held in memory until their eta.
+        if self.delay_buckets and self.forward and "eta" in message.options:
+            ttl = _find_delay_bucket(self.delay_buckets, message.options["eta"] - current_millis())
+            if ttl is not None:
+                routing_key = _delay_bucket_name(message.queue_name, ttl)
+                if self.forward(routing_key, body, properties.priority):
+                    try:
+                        self.channel.basic_ack(method.delivery_tag)
+                    except (pika.exceptions.AMQPConnectionError,
+                            pika.exceptions.AMQPChannelError) as e:
+                        raise ConnectionClosed(e) from None
+                    return None
+
+                self.logger.warning("RabbitMQ rejected message %r when forwarding it to %r.", message.message_id, routing_key)
+
         rmq_message = _RabbitmqMessage(
             method.redelivered,
             method.delivery_tag,
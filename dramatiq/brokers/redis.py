@@ -15,28 +15,38 @@
 # You should have received a copy of the GNU Lesser General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+import asyncio
 import glob
-import random
+import re
 import time
 import warnings
+from collections import defaultdict
+from functools import partial
 from os import path
-from threading import Lock
+from threading import Event, Lock, Thread
 from uuid import uuid4
+from weakref import WeakKeyDictionary
 
 import redis
 
+try:
+    import redis.asyncio as aioredis
+except ImportError:  # pragma: no cover
+    aioredis = None
+
 from ..broker import Broker, Consumer, MessageProxy
-from ..common import compute_backoff, current_millis, dq_name, getenv_int
+from ..common import compute_backoff, current_millis, dq_name, getenv_int, q_name
 from ..errors import ConnectionClosed, QueueJoinTimeout
 from ..logging import get_logger
 from ..message import Message
 
-MAINTENANCE_SCALE = 1000000
-MAINTENANCE_COMMAND_BLACKLIST = {"ack", "nack"}
+#: The interval in milliseconds at which consumer processes send
+#: heartbeats.
+DEFAULT_HEARTBEAT_INTERVAL = 5000
 
-#: How many commands out of a million should trigger queue
+#: The interval in milliseconds at which consumer processes run queue
 #: maintenance.
-DEFAULT_MAINTENANCE_CHANCE = 1000
+DEFAULT_MAINTENANCE_INTERVAL = 10000
 
 #: The amount of time in milliseconds that dead-lettered messages are
 #: kept in Redis for.
@@ -46,6 +56,14 @@ DEFAULT_DEAD_MESSAGE_TTL = 86400000 * 7
 #: heartbeat for a worker to be considered offline.
 DEFAULT_HEARTBEAT_TIMEOUT = 60000
 
+#: The max number of acks each consumer buffers before sending them
+#: to Redis in a single batch.
+DEFAULT_ACK_BATCH_SIZE = 100
+
+#: The max amount of time in milliseconds that consumers hold on to
+#: buffered acks for.
+DEFAULT_ACK_INTERVAL = 5
+
 #: A hint for the max lua stack size. The broker discovers this value
 #: the first time it's run, but it may be overwritten using this var.
 DEFAULT_LUA_MAX_STACK = getenv_int("dramatiq_lua_max_stack")
@@ -71,14 +89,31 @@ class RedisBroker(Broker):
       url(str): An optional connection URL.  If both a URL and
         connection parameters are provided, the URL is used.
       middleware(list[Middleware])
-      maintenance_chance(int): How many commands out of a million
-        should trigger queue maintenance.
+      maintenance_interval(int): The interval (in ms) at which
+        processes that consume messages run queue maintenance.
+        Maintenance requeues messages belonging to dead workers and
+        deletes expired dead-lettered messages.
       namespace(str): The str with which to prefix all Redis keys.
       heartbeat_timeout(int): The amount of time (in ms) that has to
         pass without a heartbeat for a broker process to be considered
         offline.
+      heartbeat_interval(int): The interval (in ms) at which
+        processes that consume messages send heartbeats.  Must be
+        shorter than ``heartbeat_timeout``.
       dead_message_ttl(int): The amount of time (in ms) that
         dead-lettered messages are kept in Redis for.
+      ack_batch_size(int): The max number of acks each consumer
+        buffers before sending them to Redis at once.  Set this to 1
+        to send every ack as soon as its message is processed.
+      ack_interval(int): The max amount of time (in ms) that
+        consumers hold on to buffered acks for.
+      blocking_fetch(bool): When True, idle consumers block on Redis
+        until new messages are enqueued instead of polling for them.
+        This requires Redis 6.0 or later and the ``socket_timeout``
+        connection parameter, if set, must be longer than the worker
+        timeout.  Producers must be configured the same way as the
+        workers in order to wake them up.
+      maintenance_chance(int): Deprecated.  Does nothing.
       requeue_deadline(int): Deprecated.  Does nothing.
       requeue_interval(int): Deprecated.  Does nothing.
       client(redis.StrictRedis): A redis client to use.
@@ -91,9 +126,14 @@ class RedisBroker(Broker):
     def __init__(
             self, *,
             url=None, middleware=None, namespace="dramatiq",
-            maintenance_chance=DEFAULT_MAINTENANCE_CHANCE,
+            maintenance_interval=DEFAULT_MAINTENANCE_INTERVAL,
             heartbeat_timeout=DEFAULT_HEARTBEAT_TIMEOUT,
+            heartbeat_interval=DEFAULT_HEARTBEAT_INTERVAL,
             dead_message_ttl=DEFAULT_DEAD_MESSAGE_TTL,
+            ack_batch_size=DEFAULT_ACK_BATCH_SIZE,
+            ack_interval=DEFAULT_ACK_INTERVAL,
+            blocking_fetch=False,
+            maintenance_chance=None,
             requeue_deadline=None,
             requeue_interval=None,
             client=None,
@@ -108,16 +148,36 @@ class RedisBroker(Broker):
             message = "requeue_{deadline,interval} have been deprecated and no longer do anything"
             warnings.warn(message, DeprecationWarning, stacklevel=2)
 
+        if maintenance_chance is not None:
+            message = "maintenance_chance has been deprecated in favor of maintenance_interval"
+            warnings.warn(message, DeprecationWarning, stacklevel=2)
+
         self.broker_id = str(uuid4())
         self.namespace = namespace
-        self.maintenance_chance = maintenance_chance
+        self.maintenance_interval = maintenance_interval
         self.heartbeat_timeout = heartbeat_timeout
+        self.heartbeat_interval = heartbeat_interval
         self.dead_message_ttl = dead_message_ttl
+        self.ack_batch_size = ack_batch_size
+        self.ack_interval = ack_interval
+        self.blocking_fetch = blocking_fetch
         self.queues = set()
         # TODO: Replace usages of StrictRedis (redis-py 2.x) with Redis in Dramatiq 2.0.
         self.client = client or redis.StrictRedis(**parameters)
         self.scripts = {name: self.client.register_script(script) for name, script in _scripts.items()}
 
+        # asyncio clients are bound to the event loop they're used on
+        # so enqueue_async keeps a client and a set of scripts per
+        # event loop.
+        self.async_clients = _PerLoop(partial(_make_async_client, self.client), _close_async_client)
+        self.async_scripts = WeakKeyDictionary()
+
+        # Only processes that consume messages send heartbeats and run
+        # maintenance so these threads are started along with the
+        # first consumer.
+        self.background_threads = []
+        self.background_threads_mutex = Lock()
+
     @property
     def consumer_class(self):
         return _RedisConsumer
@@ -130,11 +190,44 @@ class RedisBroker(Broker):
           prefetch(int): The number of messages to prefetch.
           timeout(int): The idle timeout in milliseconds.
 
+        Raises:
+          ConnectionClosed: If the first heartbeat could not be sent.
+
         Returns:
           Consumer: A consumer that retrieves messages from Redis.
         """
+        with self.background_threads_mutex:
+            if not self.background_threads:
+                # The first heartbeat has to be sent before any
+                # messages are fetched, otherwise they would never get
+                # requeued if this process died.
+                try:
+                    self.heartbeat()
+                except redis.ConnectionError as e:
+                    raise ConnectionClosed(e) from None
+
+                self.background_threads = [
+                    _RedisTimerThread("RedisHeartbeatThread", self.heartbeat_interval, self.heartbeat),
+                    _RedisTimerThread("RedisMaintenanceThread", self.maintenance_interval, self.maintain),
+                ]
+                for thread in self.background_threads:
+                    thread.start()
+
         return self.consumer_class(self, queue_name, prefetch, timeout)
 
+    def close(self):
+        """Stop sending heartbeats and running queue maintenance and
+        close any asyncio clients.
+        """
+        with self.background_threads_mutex:
+            for thread in self.background_threads:
+                thread.stop()
+                thread.join()
+
+            self.background_threads = []
+
+        self.async_clients.close()
+
     def declare_queue(self, queue_name):
         """Declare a queue.  Has no effect if a queue with the given
         name has already been declared.
@@ -162,8 +255,92 @@ class RedisBroker(Broker):
         Raises:
           ValueError: If ``delay`` is longer than 7 days.
         """
+        message = self._prepare_message(message, delay)
         queue_name = message.queue_name
 
+        self.logger.debug("Enqueueing message %r on queue %r.", message.message_id, queue_name)
+        self.emit_before("enqueue", message, delay)
+        if delay is None:
+            self.do_enqueue(queue_name, message.options["redis_message_id"], message.encode())
+        else:
+            self.do_schedule(q_name(queue_name), *self._schedule_args(message))
+        self.emit_after("enqueue", message, delay)
+        return message
+
+    async def enqueue_async(self, message, *, delay=None):
+        """Enqueue a message from a coroutine without blocking the
+        event loop.  Messages are sent to Redis using an asyncio client
+        connected to the same server as the broker's client.  Each
+        event loop gets its own client and connection pool.  This
+        requires redis-py 4.2 or later, otherwise messages are
+        enqueued on the event loop's default executor.
+
+        Parameters:
+          message(Message): The message to enqueue.
+          delay(int): The minimum amount of time, in milliseconds, to
+            delay the message by.  Must be less than 7 days.
+
+        Raises:
+          ValueError: If ``delay`` is longer than 7 days.
+        """
+        if aioredis is None:  # pragma: no cover
+            return await super().enqueue_async(message, delay=delay)
+
+        message = self._prepare_message(message, delay)
+        queue_name = message.queue_name
+
+        self.logger.debug("Enqueueing message %r on queue %r.", message.message_id, queue_name)
+        self.emit_before("enqueue", message, delay)
+        if delay is None:
+            await self._dispatch_async("enqueue", queue_name, message.options["redis_message_id"], message.encode())
+        else:
+            await self._dispatch_async("schedule", q_name(queue_name), *self._schedule_args(message))
+        self.emit_after("enqueue", message, delay)
+        return message
+
+    def enqueue_many(self, messages, *, delay=None):
+        """Enqueue many messages at once.  Messages are grouped by
+        queue and each group is pushed to Redis in as few script calls
+        as the max Lua stack size allows.
+
+        Parameters:
+          messages(Iterable[Message]): The messages to enqueue.
+          delay(int): The minimum amount of time, in milliseconds, to
+            delay the messages by.  Must be less than 7 days.
+
+        Returns:
+          list[Message]: The enqueued messages.
+        """
+        messages = [self._prepare_message(message, delay) for message in messages]
+        messages_by_queue = defaultdict(list)
+        for message in messages:
+            self.emit_before("enqueue", message, delay)
+            messages_by_queue[message.queue_name].append(message)
+
+        # Each message takes up two slots on the Lua stack when the
+        # ids and the data get unpacked into HSET.
+        chunk_size = max(self._max_unpack_size() // 2, 1)
+        for queue_name, queue_messages in messages_by_queue.items():
+            self.logger.debug("Enqueueing %d messages on queue %r.", len(queue_messages), queue_name)
+            for i in range(0, len(queue_messages), chunk_size):
+                args = []
+                for message in queue_messages[i:i + chunk_size]:
+                    if delay is None:
+                        args.append(message.options["redis_message_id"])
+                        args.append(message.encode())
+                    else:
+                        args.extend(self._schedule_args(message))
+
+                if delay is None:
+                    self.do_enqueue_many(queue_name, *args)
+                else:
+                    self.do_schedule(q_name(queue_name), *args)
+
+        for message in messages:
+            self.emit_after("enqueue", message, delay)
+        return messages
+
+    def _prepare_message(self, message, delay):
         # Each enqueued message must have a unique id in Redis so
         # using the Message's id isn't safe because messages may be
         # retried.
@@ -172,21 +349,24 @@ class RedisBroker(Broker):
         })
 
         if delay is not None:
-            queue_name = dq_name(queue_name)
             message_eta = current_millis() + delay
             message = message.copy(
-                queue_name=queue_name,
+                queue_name=dq_name(message.queue_name),
                 options={
                     "eta": message_eta,
                 },
             )
 
-        self.logger.debug("Enqueueing message %r on queue %r.", message.message_id, queue_name)
-        self.emit_before("enqueue", message, delay)
-        self.do_enqueue(queue_name, message.options["redis_message_id"], message.encode())
-        self.emit_after("enqueue", message, delay)
         return message
 
+    def _schedule_args(self, message):
+        # Delayed messages are moved onto their queue by Redis once
+        # they're due so they're stored exactly like they would've
+        # been if they were enqueued at that time.
+        scheduled_message = message.copy(queue_name=q_name(message.queue_name))
+        del scheduled_message.options["eta"]
+        return message.options["redis_message_id"], message.options["eta"], scheduled_message.encode()
+
     def get_declared_queues(self):
         """Get all declared queues.
 
@@ -238,11 +418,64 @@ class RedisBroker(Broker):
 
             time.sleep(interval / 1000)
 
-    def _should_do_maintenance(self, command):
-        return int(
-            command not in MAINTENANCE_COMMAND_BLACKLIST and
-            random.randint(1, MAINTENANCE_SCALE) <= self.maintenance_chance
-        )
+    def heartbeat(self):
+        """Let other processes know that this one is alive.  This is
+        called periodically by a background thread in every process
+        that consumes messages.
+        """
+        args = [current_millis(), self.broker_id]
+        self.scripts["heartbeat"](args=args, keys=[self.namespace])
+
+    def maintain(self):
+        """Requeue any unacked messages belonging to dead workers and
+        delete any expired messages from the dead-letter queues of all
+        declared queues.  This is called periodically by a background
+        thread in every process that consumes messages.
+        """
+        timestamp = current_millis()
+        self._index_dead_workers(timestamp)
+        args = [
+            timestamp,
+            self.broker_id,
+            self.heartbeat_timeout,
+            self.dead_message_ttl,
+            self._max_unpack_size(),
+            int(self.blocking_fetch),
+            *self.get_declared_queues(),
+        ]
+        self.scripts["maintenance"](args=args, keys=[self.namespace])
+
+    def _index_dead_workers(self, timestamp):
+        # Workers that predate the __ack_queues__ index don't register
+        # themselves in __indexed_workers__.  Once they die, their ack
+        # sets are looked up with SCAN and added to the index so that
+        # maintenance can requeue their messages.
+        heartbeats = "%s:__heartbeats__" % self.namespace
+        indexed_workers = "%s:__indexed_workers__" % self.namespace
+        dead_workers = self.client.zrangebyscore(heartbeats, 0, timestamp - self.heartbeat_timeout)
+        if not dead_workers:
+            return
+
+        with self.client.pipeline(transaction=False) as pipe:
+            for dead_worker in dead_workers:
+                pipe.sismember(indexed_workers, dead_worker)
+            indexed = pipe.execute()
+
+        for dead_worker, is_indexed in zip(dead_workers, indexed):
+            if is_indexed:
+                continue
+
+            dead_worker = dead_worker.decode("utf-8")
+            acks_prefix = "%s:__acks__.%s." % (self.namespace, dead_worker)
+            queue_names = {
+                key.decode("utf-8")[len(acks_prefix):]
+                for key in self.client.scan_iter(match=_escape_pattern(acks_prefix) + "*")
+            }
+            with self.client.pipeline() as pipe:
+                if queue_names:
+                    pipe.sadd("%s:__ack_queues__.%s" % (self.namespace, dead_worker), *queue_names)
+                pipe.sadd(indexed_workers, dead_worker)
+                pipe.execute()
 
     _max_unpack_size_val = None
     _max_unpack_size_mut = Lock()
@@ -272,15 +505,39 @@ class RedisBroker(Broker):
                 timestamp,
                 queue_name,
                 self.broker_id,
-                self.heartbeat_timeout,
-                self.dead_message_ttl,
-                self._should_do_maintenance(command),
                 self._max_unpack_size(),
+                int(self.blocking_fetch),
                 *args,
             ]
             return dispatch(args=args, keys=keys)
         return do_dispatch
 
+    async def _dispatch_async(self, command, queue_name, *args):
+        client = await self.async_clients.get()
+        scripts = self.async_scripts.get(client)
+        if scripts is None:
+            scripts = self.async_scripts[client] = {
+                name: client.register_script(script) for name, script in _scripts.items()
+            }
+
+        cls = type(self)
+        if cls._max_unpack_size_val is None:
+            max_stack = DEFAULT_LUA_MAX_STACK or await scripts["maxstack"]()
+            with cls._max_unpack_size_mut:
+                if cls._max_unpack_size_val is None:
+                    cls._max_unpack_size_val = max_stack // 2
+
+        args = [
+            command,
+            current_millis(),
+            queue_name,
+            self.broker_id,
+            cls._max_unpack_size_val,
+            int(self.blocking_fetch),
+            *args,
+        ]
+        return await scripts["dispatch"](args=args, keys=[self.namespace])
+
     def __getattr__(self, name):
         if not name.startswith("do_"):
             raise AttributeError("attribute %s does not exist" % name)
@@ -289,6 +546,86 @@ class RedisBroker(Broker):
         return self._dispatch(command)
 
 
+def _make_async_client(client):
+    """Build an asyncio client that connects to the same server, and
+    using the same parameters, as a regular Redis client.
+    """
+    pool = client.connection_pool
+    connection_class = getattr(aioredis.connection, pool.connection_class.__name__, aioredis.Connection)
+    # Retry policies and connect callbacks are specific to the
+    # synchronous client so the asyncio client uses its defaults.
+    connection_kwargs = {
+        name: value for name, value in pool.connection_kwargs.items()
+        if name not in ("retry", "redis_connect_func")
+    }
+    return aioredis.Redis(connection_pool=aioredis.ConnectionPool(
+        connection_class=connection_class,
+        max_connections=pool.max_connections,
+        **connection_kwargs,
+    ))
+
+
+async def _close_async_client(client):
+    await client.close(close_connection_pool=True)
+
+
+class _PerLoop:
+    """Hands out one resource per event loop, for resources that are
+    bound to the loop they're used on, like asyncio clients.  Each
+    resource is closed when its loop shuts down its async generators,
+    which :func:`asyncio.run` does right before closing the loop, or
+    when :meth:`close` is called.
+
+    Parameters:
+      create(callable): Creates a new resource.
+      close(callable): Closes a resource.  Must return an awaitable.
+    """
+
+    def __init__(self, create, close):
+        self.create = create
+        self.close_resource = close
+        self.resources = WeakKeyDictionary()
+
+    async def get(self):
+        loop = asyncio.get_running_loop()
+        entry = self.resources.get(loop)
+        if entry is None:
+            resource = self.create()
+            closer = self._close_on_shutdown(loop, resource)
+            entry = self.resources[loop] = resource, closer
+
+            # Starting the generator registers it with the loop so
+            # that it gets closed along with the loop.
+            await closer.asend(None)
+
+        return entry[0]
+
+    def close(self):
+        for loop, (_, closer) in list(self.resources.items()):
+            if loop.is_running():
+                asyncio.run_coroutine_threadsafe(_aclose(closer), loop)
+            elif not loop.is_closed():
+                loop.run_until_complete(_aclose(closer))
+
+        self.resources.clear()
+
+    async def _close_on_shutdown(self, loop, resource):
+        try:
+            yield
+        finally:
+            # Resources usually hold on to their loop so they have to
+            # be dropped explicitly for the loop to be collected.
+            entry = self.resources.get(loop)
+            if entry is not None and entry[0] is resource:
+                del self.resources[loop]
+
+            await self.close_resource(resource)
+
+
+async def _aclose(closer):
+    await closer.aclose()
+
+
 class _RedisConsumer(Consumer):
     def __init__(self, broker, queue_name, prefetch, timeout):
         self.logger = get_logger(__name__, type(self))
@@ -300,21 +637,54 @@ class _RedisConsumer(Consumer):
         self.message_cache = []
         self.queued_message_ids = set()
         self.misses = 0
+        self.notify_key = "%s:%s.notify" % (broker.namespace, queue_name)
+
+        # Acks are buffered and sent to Redis in batches, either by
+        # whichever thread fills up the buffer or by the consumer
+        # thread once the ack interval elapses.
+        self.acks_mutex = Lock()
+        self.pending_acks = set()
+        self.pending_acks_deadline = 0
 
     @property
     def outstanding_message_count(self):
         return len(self.queued_message_ids) + len(self.message_cache)
 
     def ack(self, message):
-        try:
+        with self.acks_mutex:
+            if not self.pending_acks:
+                self.pending_acks_deadline = time.monotonic() + self.broker.ack_interval / 1000
+
             # The current queue might be different from message.queue_name
             # if the message has been delayed so we want to ack on the
             # current queue.
-            self.broker.do_ack(self.queue_name, message.options["redis_message_id"])
+            self.pending_acks.add(message.options["redis_message_id"])
+            self.queued_message_ids.discard(message.message_id)
+            should_flush = len(self.pending_acks) >= self.broker.ack_batch_size or \
+                time.monotonic() >= self.pending_acks_deadline
+
+        if should_flush:
+            self.flush_acks()
+
+    def flush_acks(self):
+        """Send all the buffered acks to Redis.
+
+        Raises:
+          ConnectionClosed: If the acks could not be sent.  They are
+            kept in the buffer so that they may be sent later.
+        """
+        with self.acks_mutex:
+            message_ids, self.pending_acks = self.pending_acks, set()
+
+        if not message_ids:
+            return
+
+        try:
+            self.broker.do_ack(self.queue_name, *message_ids)
         except redis.ConnectionError as e:
+            with self.acks_mutex:
+                self.pending_acks |= message_ids
             raise ConnectionClosed(e) from None
-        finally:
-            self.queued_message_ids.discard(message.message_id)
 
     def nack(self, message):
         try:
@@ -326,6 +696,8 @@ class _RedisConsumer(Consumer):
             self.queued_message_ids.discard(message.message_id)
 
     def requeue(self, messages):
+        self.flush_acks()
+
         message_ids = [message.options["redis_message_id"] for message in messages]
         if not message_ids:
             return
@@ -333,9 +705,18 @@ class _RedisConsumer(Consumer):
         self.logger.debug("Re-enqueueing %r on queue %r.", message_ids, self.queue_name)
         self.broker.do_requeue(self.queue_name, *message_ids)
 
+    def close(self):
+        try:
+            self.flush_acks()
+        except ConnectionClosed:
+            self.logger.warning("Failed to flush acks on queue %r.", self.queue_name, exc_info=True)
+
     def __next__(self):
         try:
             while True:
+                if self.pending_acks and time.monotonic() >= self.pending_acks_deadline:
+                    self.flush_acks()
+
                 try:
                     # This is a micro-optimization so we try the fast
                     # path first.  We assume there are messages in the
@@ -355,15 +736,30 @@ class _RedisConsumer(Consumer):
                     self.queued_message_ids.add(message.message_id)
                     return MessageProxy(message)
                 except IndexError:
+                    # We're about to hit the network anyway so this is
+                    # a good time to send any buffered acks.
+                    self.flush_acks()
+
                     # If there are fewer messages currently being
                     # processed than we're allowed to prefetch,
                     # prefetch up to that number of messages.
                     messages = []
                     if self.outstanding_message_count < self.prefetch:
+                        fetch_start = time.monotonic()
                         self.message_cache = messages = self.broker.do_fetch(
                             self.queue_name,
                             self.prefetch - self.outstanding_message_count,
                         )
+                        if messages:
+                            self.fetch_time = time.monotonic() - fetch_start
+
+                        # If the queue is empty, we block until messages
+                        # get enqueued, up to the idle timeout.  This is
+                        # only safe to do right after a fetch, otherwise
+                        # we'd steal notifications from other consumers.
+                        if not messages and self.broker.blocking_fetch:
+                            self.broker.client.blpop([self.notify_key], self.timeout / 1000)
+                            return None
 
                     # Because we didn't get any messages, we should
                     # progressively long poll up to the idle timeout.
@@ -375,9 +771,37 @@ class _RedisConsumer(Consumer):
             raise ConnectionClosed(e) from None
 
 
+class _RedisTimerThread(Thread):
+    def __init__(self, name, interval, fn):
+        super().__init__(name=name, daemon=True)
+        self.logger = get_logger(__name__, name)
+        self.interval = interval
+        self.fn = fn
+        self.stopped = Event()
+
+    def run(self):
+        while not self.stopped.wait(self.interval / 1000):
+            try:
+                self.fn()
+            except Exception:
+                self.logger.warning("Failed to run %s.", self.fn.__name__, exc_info=True)
+
+    def stop(self):
+        self.stopped.set()
+
+
+def _escape_pattern(s):
+    return re.sub(r"([*?\[\]\\])", r"\\\1", s)
+
+
 _scripts = {}
 _scripts_path = path.join(path.abspath(path.dirname(__file__)), "redis")
+_scripts_lib = b""
+for filename in sorted(glob.glob(path.join(_scripts_path, "lib", "*.lua"))):
+    with open(filename, "rb") as f:
+        _scripts_lib += f.read() + b"\n"
+
 for filename in glob.glob(path.join(_scripts_path, "*.lua")):
     script_name, _ = path.splitext(path.basename(filename))
     with open(filename, "rb") as f:
-        _scripts[script_name] = f.read()
+        _scripts[script_name] = _scripts_lib + f.read()
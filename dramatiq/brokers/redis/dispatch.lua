@@ -17,7 +17,7 @@
 
 -- luacheck: globals ARGV KEYS redis unpack
 -- dispatch(
---   args=[command, timestamp, queue_name, worker_id, heartbeat_timeout, dead_message_ttl, do_maintenance, max_unpack_size, ...],
+--   args=[command, timestamp, queue_name, worker_id, max_unpack_size, do_notify, ...],
 --   keys=[namespace]
 -- )
 
@@ -25,9 +25,21 @@
 --   A set of message ids representing fetched-but-not-yet-acked
 --   messages belonging to that (worker, queue) pair.
 --
+-- $namespace:__ack_queues__.$worker_id
+--   A set of the names of the queues that a worker has fetched
+--   messages from.  Maintenance uses this to find the ack sets of
+--   dead workers.
+--
 -- $namespace:__heartbeats__
 --   A sorted set containing unique worker ids sorted by when their
---   last heartbeat was received.
+--   last heartbeat was received.  Workers send heartbeats
+--   periodically via heartbeat.lua.
+--
+-- $namespace:__indexed_workers__
+--   A set of the ids of the workers that keep an __ack_queues__
+--   index.  Workers that predate the index aren't in this set, so
+--   the broker adds their ack sets to the index with SCAN once they
+--   die, before it runs maintenance.
 --
 -- $namespace:$queue_name
 --   A list of message ids.
@@ -35,6 +47,15 @@
 -- $namespace:$queue_name.msgs
 --   A hash of message ids -> message data.
 --
+-- $namespace:$queue_name.DQ.etas
+--   A sorted set containing the ids of delayed messages that haven't
+--   been moved onto $namespace:$queue_name yet, sorted by their eta.
+--   The data of these messages is stored in $namespace:$queue_name.msgs.
+--
+-- $namespace:$queue_name.notify
+--   A capped list of notifications that consumers blocking on the
+--   queue pop off whenever messages become available.
+--
 -- $namespace:$queue_name.XQ
 --   A sorted set containing all the dead-lettered message ids
 --   belonging to a queue, sorted by when they were dead lettered.
@@ -48,14 +69,11 @@ local command = ARGV[1]
 local timestamp = ARGV[2]
 local queue_name = ARGV[3]
 local worker_id = ARGV[4]
-local heartbeat_timeout = ARGV[5]
-local dead_message_ttl = ARGV[6]
-local do_maintenance = ARGV[7]
-local max_unpack_size = ARGV[8]
+local max_unpack_size = ARGV[5]
+local do_notify = ARGV[6]
 
 local acks = namespace .. ":__acks__." .. worker_id
-local heartbeats = namespace .. ":__heartbeats__"
-redis.call("zadd", heartbeats, timestamp, worker_id)
+local ack_queues = namespace .. ":__ack_queues__." .. worker_id
 
 -- This is used to ensure that we never have a DLQ like default.DQ.XQ
 -- since that wouldn't make much sense.
@@ -67,88 +85,45 @@ end
 local queue_acks = acks .. "." .. queue_name
 local queue_full_name = namespace .. ":" .. queue_name
 local queue_messages = queue_full_name .. ".msgs"
+local queue_notify = queue_full_name .. ".notify"
+local queue_etas = namespace .. ":" .. queue_canonical_name .. ".DQ.etas"
 local xqueue_full_name = namespace .. ":" .. queue_canonical_name .. ".XQ"
 local xqueue_messages = xqueue_full_name .. ".msgs"
 
 -- Command-specific arguments.
 local ARGS = {}
-for i=9,#ARGV do
-    ARGS[i - 8] = ARGV[i]
-end
-
--- Iterates over a table in chunks, yielding a new chunk on each
--- iteration. We use this to do work in batches so we don't overflow
--- lua's stack.
---
--- Example:
---
---   for chunk in iter_chunks(some_table) do
---       do_something(unpack(chunk))
---   end
-local function iter_chunks(tbl)
-    local len = #tbl
-    local i = 1
-    return function()
-        if i <= len then
-            local chunk = {}
-            local last_idx = math.min(i + max_unpack_size - 1, len)
-            local j
-            for j = i, last_idx do
-                table.insert(chunk, tbl[j])
-            end
-            i = last_idx + 1
-            return chunk
-        end
-    end
+for i=7,#ARGV do
+    ARGS[i - 6] = ARGV[i]
 end
 
+-- The max number of pending notifications per queue.  This bounds
+-- the size of notification lists that no consumers are blocking on.
+local max_notifications = 100
 
--- Every call to dispatch has some % chance to trigger maintenance on
--- a queue.  Maintenance moves any unacked messages belonging to dead
--- workers back to their queues and deletes any expired messages from
--- DLQs.
-if do_maintenance == "1" then
-    local dead_workers = redis.call("zrangebyscore", heartbeats, 0, timestamp - heartbeat_timeout)
-    for i=1,#dead_workers do
-        local dead_worker = dead_workers[i]
-        local dead_worker_acks = namespace .. ":__acks__." .. dead_worker
-        local dead_worker_queue_acks = dead_worker_acks .. "." .. queue_name
-        local message_ids = redis.call("smembers", dead_worker_queue_acks)
-        if next(message_ids) then
-            for _, message_id in ipairs(message_ids) do
-                if redis.call("hexists", queue_messages, message_id) > 0 then
-                    redis.call("rpush", queue_full_name, message_id)
-                end
-            end
-            redis.call("del", dead_worker_queue_acks)
-        end
-
-        -- If there are no more ack groups for this worker, then
-        -- remove it from the heartbeats set.
-        local ack_queues = redis.call("keys", dead_worker_acks .. "*")
-        if not next(ack_queues) then
-            redis.call("zrem", heartbeats, dead_worker)
-        end
+-- Wakes up to $count consumers blocking on $queue_full_name.
+local function notify(count)
+    if do_notify ~= "1" or count < 1 then
+        return
     end
 
-    local dead_message_ids = redis.call("zrangebyscore", xqueue_full_name, 0, timestamp - dead_message_ttl)
-    if next(dead_message_ids) then
-        for dead_message_ids_batch in iter_chunks(dead_message_ids) do
-            redis.call("zrem", xqueue_full_name, unpack(dead_message_ids_batch))
-            redis.call("hdel", xqueue_messages, unpack(dead_message_ids_batch))
-        end
+    local notifications = {}
+    for i=1,math.min(count, max_notifications) do
+        notifications[i] = "1"
     end
 
-    -- The following code is required for backwards-compatibility with
-    -- the old way acks used to be implemented.  It hoists any
-    -- existing acks zsets into the per-worker sets.
-    local compat_queue_acks = queue_full_name .. ".acks"
-    local compat_message_ids = redis.call("zrangebyscore", compat_queue_acks, 0, timestamp - 86400000 * 7.5)
-    if next(compat_message_ids) then
-        for compat_message_ids_batch in iter_chunks(compat_message_ids) do
-            redis.call("sadd", queue_acks, unpack(compat_message_ids_batch))
-            redis.call("zrem", compat_queue_acks, unpack(compat_message_ids_batch))
-        end
+    redis.call("rpush", queue_notify, unpack(notifications))
+    redis.call("ltrim", queue_notify, 0, max_notifications - 1)
+end
+
+
+-- Moves up to $max_unpack_size delayed messages whose eta has passed
+-- onto $queue_full_name.
+local function promote()
+    local message_ids = redis.call("zrangebyscore", queue_etas, "-inf", timestamp, "LIMIT", 0, max_unpack_size)
+    if next(message_ids) then
+        redis.call("zrem", queue_etas, unpack(message_ids))
+        redis.call("rpush", queue_full_name, unpack(message_ids))
+        notify(#message_ids)
     end
 end
 
@@ -160,10 +135,39 @@ if command == "enqueue" then
 
     redis.call("hset", queue_messages, message_id, message_data)
     redis.call("rpush", queue_full_name, message_id)
+    notify(1)
+
+
+-- Enqueues many messages on $queue_full_name at once.  The arguments
+-- are a flat list of message id and message data pairs.
+elseif command == "enqueue_many" then
+    local message_ids = {}
+    for i=1,#ARGS,2 do
+        message_ids[#message_ids + 1] = ARGS[i]
+    end
+
+    redis.call("hset", queue_messages, unpack(ARGS))
+    redis.call("rpush", queue_full_name, unpack(message_ids))
+    notify(#message_ids)
+
+
+-- Schedules messages to be moved onto $queue_full_name once their eta
+-- passes.  The arguments are a flat list of message id, eta and
+-- message data triples.
+elseif command == "schedule" then
+    for i=1,#ARGS,3 do
+        redis.call("hset", queue_messages, ARGS[i], ARGS[i + 2])
+        redis.call("zadd", queue_etas, ARGS[i + 1], ARGS[i])
+    end
 
 
 -- Returns up to $prefetch number of messages from $queue_full_name.
+-- Any delayed messages that are due get moved onto the queue first.
 elseif command == "fetch" then
+    if queue_name == queue_canonical_name then
+        promote()
+    end
+
     -- Ensure prefetch isn't so large that we get errors fetching
     local prefetch = math.min(ARGS[1], max_unpack_size)
 
@@ -179,6 +183,7 @@ elseif command == "fetch" then
     end
 
     if next(message_ids) ~= nil then
+        redis.call("sadd", ack_queues, queue_name)
         return redis.call("hmget", queue_messages, unpack(message_ids))
     else
         return {}
@@ -188,45 +193,53 @@ elseif command == "fetch" then
 -- Moves fetched-but-not-processed messages back to their queues on
 -- worker shutdown.
 elseif command == "requeue" then
+    local requeued = 0
     for i=1,#ARGS do
         local message_id = ARGS[i]
 
         if redis.call("srem", queue_acks, message_id) > 0 then
             if redis.call("hexists", queue_messages, message_id) > 0 then
                 redis.call("rpush", queue_full_name, message_id)
+                requeued = requeued + 1
             end
         end
     end
 
+    notify(requeued)
+
 
--- Acknowledges that a message has been processed.
+-- Acknowledges that messages have been processed.
 elseif command == "ack" then
-    local message_id = ARGS[1]
+    for i=1,#ARGS do
+        local message_id = ARGS[i]
 
-    if redis.call("srem", queue_acks, message_id) > 0 then
-        redis.call("hdel", queue_messages, message_id)
+        if redis.call("srem", queue_acks, message_id) > 0 then
+            redis.call("hdel", queue_messages, message_id)
+        end
     end
 
 
--- Moves a message from a queue to a dead-letter queue.
+-- Moves messages from a queue to a dead-letter queue.
 elseif command == "nack" then
-    local message_id = ARGS[1]
+    for i=1,#ARGS do
+        local message_id = ARGS[i]
 
-    -- unack the message
-    if redis.call("srem", queue_acks, message_id) > 0 then
-        -- then pop it off the messages hash and move it onto the DLQ
-        local message = redis.call("hget", queue_messages, message_id)
-        if message then
-            redis.call("zadd", xqueue_full_name, timestamp, message_id)
-            redis.call("hset", xqueue_messages, message_id, message)
-            redis.call("hdel", queue_messages, message_id)
+        -- unack the message
+        if redis.call("srem", queue_acks, message_id) > 0 then
+            -- then pop it off the messages hash and move it onto the DLQ
+            local message = redis.call("hget", queue_messages, message_id)
+            if message then
+                redis.call("zadd", xqueue_full_name, timestamp, message_id)
+                redis.call("hset", xqueue_messages, message_id, message)
+                redis.call("hdel", queue_messages, message_id)
+            end
         end
     end
 
 
 -- Removes all messages from a queue.
 elseif command == "purge" then
-    redis.call("del", queue_full_name, queue_acks, queue_messages, xqueue_full_name, xqueue_messages)
+    redis.call("del", queue_full_name, queue_acks, queue_messages, queue_notify, queue_etas, xqueue_full_name, xqueue_messages)
 
 
 -- Used in tests to determine the size of the queue and its connected delay queue.
@@ -0,0 +1,34 @@
+-- This file is a part of Dramatiq.
+--
+-- Copyright (C) 2020 CLEARTYPE SRL <bogdan@cleartype.io>
+--
+-- Dramatiq is free software; you can redistribute it and/or modify it
+-- under the terms of the GNU Lesser General Public License as published by
+-- the Free Software Foundation, either version 3 of the License, or (at
+-- your option) any later version.
+--
+-- Dramatiq is distributed in the hope that it will be useful, but WITHOUT
+-- ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+-- FITNESS FOR A PARTICULAR PURPOSE. See the GNU Lesser General Public
+-- License for more details.
+--
+-- You should have received a copy of the GNU Lesser General Public License
+-- along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+-- luacheck: globals ARGV KEYS redis
+-- heartbeat(
+--   args=[timestamp, worker_id],
+--   keys=[namespace]
+-- )
+--
+-- Records that a worker is alive and that it keeps an index of its ack
+-- sets.  See dispatch.lua for a description of the heartbeats and
+-- indexed workers sets.
+
+local namespace = KEYS[1]
+
+local timestamp = ARGV[1]
+local worker_id = ARGV[2]
+
+redis.call("zadd", namespace .. ":__heartbeats__", timestamp, worker_id)
+redis.call("sadd", namespace .. ":__indexed_workers__", worker_id)
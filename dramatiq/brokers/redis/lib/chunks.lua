@@ -0,0 +1,45 @@
+-- This file is a part of Dramatiq.
+--
+-- Copyright (C) 2017,2018,2019,2020 CLEARTYPE SRL <bogdan@cleartype.io>
+--
+-- Dramatiq is free software; you can redistribute it and/or modify it
+-- under the terms of the GNU Lesser General Public License as published by
+-- the Free Software Foundation, either version 3 of the License, or (at
+-- your option) any later version.
+--
+-- Dramatiq is distributed in the hope that it will be useful, but WITHOUT
+-- ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+-- FITNESS FOR A PARTICULAR PURPOSE. See the GNU Lesser General Public
+-- License for more details.
+--
+-- You should have received a copy of the GNU Lesser General Public License
+-- along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+-- luacheck: globals unpack
+-- Helpers shared by the broker's scripts.  This file is prepended to
+-- every script when the scripts are loaded.
+
+-- Iterates over a table in chunks of up to $size elements, yielding a
+-- new chunk on each iteration.  We use this to do work in batches so
+-- we don't overflow lua's stack.
+--
+-- Example:
+--
+--   for chunk in iter_chunks(some_table, max_unpack_size) do
+--       do_something(unpack(chunk))
+--   end
+local function iter_chunks(tbl, size)
+    local len = #tbl
+    local i = 1
+    return function()
+        if i <= len then
+            local chunk = {}
+            local last_idx = math.min(i + size - 1, len)
+            for j = i, last_idx do
+                table.insert(chunk, tbl[j])
+            end
+            i = last_idx + 1
+            return chunk
+        end
+    end
+end
@@ -0,0 +1,136 @@
+-- This file is a part of Dramatiq.
+--
+-- Copyright (C) 2017,2018,2019,2020 CLEARTYPE SRL <bogdan@cleartype.io>
+--
+-- Dramatiq is free software; you can redistribute it and/or modify it
+-- under the terms of the GNU Lesser General Public License as published by
+-- the Free Software Foundation, either version 3 of the License, or (at
+-- your option) any later version.
+--
+-- Dramatiq is distributed in the hope that it will be useful, but WITHOUT
+-- ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+-- FITNESS FOR A PARTICULAR PURPOSE. See the GNU Lesser General Public
+-- License for more details.
+--
+-- You should have received a copy of the GNU Lesser General Public License
+-- along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+-- luacheck: globals ARGV KEYS redis unpack
+-- maintenance(
+--   args=[timestamp, worker_id, heartbeat_timeout, dead_message_ttl, max_unpack_size, do_notify, queue_name, ...],
+--   keys=[namespace]
+-- )
+--
+-- Moves any unacked messages belonging to dead workers back to their
+-- queues, deletes any expired messages from the DLQs of the given
+-- queues and hoists old-style acks into the per-worker ack sets.  The
+-- queue names must not include delay queues; those are maintained
+-- alongside their parent queues.  See dispatch.lua for a description
+-- of the keys used here.
+
+local namespace = KEYS[1]
+
+local timestamp = ARGV[1]
+local worker_id = ARGV[2]
+local heartbeat_timeout = ARGV[3]
+local dead_message_ttl = ARGV[4]
+local max_unpack_size = ARGV[5]
+local do_notify = ARGV[6]
+
+local queue_names = {}
+for i=7,#ARGV do
+    queue_names[#queue_names + 1] = ARGV[i]
+    queue_names[#queue_names + 1] = ARGV[i] .. ".DQ"
+end
+
+local acks = namespace .. ":__acks__." .. worker_id
+local ack_queues = namespace .. ":__ack_queues__." .. worker_id
+local heartbeats = namespace .. ":__heartbeats__"
+local indexed_workers = namespace .. ":__indexed_workers__"
+
+-- Same as in dispatch.lua.
+local max_notifications = 100
+
+local function notify(queue_full_name, count)
+    if do_notify ~= "1" or count < 1 then
+        return
+    end
+
+    local queue_notify = queue_full_name .. ".notify"
+    local notifications = {}
+    for i=1,math.min(count, max_notifications) do
+        notifications[i] = "1"
+    end
+
+    redis.call("rpush", queue_notify, unpack(notifications))
+    redis.call("ltrim", queue_notify, 0, max_notifications - 1)
+end
+
+
+-- Every worker keeps an index of the queues it has fetched messages
+-- from so that we never have to look its ack sets up with KEYS.  The
+-- ack sets of dead workers that predate the index (eg. during a
+-- rolling upgrade) are added to it by the broker before this runs.
+local dead_workers = redis.call("zrangebyscore", heartbeats, 0, timestamp - heartbeat_timeout)
+for i=1,#dead_workers do
+    local dead_worker = dead_workers[i]
+    local dead_worker_acks = namespace .. ":__acks__." .. dead_worker
+    local dead_worker_ack_queues = namespace .. ":__ack_queues__." .. dead_worker
+
+    local dead_worker_queue_names = redis.call("smembers", dead_worker_ack_queues)
+    for _, queue_name in ipairs(queue_names) do
+        dead_worker_queue_names[#dead_worker_queue_names + 1] = queue_name
+    end
+
+    for _, queue_name in ipairs(dead_worker_queue_names) do
+        local dead_worker_queue_acks = dead_worker_acks .. "." .. queue_name
+        local queue_full_name = namespace .. ":" .. queue_name
+        local queue_messages = queue_full_name .. ".msgs"
+        local message_ids = redis.call("smembers", dead_worker_queue_acks)
+        if next(message_ids) then
+            local requeued = 0
+            for _, message_id in ipairs(message_ids) do
+                if redis.call("hexists", queue_messages, message_id) > 0 then
+                    redis.call("rpush", queue_full_name, message_id)
+                    requeued = requeued + 1
+                end
+            end
+            redis.call("del", dead_worker_queue_acks)
+            notify(queue_full_name, requeued)
+        end
+    end
+
+    redis.call("del", dead_worker_ack_queues)
+    redis.call("srem", indexed_workers, dead_worker)
+    redis.call("zrem", heartbeats, dead_worker)
+end
+
+for _, queue_name in ipairs(queue_names) do
+    local queue_full_name = namespace .. ":" .. queue_name
+
+    if string.sub(queue_name, -3) ~= ".DQ" then
+        local xqueue_full_name = queue_full_name .. ".XQ"
+        local xqueue_messages = xqueue_full_name .. ".msgs"
+        local dead_message_ids = redis.call("zrangebyscore", xqueue_full_name, 0, timestamp - dead_message_ttl)
+        if next(dead_message_ids) then
+            for dead_message_ids_batch in iter_chunks(dead_message_ids, max_unpack_size) do
+                redis.call("zrem", xqueue_full_name, unpack(dead_message_ids_batch))
+                redis.call("hdel", xqueue_messages, unpack(dead_message_ids_batch))
+            end
+        end
+    end
+
+    -- The following code is required for backwards-compatibility with
+    -- the old way acks used to be implemented.  It hoists any
+    -- existing acks zsets into the per-worker sets.
+    local compat_queue_acks = queue_full_name .. ".acks"
+    local compat_message_ids = redis.call("zrangebyscore", compat_queue_acks, 0, timestamp - 86400000 * 7.5)
+    if next(compat_message_ids) then
+        local queue_acks = acks .. "." .. queue_name
+        for compat_message_ids_batch in iter_chunks(compat_message_ids, max_unpack_size) do
+            redis.call("sadd", queue_acks, unpack(compat_message_ids_batch))
+            redis.call("zrem", compat_queue_acks, unpack(compat_message_ids_batch))
+        end
+        redis.call("sadd", ack_queues, queue_name)
+    end
+end
@@ -0,0 +1,510 @@
+# This file is a part of Dramatiq.
+#
+# Copyright (C) 2017,2018 CLEARTYPE SRL <bogdan@cleartype.io>
+#
+# Dramatiq is free software; you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or (at
+# your option) any later version.
+#
+# Dramatiq is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU Lesser General Public
+# License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import time
+from functools import partial
+from threading import Lock
+from uuid import uuid4
+
+import redis
+
+from ..broker import Broker, Consumer, MessageProxy
+from ..common import compute_backoff, current_millis, dq_name, xq_name
+from ..errors import ConnectionClosed, QueueJoinTimeout
+from ..logging import get_logger
+from ..message import Message
+from .redis import _close_async_client, _make_async_client, _PerLoop, aioredis
+
+#: The name of the consumer group that all workers read from.
+CONSUMER_GROUP = "dramatiq"
+
+#: The amount of time in milliseconds that dead-lettered messages are
+#: kept in Redis for.
+DEFAULT_DEAD_MESSAGE_TTL = 86400000 * 7
+
+#: The amount of time in milliseconds that has to pass without a
+#: heartbeat for a worker's unacked messages to be redelivered.
+DEFAULT_HEARTBEAT_TIMEOUT = 60000
+
+#: The interval in milliseconds at which consumers send heartbeats.
+DEFAULT_HEARTBEAT_INTERVAL = 5000
+
+
+class RedisStreamsBroker(Broker):
+    """A broker than can be used with Redis 6.2 or later and redis-py
+    4.0 or later.  Queues are stored in Redis Streams and consumed
+    through a consumer group so Redis keeps track of unacked messages
+    on its own.
+
+    Examples:
+
+      >>> RedisStreamsBroker(url="redis://127.0.0.1:6379/0")
+
+    See also:
+      Redis_ for a list of all the available connection parameters.
+
+    Parameters:
+      url(str): An optional connection URL.  If both a URL and
+        connection parameters are provided, the URL is used.
+      middleware(list[Middleware])
+      namespace(str): The str with which to prefix all Redis keys.
+      heartbeat_timeout(int): The amount of time (in ms) that has to
+        pass without a heartbeat for a consumer's unacked messages to
+        be redelivered to other consumers.
+      heartbeat_interval(int): The interval (in ms) at which consumers
+        send heartbeats for their unacked messages.  Must be shorter
+        than ``heartbeat_timeout``.
+      dead_message_ttl(int): The amount of time (in ms) that
+        dead-lettered messages are kept in Redis for.
+      client(redis.StrictRedis): A redis client to use.
+      **parameters: Connection parameters are passed directly
+        to :class:`redis.Redis`.  The ``socket_timeout`` parameter,
+        if set, must be longer than the worker timeout.
+
+    .. _Redis: http://redis-py.readthedocs.io/en/latest/#redis.Redis
+    """
+
+    def __init__(
+            self, *,
+            url=None, middleware=None, namespace="dramatiq",
+            heartbeat_timeout=DEFAULT_HEARTBEAT_TIMEOUT,
+            heartbeat_interval=DEFAULT_HEARTBEAT_INTERVAL,
+            dead_message_ttl=DEFAULT_DEAD_MESSAGE_TTL,
+            client=None,
+            **parameters
+    ):
+        super().__init__(middleware=middleware)
+
+        if url:
+            parameters["connection_pool"] = redis.ConnectionPool.from_url(url)
+
+        self.broker_id = str(uuid4())
+        self.namespace = namespace
+        self.heartbeat_timeout = heartbeat_timeout
+        self.heartbeat_interval = heartbeat_interval
+        self.dead_message_ttl = dead_message_ttl
+        self.queues = set()
+        # TODO: Replace usages of StrictRedis (redis-py 2.x) with Redis in Dramatiq 2.0.
+        self.client = client or redis.StrictRedis(**parameters)
+        self.async_clients = _PerLoop(partial(_make_async_client, self.client), _close_async_client)
+
+    @property
+    def consumer_class(self):
+        return _RedisStreamsConsumer
+
+    def consume(self, queue_name, prefetch=1, timeout=5000):
+        """Create a new consumer for a queue.
+
+        Parameters:
+          queue_name(str): The queue to consume.
+          prefetch(int): The number of messages to prefetch.
+          timeout(int): The idle timeout in milliseconds.
+
+        Returns:
+          Consumer: A consumer that retrieves messages from Redis.
+        """
+        return self.consumer_class(self, queue_name, prefetch, timeout)
+
+    def close(self):
+        """Close any asyncio clients.
+        """
+        self.async_clients.close()
+
+    def declare_queue(self, queue_name):
+        """Declare a queue.  Has no effect if a queue with the given
+        name has already been declared.
+
+        Parameters:
+          queue_name(str): The name of the new queue.
+        """
+        if queue_name not in self.queues:
+            self.emit_before("declare_queue", queue_name)
+            self.queues.add(queue_name)
+            self.emit_after("declare_queue", queue_name)
+
+            delayed_name = dq_name(queue_name)
+            self.delay_queues.add(delayed_name)
+            self.emit_after("declare_delay_queue", delayed_name)
+
+    def enqueue(self, message, *, delay=None):
+        """Enqueue a message.
+
+        Parameters:
+          message(Message): The message to enqueue.
+          delay(int): The minimum amount of time, in milliseconds, to
+            delay the message by.  Must be less than 7 days.
+        """
+        message = self._prepare_message(message, delay)
+        queue_name = message.queue_name
+
+        self.logger.debug("Enqueueing message %r on queue %r.", message.message_id, queue_name)
+        self.emit_before("enqueue", message, delay)
+        self.client.execute_command("XADD", self._stream_name(queue_name), "*", "data", message.encode())
+        self.emit_after("enqueue", message, delay)
+        return message
+
+    async def enqueue_async(self, message, *, delay=None):
+        """Enqueue a message from a coroutine without blocking the
+        event loop.  See :meth:`RedisBroker.enqueue_async<dramatiq.brokers.redis.RedisBroker.enqueue_async>`.
+
+        Parameters:
+          message(Message): The message to enqueue.
+          delay(int): The minimum amount of time, in milliseconds, to
+            delay the message by.  Must be less than 7 days.
+        """
+        if aioredis is None:  # pragma: no cover
+            return await super().enqueue_async(message, delay=delay)
+
+        client = await self.async_clients.get()
+        message = self._prepare_message(message, delay)
+        queue_name = message.queue_name
+
+        self.logger.debug("Enqueueing message %r on queue %r.", message.message_id, queue_name)
+        self.emit_before("enqueue", message, delay)
+        await client.execute_command("XADD", self._stream_name(queue_name), "*", "data", message.encode())
+        self.emit_after("enqueue", message, delay)
+        return message
+
+    def enqueue_many(self, messages, *, delay=None):
+        """Enqueue many messages at once.  All the messages are sent
+        to Redis in a single round trip.
+
+        Parameters:
+          messages(Iterable[Message]): The messages to enqueue.
+          delay(int): The minimum amount of time, in milliseconds, to
+            delay the messages by.  Must be less than 7 days.
+
+        Returns:
+          list[Message]: The enqueued messages.
+        """
+        messages = [self._prepare_message(message, delay) for message in messages]
+        pipe = self.client.pipeline(transaction=False)
+        for message in messages:
+            self.emit_before("enqueue", message, delay)
+            pipe.execute_command("XADD", self._stream_name(message.queue_name), "*", "data", message.encode())
+
+        self.logger.debug("Enqueueing %d messages.", len(messages))
+        pipe.execute()
+
+        for message in messages:
+            self.emit_after("enqueue", message, delay)
+        return messages
+
+    def _prepare_message(self, message, delay):
+        if delay is not None:
+            message_eta = current_millis() + delay
+            message = message.copy(
+                queue_name=dq_name(message.queue_name),
+                options={
+                    "eta": message_eta,
+                },
+            )
+
+        return message
+
+    def _stream_name(self, queue_name):
+        return "%s:%s.stream" % (self.namespace, queue_name)
+
+    def get_declared_queues(self):
+        """Get all declared queues.
+
+        Returns:
+          set[str]: The names of all the queues declared so far on
+          this Broker.
+        """
+        return self.queues.copy()
+
+    def flush(self, queue_name):
+        """Drop all the messages from a queue.
+
+        Parameters:
+          queue_name(str): The queue to flush.
+        """
+        # Trimming the streams rather than deleting them keeps their
+        # consumer groups around for any running consumers.
+        pipe = self.client.pipeline(transaction=False)
+        for name in (queue_name, dq_name(queue_name)):
+            pipe.execute_command("XTRIM", self._stream_name(name), "MAXLEN", 0)
+        pipe.delete(self._stream_name(xq_name(queue_name)))
+        pipe.execute()
+
+    def flush_all(self):
+        """Drop all messages from all declared queues.
+        """
+        for queue_name in self.queues:
+            self.flush(queue_name)
+
+    def join(self, queue_name, *, interval=100, timeout=None):
+        """Wait for all the messages on the given queue to be
+        processed.  This method is only meant to be used in tests to
+        wait for all the messages in a queue to be processed.
+
+        Raises:
+          QueueJoinTimeout: When the timeout elapses.
+
+        Parameters:
+          queue_name(str): The queue to wait on.
+          interval(Optional[int]): The interval, in milliseconds, at
+            which to check the queues.
+          timeout(Optional[int]): The max amount of time, in
+            milliseconds, to wait on this queue.
+        """
+        deadline = timeout and time.monotonic() + timeout / 1000
+        while True:
+            if deadline and time.monotonic() >= deadline:
+                raise QueueJoinTimeout(queue_name)
+
+            # Acked messages are deleted from their streams so the
+            # length of a stream is the number of messages that are
+            # either queued or being processed.
+            pipe = self.client.pipeline(transaction=False)
+            for name in (queue_name, dq_name(queue_name)):
+                pipe.execute_command("XLEN", self._stream_name(name))
+
+            if sum(pipe.execute()) == 0:
+                return
+
+            time.sleep(interval / 1000)
+
+
+class _RedisStreamsConsumer(Consumer):
+    def __init__(self, broker, queue_name, prefetch, timeout):
+        self.logger = get_logger(__name__, type(self))
+        self.broker = broker
+        self.client = broker.client
+        self.queue_name = queue_name
+        self.prefetch = prefetch
+        self.timeout = timeout
+
+        self.stream_name = broker._stream_name(queue_name)
+        self.xstream_name = broker._stream_name(xq_name(queue_name))
+        self.consumer_name = broker.broker_id
+
+        # The ids of every entry this consumer has read and that
+        # hasn't been acked, nacked or requeued yet.  Redis considers
+        # these pending until we XACK them so we have to keep claiming
+        # them in order to prevent them from being redelivered to
+        # other consumers.
+        self.message_cache = []
+        self.pending_mutex = Lock()
+        self.pending_entry_ids = set()
+        self.heartbeat_deadline = 0
+        self.misses = 0
+
+        try:
+            self.create_group()
+        except redis.ConnectionError as e:
+            raise ConnectionClosed(e) from None
+
+    def create_group(self):
+        try:
+            self.client.execute_command("XGROUP", "CREATE", self.stream_name, CONSUMER_GROUP, "0", "MKSTREAM")
+        except redis.ResponseError as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+
+    @property
+    def outstanding_message_count(self):
+        return len(self.pending_entry_ids)
+
+    def ack(self, message):
+        try:
+            pipe = self.client.pipeline()
+            pipe.execute_command("XACK", self.stream_name, CONSUMER_GROUP, message.entry_id)
+            pipe.execute_command("XDEL", self.stream_name, message.entry_id)
+            pipe.execute()
+        except redis.ConnectionError as e:
+            raise ConnectionClosed(e) from None
+        else:
+            self.forget(message.entry_id)
+
+    def nack(self, message):
+        # The dead-letter stream is trimmed on every write so we never
+        # have to scan it for expired messages.
+        min_entry_id = max(current_millis() - self.broker.dead_message_ttl, 0)
+
+        try:
+            pipe = self.client.pipeline()
+            pipe.execute_command("XADD", self.xstream_name, "MINID", "~", min_entry_id, "*", "data", message.data)
+            pipe.execute_command("XACK", self.stream_name, CONSUMER_GROUP, message.entry_id)
+            pipe.execute_command("XDEL", self.stream_name, message.entry_id)
+            pipe.execute()
+        except redis.ConnectionError as e:
+            raise ConnectionClosed(e) from None
+        else:
+            self.forget(message.entry_id)
+
+    def requeue(self, messages):
+        self.requeue_entries([(message.entry_id, message.data) for message in messages])
+
+    def requeue_entries(self, entries):
+        if not entries:
+            return
+
+        self.logger.debug("Re-enqueueing %r on queue %r.", [entry_id for entry_id, _ in entries], self.queue_name)
+        pipe = self.client.pipeline()
+        for entry_id, data in entries:
+            pipe.execute_command("XADD", self.stream_name, "*", "data", data)
+            pipe.execute_command("XACK", self.stream_name, CONSUMER_GROUP, entry_id)
+            pipe.execute_command("XDEL", self.stream_name, entry_id)
+        pipe.execute()
+
+        for entry_id, _ in entries:
+            self.forget(entry_id)
+
+    def forget(self, entry_id):
+        with self.pending_mutex:
+            self.pending_entry_ids.discard(entry_id)
+
+    def heartbeat(self):
+        """Reset the idle time of all of this consumer's pending
+        messages and claim any messages that other consumers have
+        left idle for longer than the heartbeat timeout.
+        """
+        with self.pending_mutex:
+            entry_ids = list(self.pending_entry_ids)
+
+        if entry_ids:
+            self.client.xclaim(self.stream_name, CONSUMER_GROUP, self.consumer_name, 0, entry_ids, justid=True)
+
+        count = self.prefetch - self.outstanding_message_count
+        if count <= 0:
+            return []
+
+        entry_ids = self.client.xautoclaim(
+            self.stream_name, CONSUMER_GROUP, self.consumer_name,
+            self.broker.heartbeat_timeout, count=count, justid=True,
+        )
+
+        if not entry_ids:
+            return []
+
+        # Claimed entries may have been deleted while they were
+        # pending, in which case there's nothing left to process so
+        # we just ack them.  We only claim their ids in order to be
+        # able to tell those entries apart on every version of Redis.
+        pipe = self.client.pipeline(transaction=False)
+        for entry_id in entry_ids:
+            pipe.execute_command("XRANGE", self.stream_name, entry_id, entry_id)
+
+        entries = [entry for entry_range in pipe.execute() for entry in entry_range]
+        existing_entry_ids = {entry_id for entry_id, _ in entries}
+        missing_entry_ids = [entry_id for entry_id in entry_ids if entry_id not in existing_entry_ids]
+        if missing_entry_ids:
+            self.client.execute_command("XACK", self.stream_name, CONSUMER_GROUP, *missing_entry_ids)
+
+        return entries
+
+    def read(self, count):
+        # Messages are read without blocking first so that the fetch
+        # time only ever measures round trips to Redis.
+        fetch_start = time.monotonic()
+        entries = self.read_group(count)
+        if entries:
+            self.fetch_time = time.monotonic() - fetch_start
+            return entries
+
+        return self.read_group(count, block=self.timeout)
+
+    def read_group(self, count, *, block=None):
+        block_args = () if block is None else ("BLOCK", block)
+        try:
+            response = self.client.execute_command(
+                "XREADGROUP", "GROUP", CONSUMER_GROUP, self.consumer_name,
+                "COUNT", count, *block_args,
+                "STREAMS", self.stream_name, ">",
+            )
+        except redis.ResponseError as e:
+            # The stream was deleted out from under us so we recreate
+            # it along with its consumer group.
+            if "NOGROUP" not in str(e):
+                raise
+
+            self.create_group()
+            return []
+
+        if not response:
+            return []
+
+        _, entries = response[0]
+        return entries
+
+    def __next__(self):
+        try:
+            while True:
+                try:
+                    # This is a micro-optimization so we try the fast
+                    # path first.  We assume there are messages in the
+                    # cache and if there aren't, we go down the slow
+                    # path of doing network IO.
+                    entry_id, fields = self.message_cache.pop(0)
+                    self.misses = 0
+
+                    data = _get_entry_data(fields)
+                    return _RedisStreamsMessageProxy(entry_id, data, Message.decode(data))
+                except IndexError:
+                    entries = []
+                    if time.monotonic() >= self.heartbeat_deadline:
+                        self.heartbeat_deadline = time.monotonic() + self.broker.heartbeat_interval / 1000
+                        entries = self.heartbeat()
+
+                    # If there are fewer messages currently being
+                    # processed than we're allowed to prefetch, read
+                    # up to that number of messages, blocking for up
+                    # to the idle timeout if there aren't any.
+                    count = self.prefetch - self.outstanding_message_count
+                    if not entries and count > 0:
+                        entries = self.read(count)
+                        if not entries:
+                            return None
+
+                    if not entries:
+                        self.misses, backoff_ms = compute_backoff(self.misses, max_backoff=self.timeout)
+                        time.sleep(backoff_ms / 1000)
+                        return None
+
+                    with self.pending_mutex:
+                        self.pending_entry_ids.update(entry_id for entry_id, _ in entries)
+
+                    self.message_cache = entries
+        except redis.ConnectionError as e:
+            raise ConnectionClosed(e) from None
+
+    def close(self):
+        # Hand any messages that were read but never processed back
+        # to the queue so other consumers don't have to wait for them
+        # to time out.
+        entries = [(entry_id, _get_entry_data(fields)) for entry_id, fields in self.message_cache]
+        self.message_cache = []
+
+        try:
+            self.requeue_entries(entries)
+        except redis.ConnectionError:
+            self.logger.warning("Failed to requeue messages on queue %r.", self.queue_name, exc_info=True)
+
+
+class _RedisStreamsMessageProxy(MessageProxy):
+    def __init__(self, entry_id, data, message):
+        super().__init__(message)
+        self.entry_id = entry_id
+        self.data = data
+
+
+def _get_entry_data(fields):
+    # redis-py parses the fields of stream entries into dicts.  We
+    # only ever store the one field.
+    return fields[b"data"]
@@ -113,6 +113,12 @@ class StubBroker(Broker):
         self.emit_after("enqueue", message, delay)
         return message
 
+    async def enqueue_async(self, message, *, delay=None):
+        """Enqueue a message from a coroutine.  Messages are enqueued
+        in memory so this never blocks.
+        """
+        return self.enqueue(message, delay=delay)
+
     def flush(self, queue_name):
         """Drop all the messages from a queue.
 
@@ -192,7 +198,13 @@ class _StubConsumer(Consumer):
 
     def __next__(self):
         try:
-            data = self.queue.get(timeout=self.timeout / 1000)
+            fetch_start = time.monotonic()
+            try:
+                data = self.queue.get_nowait()
+                self.fetch_time = time.monotonic() - fetch_start
+            except Empty:
+                data = self.queue.get(timeout=self.timeout / 1000)
+
             message = Message.decode(data)
             return _StubMessageProxy(message)
         except Empty:
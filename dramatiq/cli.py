@@ -96,6 +96,9 @@ examples:
   # Listen only to the "foo" and "bar" queues.
   $ dramatiq some_module -Q foo bar
 
+  # Process up to 5 messages from "critical" for every message from "bulk".
+  $ dramatiq some_module --queue-weights critical=5,bulk=1
+
   # Write the main process pid to a file.
   $ dramatiq some_module --pid-file /tmp/dramatiq.pid
 
@@ -139,6 +142,16 @@ def folder_path(value):
     return os.path.abspath(value)
 
 
+def queue_weights(value):
+    weights = {}
+    for pair in value.split(","):
+        queue_name, _, weight = pair.strip().partition("=")
+        if not queue_name or not weight.isdigit() or int(weight) < 1:
+            raise argparse.ArgumentTypeError("%r is not a valid queue weight" % pair)
+        weights[queue_name] = int(weight)
+    return weights
+
+
 def make_argument_parser():
     parser = argparse.ArgumentParser(
         prog="dramatiq",
@@ -170,6 +183,31 @@ def make_argument_parser():
         "--queues", "-Q", nargs="*", type=str,
         help="listen to a subset of queues (default: all queues)",
     )
+    parser.add_argument(
+        "--queue-weights", type=queue_weights, metavar="QUEUE=WEIGHT,...",
+        help=(
+            "take turns processing messages from each queue, up to as many "
+            "messages in a row as its weight (eg: critical=5,bulk=1).  Queues "
+            "without a weight have a weight of 1 (default: process messages in "
+            "priority order)"
+        ),
+    )
+    parser.add_argument(
+        "--adaptive-prefetch", action="store_true",
+        help=(
+            "size the number of messages prefetched from each queue based on how "
+            "long its messages take to process and fetch; has no effect on RabbitMQ "
+            "(default: prefetch twice as many messages as there are threads)"
+        ),
+    )
+    parser.add_argument(
+        "--defer-rate-limited", action="store_true",
+        help=(
+            "hold messages that exceed a rate limit in memory and process them "
+            "again once their rate limiter lets messages through (default: retry "
+            "them via the broker)"
+        ),
+    )
     parser.add_argument(
         "--pid-file", type=str,
         help="write the PID of the master process to a file (default: no pid file)",
@@ -395,7 +433,11 @@ def worker_process(args, worker_id, logging_pipe, canteen, event):
                         canteen_add(canteen, fork_path)
 
         logger.debug("Starting worker threads...")
-        worker = Worker(broker, queues=args.queues, worker_threads=args.threads)
+        worker = Worker(
+            broker, queues=args.queues, worker_threads=args.threads,
+            queue_weights=args.queue_weights, adaptive_prefetch=args.adaptive_prefetch,
+            defer_rate_limited=args.defer_rate_limited,
+        )
         worker.start()
     except ImportError:
         logger.exception("Failed to import module.")
@@ -16,13 +16,13 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 from __future__ import annotations
 
-import time
+import asyncio
 from typing import TYPE_CHECKING, Iterable
 from uuid import uuid4
 
 from .broker import get_broker
 from .rate_limits import Barrier
-from .results import ResultMissing
+from .results import Missing, ResultMissing, Results
 
 if TYPE_CHECKING:
     from .message import Message
@@ -99,13 +99,12 @@ class pipeline:
         Returns:
           int: The total number of results.
         """
-        for count, message in enumerate(self.messages, start=1):
-            try:
-                message.get_result()
-            except ResultMissing:
-                return count - 1
+        results = _get_result_backend(self.broker).get_results(self.messages, missing_ok=True)
+        for count, result in enumerate(results):
+            if result is Missing:
+                return count
 
-        return count
+        return len(results)
 
     def run(self, *, delay=None):
         """Run this pipeline.
@@ -143,6 +142,24 @@ class pipeline:
         """
         return self.messages[-1].get_result(block=block, timeout=timeout)
 
+    async def get_result_async(self, *, block=False, timeout=None):
+        """Get the result of this pipeline from a coroutine.  See
+        :meth:`get_result`.
+
+        Parameters:
+          block(bool): Whether or not to wait until a result is set.
+          timeout(int): The maximum amount of time, in ms, to wait for
+            a result when block is True.  Defaults to 10 seconds.
+
+        Raises:
+          ResultMissing: When block is False and the result isn't set.
+          ResultTimeout: When waiting for a result times out.
+
+        Returns:
+          object: The result.
+        """
+        return await self.messages[-1].get_result_async(block=block, timeout=timeout)
+
     def get_results(self, *, block=False, timeout=None):
         """Get the results of each job in the pipeline.
 
@@ -158,15 +175,7 @@ class pipeline:
         Returns:
           A result generator.
         """
-        deadline = None
-        if timeout:
-            deadline = time.monotonic() + timeout / 1000
-
-        for message in self.messages:
-            if deadline:
-                timeout = max(0, int((deadline - time.monotonic()) * 1000))
-
-            yield message.get_result(block=block, timeout=timeout)
+        yield from _get_result_backend(self.broker).get_results(self.messages, block=block, timeout=timeout)
 
 
 class group:
@@ -234,16 +243,8 @@ class group:
         Returns:
           int: The total number of results.
         """
-        for count, child in enumerate(self.children, start=1):
-            try:
-                if isinstance(child, group):
-                    child.get_results()
-                else:
-                    child.get_result()
-            except ResultMissing:
-                return count - 1
-
-        return count
+        results = _get_result_backend(self.broker).get_results(self._result_messages(), missing_ok=True)
+        return sum(1 for result in self._group_results(iter(results)) if _is_complete(result))
 
     def run(self, *, delay=None):
         """Run the actors in this group.
@@ -320,18 +321,32 @@ class group:
         Returns:
           A result generator.
         """
-        deadline = None
-        if timeout:
-            deadline = time.monotonic() + timeout / 1000
-
+        results = _get_result_backend(self.broker).get_results(
+            self._result_messages(), block=block, timeout=timeout,
+        )
+        yield from self._group_results(iter(results))
+
+    def _result_messages(self):
+        """Returns the messages whose results make up the results of
+        this group, with the messages of child groups flattened.
+        """
         for child in self.children:
-            if deadline:
-                timeout = max(0, int((deadline - time.monotonic()) * 1000))
+            if isinstance(child, group):
+                yield from child._result_messages()
+            elif isinstance(child, pipeline):
+                yield child.messages[-1]
+            else:
+                yield child
 
+    def _group_results(self, results):
+        """Regroups the flat results of :meth:`_result_messages` so
+        that each child group's results end up in a list.
+        """
+        for child in self.children:
             if isinstance(child, group):
-                yield list(child.get_results(block=block, timeout=timeout))
+                yield list(child._group_results(results))
             else:
-                yield child.get_result(block=block, timeout=timeout)
+                yield next(results)
 
     def wait(self, *, timeout=None):
         """Block until all the jobs in the group have finished or
@@ -343,3 +358,61 @@ class group:
         """
         for _ in self.get_results(block=True, timeout=timeout):  # pragma: no cover
             pass
+
+    async def get_results_async(self, *, block=False, timeout=None):
+        """Get the results of each job in the group from a coroutine.
+        Unlike :meth:`get_results`, this waits on all the results
+        concurrently.
+
+        Parameters:
+          block(bool): Whether or not to wait until the results are stored.
+          timeout(int): The maximum amount of time, in milliseconds,
+            to wait for results when block is True.  Defaults to 10
+            seconds.
+
+        Raises:
+          ResultMissing: When block is False and the results aren't set.
+          ResultTimeout: When waiting for results times out.
+
+        Returns:
+          list: The results, in the same order as the jobs.
+        """
+        tasks = []
+        for child in self.children:
+            if isinstance(child, group):
+                coroutine = child.get_results_async(block=block, timeout=timeout)
+            else:
+                coroutine = child.get_result_async(block=block, timeout=timeout)
+            tasks.append(asyncio.ensure_future(coroutine))
+
+        try:
+            return await asyncio.gather(*tasks)
+        finally:
+            # If any of the results fails, there's no point in
+            # waiting on the others.
+            for task in tasks:
+                task.cancel()
+
+    async def wait_async(self, *, timeout=None):
+        """Wait until all the jobs in the group have finished or
+        until the timeout expires, from a coroutine.
+
+        Parameters:
+          timeout(int): The maximum amount of time, in ms, to wait.
+            Defaults to 10 seconds.
+        """
+        await self.get_results_async(block=True, timeout=timeout)
+
+
+def _get_result_backend(broker):
+    for middleware in broker.middleware:
+        if isinstance(middleware, Results):
+            return middleware.backend
+
+    raise RuntimeError("The broker doesn't have a results backend.")
+
+
+def _is_complete(result):
+    if isinstance(result, list):
+        return all(_is_complete(item) for item in result)
+    return result is not Missing
@@ -16,9 +16,13 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 import abc
+import bz2
+import functools
 import json
+import lzma
 import pickle
 import typing
+import zlib
 
 from .errors import DecodeError
 
@@ -42,6 +46,24 @@ class Encoder(abc.ABC):
         """
         raise NotImplementedError
 
+    def encode_message(self, data: MessageData) -> bytes:
+        """Convert the fields of a message into a bytestring.  Uses
+        :meth:`encode` by default.
+        """
+        return self.encode(data)
+
+    def decode_message(self, data: bytes) -> MessageData:
+        """Convert a bytestring into the fields of a message.  Uses
+        :meth:`decode` by default.
+
+        Encoders may avoid decoding the ``args`` and ``kwargs`` of
+        messages up front by returning a ``load_arguments`` callable
+        in their place.  That callable must return an ``(args,
+        kwargs)`` pair and it is only called once the arguments of
+        the message are accessed.
+        """
+        return self.decode(data)
+
 
 class JSONEncoder(Encoder):
     """Encodes messages as JSON.  This is the default encoder.
@@ -75,3 +97,137 @@ class PickleEncoder(Encoder):
 
     def decode(self, data: bytes) -> MessageData:
         return pickle.loads(data)
+
+
+class MsgPackEncoder(Encoder):
+    """Encodes messages using msgpack_.  Messages encoded this way are
+    smaller and faster to decode than JSON messages, and their
+    arguments are only decoded once they are needed, typically right
+    before their actor is called.
+
+    Note:
+      This encoder requires the ``msgpack`` package.  Run ``pip
+      install dramatiq[msgpack]`` to install it.
+
+    .. _msgpack: https://msgpack.org
+    """
+
+    def __init__(self) -> None:
+        try:
+            import msgpack
+        except ImportError:  # pragma: no cover
+            raise RuntimeError(
+                "MsgPackEncoder is not available.  Run `pip install dramatiq[msgpack]` "
+                "to add support for it."
+            ) from None
+
+        self.msgpack = msgpack
+
+    def encode(self, data: MessageData) -> bytes:
+        return self.msgpack.packb(data, use_bin_type=True)
+
+    def decode(self, data: bytes) -> MessageData:
+        try:
+            return self.msgpack.unpackb(data, raw=False, strict_map_key=False)
+        except (ValueError, self.msgpack.UnpackException) as e:
+            raise DecodeError("failed to decode data %r" % (data,), data, e) from None
+
+    def encode_message(self, data: MessageData) -> bytes:
+        # The arguments are packed separately so that the rest of the
+        # message can be decoded without having to decode them.
+        fields = {name: value for name, value in data.items() if name not in ("args", "kwargs")}
+        fields["arguments"] = self.encode([data["args"], data["kwargs"]])
+        return self.encode(fields)
+
+    def decode_message(self, data: bytes) -> MessageData:
+        fields = self.decode(data)
+        arguments = fields.pop("arguments", None)
+        if arguments is not None:
+            fields["load_arguments"] = functools.partial(self.decode, arguments)
+        return fields
+
+
+#: The prefix of compressed payloads.  JSON, msgpack and pickle
+#: payloads never start with these bytes so compressed payloads can
+#: always be told apart from uncompressed ones.
+COMPRESSION_MARKER = b"\x00DZ"
+
+#: The compression algorithms supported by CompressingEncoder, mapped
+#: to the ids they are tagged with and their compress and decompress
+#: functions.
+COMPRESSION_ALGORITHMS = {
+    "zlib": (b"z", zlib.compress, zlib.decompress),
+    "bz2": (b"b", bz2.compress, bz2.decompress),
+    "lzma": (b"x", lzma.compress, lzma.decompress),
+}
+
+
+class CompressingEncoder(Encoder):
+    """Compresses the payloads produced by another encoder once they
+    grow past a certain size.  Compressed payloads are tagged with the
+    algorithm used to compress them, so this encoder can decode
+    uncompressed payloads as well as payloads compressed using any
+    other supported algorithm.
+
+    Examples:
+
+      >>> set_encoder(CompressingEncoder(JSONEncoder(), threshold=4096))
+
+    Parameters:
+      inner(Encoder): The encoder whose payloads should be compressed.
+      threshold(int): The size (in bytes) past which payloads are
+        compressed.  Payloads that don't get any smaller when
+        compressed are always left as they are.
+      algorithm(str): One of "zlib", "bz2" or "lzma".
+    """
+
+    def __init__(self, inner: Encoder, *, threshold: int = 1024, algorithm: str = "zlib") -> None:
+        if algorithm not in COMPRESSION_ALGORITHMS:
+            raise ValueError("algorithm must be one of %s" % ", ".join(sorted(COMPRESSION_ALGORITHMS)))
+
+        self.inner = inner
+        self.threshold = threshold
+        self.algorithm = algorithm
+
+    def encode(self, data: MessageData) -> bytes:
+        return self.compress(self.inner.encode(data))
+
+    def decode(self, data: bytes) -> MessageData:
+        return self.inner.decode(self.decompress(data))
+
+    def encode_message(self, data: MessageData) -> bytes:
+        return self.compress(self.inner.encode_message(data))
+
+    def decode_message(self, data: bytes) -> MessageData:
+        return self.inner.decode_message(self.decompress(data))
+
+    def compress(self, data: bytes) -> bytes:
+        """Compress a payload if it's larger than the threshold.
+        """
+        if len(data) <= self.threshold:
+            return data
+
+        algorithm_id, compress, _ = COMPRESSION_ALGORITHMS[self.algorithm]
+        compressed_data = COMPRESSION_MARKER + algorithm_id + compress(data)
+        if len(compressed_data) >= len(data):
+            return data
+
+        return compressed_data
+
+    def decompress(self, data: bytes) -> bytes:
+        """Decompress a payload if it was compressed.
+        """
+        if not data.startswith(COMPRESSION_MARKER):
+            return data
+
+        header_size = len(COMPRESSION_MARKER) + 1
+        algorithm_id = data[len(COMPRESSION_MARKER):header_size]
+        decompressors = {tagged_id: decompress for tagged_id, _, decompress in COMPRESSION_ALGORITHMS.values()}
+        decompress = decompressors.get(algorithm_id)
+        if decompress is None:
+            raise DecodeError("unknown compression algorithm %r" % (algorithm_id,), data, None)
+
+        try:
+            return decompress(data[header_size:])
+        except (OSError, ValueError, EOFError, zlib.error, lzma.LZMAError) as e:
+            raise DecodeError("failed to decompress data", data, e) from None
@@ -20,7 +20,8 @@ class DramatiqError(Exception):  # pragma: no cover
     """Base class for all dramatiq errors.
     """
 
-    def __init__(self, message):
+    def __init__(self, message, *args):
+        super().__init__(message, *args)
         self.message = message
 
     def __str__(self):
@@ -73,10 +74,35 @@ class ConnectionClosed(ConnectionError):
     """
 
 
+class EnqueueFailed(BrokerError):
+    """Raised by :meth:`Broker.enqueue_many<dramatiq.Broker.enqueue_many>`
+    when the broker rejects some of the messages in a batch.
+
+    Attributes:
+      messages(list[Message]): The messages that were enqueued.
+      failed_messages(list[Message]): The messages that were rejected
+        and may be enqueued again.
+    """
+
+    def __init__(self, message, messages, failed_messages):
+        super().__init__(message)
+        self.messages = messages
+        self.failed_messages = failed_messages
+
+
 class RateLimitExceeded(DramatiqError):
     """Raised when a rate limit has been exceeded.
+
+    Parameters:
+      message(str): The error message.
+      key(str): The key of the rate limiter whose limit was exceeded,
+        if known.
     """
 
+    def __init__(self, message, key=None):
+        super().__init__(message, key)
+        self.key = key
+
 
 class Retry(DramatiqError):
     """Actors may raise this error when they should be retried.  This
@@ -88,6 +88,32 @@ class Message(Generic[R]):
             # primitive setattr here.  Direct assignment would fail.
             object.__setattr__(self, "args", tuple(self.args))
 
+    def __getattr__(self, name):
+        # Messages decoded by encoders that support lazy arguments
+        # start out without their args and kwargs.  Those are only
+        # decoded the first time either one of them is accessed.
+        if "_load_arguments" not in self.__dict__ or name not in ("args", "kwargs"):
+            raise AttributeError("%r object has no attribute %r" % (type(self).__name__, name))
+
+        self._decode_arguments()
+        return self.__dict__[name]
+
+    def __getstate__(self):
+        # The argument loader holds on to the encoder, which can't be
+        # pickled or copied, so lazy arguments are decoded first.
+        self._decode_arguments()
+        return self.__dict__
+
+    def _decode_arguments(self) -> None:
+        # The loader is only dropped once it succeeds so that failures
+        # are raised again on every access.
+        load_arguments = self.__dict__.get("_load_arguments")
+        if load_arguments is not None:
+            args, kwargs = load_arguments()
+            object.__setattr__(self, "args", tuple(args))
+            object.__setattr__(self, "kwargs", kwargs)
+            del self.__dict__["_load_arguments"]
+
     def __or__(self, other) -> pipeline:
         """Combine this message into a pipeline with "other".
         """
@@ -105,23 +131,33 @@ class Message(Generic[R]):
 
     @classmethod
     def decode(cls, data: bytes) -> "Message":
-        """Convert a bytestring to a message.
+        """Convert a bytestring to a message.  If the global encoder
+        supports it, the args and kwargs of the message are only
+        decoded once they are first accessed.
 
         Raises:
           DecodeError: When the decoder raises an exception while
             decoding `data`.
         """
         try:
-            fields = global_encoder.decode(data)
-            fields["args"] = tuple(fields["args"])
-            return cls(**fields)
+            fields = global_encoder.decode_message(data)
+            load_arguments = fields.pop("load_arguments", None)
+            if load_arguments is None:
+                fields["args"] = tuple(fields["args"])
+                return cls(**fields)
+
+            message = cls(args=(), kwargs={}, **fields)
+            del message.__dict__["args"]
+            del message.__dict__["kwargs"]
+            message.__dict__["_load_arguments"] = load_arguments
+            return message
         except Exception as e:
             raise DecodeError("Failed to decode message.", data, e) from e
 
     def encode(self) -> bytes:
         """Convert this message to a bytestring.
         """
-        return global_encoder.encode(self.asdict())
+        return global_encoder.encode_message(self.asdict())
 
     def copy(self, **attributes) -> "Message":
         """Create a copy of this message.
@@ -161,17 +197,46 @@ class Message(Generic[R]):
         Returns:
           object: The result.
         """
-        if backend is None:
-            broker = get_broker()
-            for middleware in broker.middleware:
-                if isinstance(middleware, Results):
-                    backend = middleware.backend
-                    break
-            else:
-                raise RuntimeError("The default broker doesn't have a results backend.")
-
+        backend = backend or self._get_result_backend()
         return backend.get_result(self, block=block, timeout=timeout)
 
+    async def get_result_async(
+        self, *,
+        backend: Optional[ResultBackend] = None,
+        block: bool = False,
+        timeout: Optional[int] = None,
+    ) -> R:
+        """Get the result associated with this message from a result
+        backend, from a coroutine.  See :meth:`get_result`.
+
+        Parameters:
+          backend(ResultBackend): The result backend to use to get the
+            result.  If omitted, this method will try to find and use
+            the result backend on the default broker instance.
+          block(bool): Whether or not to wait for a result.
+          timeout(int): The maximum amount of time, in ms, to wait for
+            a result.
+
+        Raises:
+          RuntimeError: If there is no result backend on the default
+            broker.
+          ResultMissing: When block is False and the result isn't set.
+          ResultTimeout: When waiting for a result times out.
+
+        Returns:
+          object: The result.
+        """
+        backend = backend or self._get_result_backend()
+        return await backend.get_result_async(self, block=block, timeout=timeout)
+
+    def _get_result_backend(self) -> ResultBackend:
+        broker = get_broker()
+        for middleware in broker.middleware:
+            if isinstance(middleware, Results):
+                return middleware.backend
+
+        raise RuntimeError("The default broker doesn't have a results backend.")
+
     def __str__(self) -> str:
         params = ", ".join(repr(arg) for arg in self.args)
         if self.kwargs:
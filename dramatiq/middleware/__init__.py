@@ -16,7 +16,9 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 from .age_limit import AgeLimit
+from .asyncio import AsyncIO
 from .callbacks import Callbacks
+from .claim_check import BlobStore, ClaimCheck, ClaimCheckEncoder, FileSystemBlobStore
 from .current_message import CurrentMessage
 from .group_callbacks import GroupCallbacks
 from .middleware import Middleware, MiddlewareError, SkipMessage
@@ -35,9 +37,12 @@ __all__ = [
     "Interrupt", "raise_thread_exception",
 
     # Middlewares
-    "AgeLimit", "Callbacks", "CurrentMessage", "GroupCallbacks", "Pipelines", "Retries",
+    "AgeLimit", "AsyncIO", "Callbacks", "CurrentMessage", "GroupCallbacks", "Pipelines", "Retries",
     "Shutdown", "ShutdownNotifications", "TimeLimit", "TimeLimitExceeded",
     "Prometheus",
+
+    # Claim checks
+    "BlobStore", "ClaimCheck", "ClaimCheckEncoder", "FileSystemBlobStore",
 ]
 
 
@@ -0,0 +1,63 @@
+# This file is a part of Dramatiq.
+#
+# Copyright (C) 2017,2018 CLEARTYPE SRL <bogdan@cleartype.io>
+#
+# Dramatiq is free software; you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or (at
+# your option) any later version.
+#
+# Dramatiq is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU Lesser General Public
+# License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from ..asyncio import EventLoopThread, get_event_loop_thread, set_event_loop_thread
+from ..logging import get_logger
+from .middleware import Middleware
+
+
+class AsyncIO(Middleware):
+    """Middleware that runs ``async`` actors on an event loop thread
+    owned by the worker process.  Worker threads hand the coroutines
+    of those actors off to the event loop and move on to other
+    messages, so a handful of worker threads can keep many IO-bound
+    coroutines running at once.  The acking and nacking of those
+    messages happens on a separate pool of threads once they're done.
+
+    Without this middleware, every call to an ``async`` actor blocks
+    a worker thread until the actor is done.
+
+    Note:
+      The number of async messages that can be in flight at once is
+      bounded by each queue's prefetch.  Raise the prefetch with
+      ``dramatiq_queue_prefetch`` or let it grow by turning on adaptive
+      prefetch to run more coroutines concurrently.
+
+    Example:
+      >>> broker.add_middleware(AsyncIO())
+      >>> @dramatiq.actor
+      ... async def fetch(url):
+      ...     ...
+    """
+
+    def __init__(self):
+        self.logger = get_logger(__name__, type(self))
+
+    def before_worker_boot(self, broker, worker):
+        event_loop_thread = EventLoopThread()
+        event_loop_thread.start()
+        set_event_loop_thread(event_loop_thread)
+
+    def after_worker_shutdown(self, broker, worker):
+        event_loop_thread = get_event_loop_thread()
+        if event_loop_thread is None:
+            return
+
+        self.logger.debug("Stopping event loop thread...")
+        set_event_loop_thread(None)
+        event_loop_thread.stop()
+        event_loop_thread.join()
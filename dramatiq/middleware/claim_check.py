@@ -0,0 +1,285 @@
+# This file is a part of Dramatiq.
+#
+# Copyright (C) 2017,2018 CLEARTYPE SRL <bogdan@cleartype.io>
+#
+# Dramatiq is free software; you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or (at
+# your option) any later version.
+#
+# Dramatiq is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU Lesser General Public
+# License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import abc
+import functools
+import os
+import tempfile
+import time
+from threading import Lock
+from typing import Optional
+from uuid import uuid4
+
+from ..encoder import Encoder, MessageData
+from ..errors import DecodeError
+from ..logging import get_logger
+from .middleware import Middleware
+
+#: The amount of time in milliseconds that the arguments of acked
+#: messages are kept around for.  Messages whose acks are lost (eg.
+#: because their worker died before flushing them) are redelivered and
+#: still need their arguments.
+DEFAULT_ACK_GRACE_TTL = 600000
+
+#: The amount of time in milliseconds that the arguments of
+#: dead-lettered messages are kept around for, unless the broker says
+#: otherwise.
+DEFAULT_DEAD_MESSAGE_TTL = 86400000 * 7
+
+
+class BlobStore(abc.ABC):
+    """Base class for the stores that ClaimCheckEncoder offloads
+    message arguments to.
+    """
+
+    @abc.abstractmethod
+    def put(self, key: str, data: bytes) -> None:  # pragma: no cover
+        """Store a blob, replacing any existing blob with the same key.
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def get(self, key: str) -> bytes:  # pragma: no cover
+        """Get a blob.
+
+        Raises:
+          KeyError: If the blob doesn't exist.
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def delete(self, key: str) -> None:  # pragma: no cover
+        """Delete a blob.  Has no effect if the blob doesn't exist.
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def expire(self, key: str, ttl: int) -> None:  # pragma: no cover
+        """Delete a blob once some time has passed.  The blob must
+        remain readable until then.  Calling this again for the same
+        blob replaces its previous expiration.
+
+        Parameters:
+          key(str): The key of the blob.
+          ttl(int): The amount of time in milliseconds to keep the
+            blob around for.
+        """
+        raise NotImplementedError
+
+
+class FileSystemBlobStore(BlobStore):
+    """A blob store that keeps each blob in a file inside a directory.
+    All the processes that enqueue or consume offloaded messages must
+    have access to that directory.
+
+    Expirations are recorded as empty marker files whose modification
+    times are the times their blobs expire at.  Expired blobs are
+    deleted whenever blobs are expired, at most once every
+    ``sweep_interval`` milliseconds.
+
+    Parameters:
+      path(str): The directory to store blobs in.  It's created if it
+        doesn't exist.
+      sweep_interval(int): The min amount of time in milliseconds
+        between sweeps for expired blobs.
+    """
+
+    def __init__(self, path: str, *, sweep_interval: int = 60000) -> None:
+        self.path = path
+        self.expirations_path = os.path.join(path, ".expirations")
+        self.sweep_interval = sweep_interval
+        self.sweep_deadline = 0.0
+        self.sweep_mutex = Lock()
+        os.makedirs(self.expirations_path, exist_ok=True)
+
+    def put(self, key: str, data: bytes) -> None:
+        # Blobs are written to a temporary file first so that readers
+        # never see partially-written blobs.
+        fd, temp_filename = tempfile.mkstemp(dir=self.path, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(temp_filename, self._get_filename(key))
+        except BaseException:
+            os.unlink(temp_filename)
+            raise
+
+    def get(self, key: str) -> bytes:
+        try:
+            with open(self._get_filename(key), "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            raise KeyError(key) from None
+
+    def delete(self, key: str) -> None:
+        for filename in (self._get_filename(key), os.path.join(self.expirations_path, key)):
+            try:
+                os.unlink(filename)
+            except FileNotFoundError:
+                pass
+
+    def expire(self, key: str, ttl: int) -> None:
+        marker_filename = os.path.join(self.expirations_path, self._get_key(key))
+        expires_at = time.time() + ttl / 1000
+        with open(marker_filename, "wb"):
+            pass
+        os.utime(marker_filename, (expires_at, expires_at))
+        self._sweep()
+
+    def _sweep(self):
+        now = time.monotonic()
+        with self.sweep_mutex:
+            if now < self.sweep_deadline:
+                return
+            self.sweep_deadline = now + self.sweep_interval / 1000
+
+        timestamp = time.time()
+        with os.scandir(self.expirations_path) as entries:
+            for entry in entries:
+                try:
+                    if entry.stat().st_mtime <= timestamp:
+                        self.delete(entry.name)
+                except FileNotFoundError:
+                    pass
+
+    def _get_key(self, key):
+        if not key or os.path.basename(key) != key or key.startswith("."):
+            raise ValueError("invalid blob key %r" % key)
+        return key
+
+    def _get_filename(self, key):
+        return os.path.join(self.path, self._get_key(key))
+
+
+class ClaimCheckEncoder(Encoder):
+    """Offloads the arguments of large messages to a blob store so
+    that only a reference to them is sent through the broker.  The
+    arguments of those messages are loaded from the store the first
+    time they're accessed, typically right before their actor is
+    called.  Every time a message is encoded, its arguments are
+    offloaded to a new blob, so retries and copies of a message never
+    share blobs.  Use this together with the :class:`ClaimCheck`
+    middleware, which expires offloaded arguments once their messages
+    have been acknowledged or dead-lettered.
+
+    Examples:
+
+      >>> store = FileSystemBlobStore("/var/lib/dramatiq/blobs")
+      >>> set_encoder(ClaimCheckEncoder(JSONEncoder(), store))
+      >>> broker.add_middleware(ClaimCheck(store))
+
+    Parameters:
+      inner(Encoder): The encoder used to encode messages and their
+        offloaded arguments.
+      store(BlobStore): The store to offload arguments to.
+      threshold(int): The size (in bytes) of the encoded message
+        past which its arguments are offloaded.
+    """
+
+    def __init__(self, inner: Encoder, store: BlobStore, *, threshold: int = 65536) -> None:
+        self.inner = inner
+        self.store = store
+        self.threshold = threshold
+
+    def encode(self, data: MessageData) -> bytes:
+        return self.inner.encode(data)
+
+    def decode(self, data: bytes) -> MessageData:
+        return self.inner.decode(data)
+
+    def encode_message(self, data: MessageData) -> bytes:
+        encoded_message = self.inner.encode_message(data)
+        if len(encoded_message) <= self.threshold:
+            return encoded_message
+
+        key = str(uuid4())
+        self.store.put(key, self.inner.encode([data["args"], data["kwargs"]]))
+
+        fields = {name: value for name, value in data.items() if name not in ("args", "kwargs")}
+        fields["options"] = {**data["options"], "claim_check": key}
+        return self.inner.encode(fields)
+
+    def decode_message(self, data: bytes) -> MessageData:
+        fields = self.inner.decode_message(data)
+        key = fields.get("options", {}).get("claim_check")
+        if key is not None and "args" not in fields and "load_arguments" not in fields:
+            fields["load_arguments"] = functools.partial(self.load_arguments, key)
+        return fields
+
+    def load_arguments(self, key: str):
+        """Load the offloaded arguments of a message from the store.
+
+        Raises:
+          DecodeError: If the arguments are no longer in the store.
+
+        Returns:
+          tuple[list, dict]: The args and kwargs of the message.
+        """
+        try:
+            data = self.store.get(key)
+        except KeyError as e:
+            raise DecodeError("the arguments of message %r are missing from the blob store" % key, key, e) from None
+
+        args, kwargs = self.inner.decode(data)
+        return args, kwargs
+
+
+class ClaimCheck(Middleware):
+    """Middleware that expires the arguments offloaded by
+    :class:`ClaimCheckEncoder` once their messages have been
+    acknowledged or dead-lettered.  Arguments aren't deleted right
+    away: acks may be buffered by the broker and lost if their worker
+    dies, in which case messages are redelivered and still need their
+    arguments.  The arguments of dead-lettered messages are kept for as
+    long as the messages are kept in their dead-letter queue, so that
+    they may be requeued.
+
+    Parameters:
+      store(BlobStore): The store that arguments are offloaded to.
+      ack_grace_ttl(int): The amount of time in milliseconds to keep
+        the arguments of acked messages around for.
+      dead_message_ttl(int): The amount of time in milliseconds to
+        keep the arguments of dead-lettered messages around for.
+        Defaults to the ``dead_message_ttl`` of the broker, if it has
+        one, or to 7 days.
+    """
+
+    def __init__(
+            self, store: BlobStore, *,
+            ack_grace_ttl: int = DEFAULT_ACK_GRACE_TTL,
+            dead_message_ttl: Optional[int] = None,
+    ) -> None:
+        self.logger = get_logger(__name__, type(self))
+        self.store = store
+        self.ack_grace_ttl = ack_grace_ttl
+        self.dead_message_ttl = dead_message_ttl
+
+    def after_ack(self, broker, message):
+        self.expire_arguments(message, self.ack_grace_ttl)
+
+    def after_nack(self, broker, message):
+        dead_message_ttl = self.dead_message_ttl
+        if dead_message_ttl is None:
+            dead_message_ttl = getattr(broker, "dead_message_ttl", DEFAULT_DEAD_MESSAGE_TTL)
+
+        self.expire_arguments(message, dead_message_ttl)
+
+    def expire_arguments(self, message, ttl):
+        key = message.options.get("claim_check")
+        if key is not None:
+            self.logger.debug("Expiring the offloaded arguments of message %r in %dms.", message.message_id, ttl)
+            self.store.expire(key, ttl)
@@ -15,13 +15,13 @@
 # You should have received a copy of the GNU Lesser General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
-from threading import local
+from contextvars import ContextVar
 
 from .middleware import Middleware
 
 
 class CurrentMessage(Middleware):
-    """Middleware that exposes the current message via a thread-local
+    """Middleware that exposes the current message via a context
     variable.
 
     Example:
@@ -36,18 +36,19 @@ class CurrentMessage(Middleware):
 
     """
 
-    STATE = local()
+    MESSAGE: ContextVar = ContextVar("dramatiq_current_message", default=None)
 
     @classmethod
     def get_current_message(cls):
         """Get the message that triggered the current actor.  Messages
-        are thread local so this returns ``None`` when called outside
-        of actor code.
+        are local to the thread (or, for async actors, the task) that
+        processes them so this returns ``None`` when called outside of
+        actor code.
         """
-        return getattr(cls.STATE, "message", None)
+        return cls.MESSAGE.get()
 
     def before_process_message(self, broker, message):
-        setattr(self.STATE, "message", message)
+        self.MESSAGE.set(message)
 
     def after_process_message(self, broker, message, *, result=None, exception=None):
-        delattr(self.STATE, "message")
+        self.MESSAGE.set(None)
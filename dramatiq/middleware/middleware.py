@@ -138,6 +138,11 @@ class Middleware:
         """Called after the worker process shuts down.
         """
 
+    def after_adjust_prefetch(self, broker, queue_name, prefetch):
+        """Called after a worker running with adaptive prefetch has
+        changed the number of messages it prefetches from a queue.
+        """
+
     def before_consumer_thread_shutdown(self, broker, thread):
         """Called before a consumer thread shuts down.  This may be
         used to clean up thread-local resources (such as Django
@@ -110,6 +110,13 @@ class Prometheus(Middleware):
                      7500, 10000, 30000, 60000, 600000, 900000, float("inf")),
             registry=registry,
         )
+        self.consumer_prefetch = prom.Gauge(
+            "dramatiq_consumer_prefetch",
+            "The number of messages consumers with adaptive prefetch prefetch from each queue.",
+            ["queue_name"],
+            registry=registry,
+            multiprocess_mode="livesum",
+        )
 
     def after_worker_shutdown(self, broker, worker):
         from prometheus_client import multiprocess
@@ -117,6 +124,9 @@ class Prometheus(Middleware):
         self.logger.debug("Marking process dead...")
         multiprocess.mark_process_dead(os.getpid(), DB_PATH)
 
+    def after_adjust_prefetch(self, broker, queue_name, prefetch):
+        self.consumer_prefetch.labels(queue_name).set(prefetch)
+
     def after_nack(self, broker, message):
         labels = (message.queue_name, message.actor_name)
         self.total_rejected_messages.labels(*labels).inc()
@@ -81,7 +81,7 @@ class Retries(Middleware):
         }
 
     def after_process_message(self, broker, message, *, result=None, exception=None):
-        if exception is None:
+        if exception is None or message.deferred:
             return
 
         actor = broker.get_actor(message.actor_name)
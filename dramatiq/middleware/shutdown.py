@@ -19,6 +19,7 @@ import threading
 import warnings
 from typing import Optional, Type
 
+from ..asyncio import get_event_loop_thread
 from ..logging import get_logger
 from .middleware import Middleware
 from .threading import Interrupt, current_platform, is_gevent_active, raise_thread_exception, supported_platforms
@@ -40,6 +41,8 @@ class ShutdownNotifications(Middleware):
       that runs the actor.  This means that the exception will only get
       called the next time that thread acquires the GIL.  Concretely,
       this means that this middleware can't cancel system calls.
+      Async actors that run on the event loop thread are cancelled
+      instead, and :class:`Shutdown` is raised in their place.
 
     Parameters:
       notify_shutdown(bool): When true, the actor will be interrupted
@@ -49,6 +52,7 @@ class ShutdownNotifications(Middleware):
     def __init__(self, notify_shutdown=False):
         self.logger = get_logger(__name__, type(self))
         self.notify_shutdown = notify_shutdown
+        self.async_notifications = set()
         if is_gevent_active():
             self.manager = _GeventShutdownManager(self.logger)
         else:
@@ -75,14 +79,26 @@ class ShutdownNotifications(Middleware):
         self.logger.debug("Sending shutdown notification to worker threads...")
         self.manager.shutdown()
 
+        event_loop_thread = get_event_loop_thread()
+        if event_loop_thread is not None:
+            for key in list(self.async_notifications):
+                event_loop_thread.interrupt(key, Shutdown)
+
     def before_process_message(self, broker, message):
         actor = broker.get_actor(message.actor_name)
 
         if self.should_notify(actor, message):
-            self.manager.add_notification()
+            if actor.is_async and get_event_loop_thread() is not None:
+                self.async_notifications.add(id(message))
+            else:
+                self.manager.add_notification()
 
     def after_process_message(self, broker, message, *, result=None, exception=None):
-        self.manager.remove_notification()
+        actor = broker.get_actor(message.actor_name)
+        if actor.is_async and get_event_loop_thread() is not None:
+            self.async_notifications.discard(id(message))
+        else:
+            self.manager.remove_notification()
 
     after_skip_message = after_process_message
 
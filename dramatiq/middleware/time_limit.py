@@ -21,6 +21,7 @@ from threading import Thread
 from time import monotonic, sleep
 from typing import TYPE_CHECKING, Optional
 
+from ..asyncio import get_event_loop_thread
 from ..logging import get_logger
 from .middleware import Middleware
 from .threading import Interrupt, current_platform, is_gevent_active, raise_thread_exception, supported_platforms
@@ -44,6 +45,8 @@ class TimeLimit(Middleware):
       that runs the actor.  This means that the exception will only get
       called the next time that thread acquires the GIL.  Concretely,
       this means that this middleware can't cancel system calls.
+      Async actors that run on the event loop thread are cancelled
+      instead, and :class:`TimeLimitExceeded` is raised in their place.
 
     Parameters:
       time_limit(float): The maximum number of milliseconds actors may
@@ -78,10 +81,19 @@ class TimeLimit(Middleware):
     def before_process_message(self, broker, message):
         actor = broker.get_actor(message.actor_name)
         limit = message.options.get("time_limit") or actor.options.get("time_limit", self.time_limit)
-        self.manager.add_timeout(threading.get_ident(), limit)
+        event_loop_thread = get_event_loop_thread() if actor.is_async else None
+        if event_loop_thread is None:
+            self.manager.add_timeout(threading.get_ident(), limit)
+        elif limit != float("inf"):
+            event_loop_thread.interrupt_after(id(message), limit / 1000, TimeLimitExceeded)
 
     def after_process_message(self, broker, message, *, result=None, exception=None):
-        self.manager.remove_timeout(threading.get_ident())
+        actor = broker.get_actor(message.actor_name)
+        event_loop_thread = get_event_loop_thread() if actor.is_async else None
+        if event_loop_thread is None:
+            self.manager.remove_timeout(threading.get_ident())
+        else:
+            event_loop_thread.cancel_interrupts(id(message))
 
     after_skip_message = after_process_message
 
@@ -19,10 +19,11 @@ from .backend import RateLimiterBackend
 from .barrier import Barrier
 from .bucket import BucketRateLimiter
 from .concurrent import ConcurrentRateLimiter
+from .gcra import GCRARateLimiter
 from .rate_limiter import RateLimiter, RateLimitExceeded
 from .window import WindowRateLimiter
 
 __all__ = [
     "RateLimiterBackend", "RateLimiter", "RateLimitExceeded", "Barrier",
-    "BucketRateLimiter", "ConcurrentRateLimiter", "WindowRateLimiter",
+    "BucketRateLimiter", "ConcurrentRateLimiter", "GCRARateLimiter", "WindowRateLimiter",
 ]
@@ -63,14 +63,42 @@ class RateLimiterBackend:
         """
         raise NotImplementedError
 
+    def decr_and_notify(self, key, amount, minimum, ttl, *, events, waiters):
+        """Atomically decrement a key and wake up a single party
+        wait()ing on the events key with `consume` set.  An event is
+        only published while there are fewer pending events than the
+        waiters counted by the waiters key, so events don't pile up
+        when nobody is waiting.
+
+        The default implementation decrements the key and then calls
+        :meth:`wait_notify` with the events key.
+
+        Parameters:
+          key(str): The key to decrement.
+          amount(int): The amount to decrement the value by.
+          minimum(int): The minimum amount the value can have.
+          ttl(int): The max amount of time in milliseconds the keys can
+            live in the backend for.
+          events(str): The key to publish the event to.
+          waiters(str): The key counting the parties waiting for events.
+
+        Returns:
+          bool: True if the key was successfully decremented.
+        """
+        decremented = self.decr(key, amount, minimum, ttl)
+        if decremented:
+            self.wait_notify(events, ttl)
+        return decremented
+
     def incr_and_sum(self, key, keys, amount, maximum, ttl):  # pragma: no cover
         """Atomically increment a key unless the sum of keys is greater
         than the given maximum.
 
         Parameters:
           key(str): The key to increment.
-          keys(callable): A callable to return the list of keys to be
-            summed over.
+          keys(list[str]): The keys to be summed over.  Callables that
+            return the list of keys are also accepted for backwards
+            compatibility.
           amount(int): The amount to decrement the value by.
           maximum(int): The maximum sum of the keys.
           ttl(int): The max amount of time in milliseconds the key can
@@ -81,7 +109,26 @@ class RateLimiterBackend:
         """
         raise NotImplementedError
 
-    def wait(self, key, timeout):  # pragma: no cover
+    def gcra(self, key, now, interval, tolerance):  # pragma: no cover
+        """Atomically advance the theoretical arrival time stored at a
+        key by the given interval, unless it's already further ahead
+        of the current time than the given tolerance.  Missing and past
+        arrival times are treated as the current time.
+
+        Parameters:
+          key(str): The key holding the arrival time.
+          now(float): The current time in milliseconds.
+          interval(float): The amount of time in milliseconds to
+            advance the arrival time by.
+          tolerance(float): The max amount of time in milliseconds the
+            arrival time may be ahead of the current time.
+
+        Returns:
+          bool: True if the arrival time was advanced.
+        """
+        raise NotImplementedError
+
+    def wait(self, key, timeout, *, consume=False):  # pragma: no cover
         """Wait until an event is published to the given key or the
         timeout expires.  This is used to implement efficient blocking
         against a synchronized resource.
@@ -89,6 +136,10 @@ class RateLimiterBackend:
         Parameters:
           key(str): The key to wait on.
           timeout(int): The timeout in milliseconds.
+          consume(bool): Whether or not to consume the event so that
+            each event wakes up a single waiter, in the order they
+            started waiting in.  Otherwise, an event wakes up every
+            waiter.
 
         Returns:
           bool: True if en event was published before the timeout.
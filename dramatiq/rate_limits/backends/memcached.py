@@ -15,6 +15,8 @@
 # You should have received a copy of the GNU Lesser General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+import math
+
 from pylibmc import Client, ClientPool, NotFound
 
 from ..backend import RateLimiterBackend
@@ -50,7 +52,14 @@ class MemcachedBackend(RateLimiterBackend):
 
     def incr(self, key, amount, maximum, ttl):
         with self.pool.reserve(block=True) as client:
-            return client.incr(key, amount) <= maximum
+            if client.incr(key, amount) <= maximum:
+                return True
+
+            # Memcached can't bound increments so ones that overshoot
+            # the maximum are rolled back.  Otherwise, a failed block
+            # reserve would use up permits that were never handed out.
+            client.decr(key, amount)
+            return False
 
     def decr(self, key, amount, minimum, ttl):
         with self.pool.reserve(block=True) as client:
@@ -83,3 +92,25 @@ class MemcachedBackend(RateLimiterBackend):
                         return True
                 except NotFound:  # pragma: no cover
                     continue
+
+    def gcra(self, key, now, interval, tolerance):
+        with self.pool.reserve(block=True) as client:
+            while True:
+                tat, cid = client.gets(key)
+                tat = max(tat or now, now)
+                if tat - now > tolerance:
+                    return False
+
+                new_tat = tat + interval
+                ttl = math.ceil((new_tat - now) / 1000)
+                if cid is None:
+                    if client.add(key, new_tat, time=ttl):
+                        return True
+                    continue
+
+                try:
+                    swapped = client.cas(key, new_tat, cid, ttl)
+                    if swapped:
+                        return True
+                except NotFound:  # pragma: no cover
+                    continue
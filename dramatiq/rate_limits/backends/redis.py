@@ -15,13 +15,19 @@
 # You should have received a copy of the GNU Lesser General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+import glob
+import math
+from os import path
+
 import redis
 
 from ..backend import RateLimiterBackend
 
 
 class RedisBackend(RateLimiterBackend):
-    """A rate limiter backend for Redis_.
+    """A rate limiter backend for Redis_.  Atomic operations are
+    implemented as Lua scripts so that each of them takes a single
+    round trip, regardless of how many processes contend for a key.
 
     Parameters:
       client(Redis): An optional client.  If this is passed,
@@ -40,70 +46,36 @@ class RedisBackend(RateLimiterBackend):
 
         # TODO: Replace usages of StrictRedis (redis-py 2.x) with Redis in Dramatiq 2.0.
         self.client = client or redis.StrictRedis(**parameters)
+        self.scripts = {name: self.client.register_script(script) for name, script in _scripts.items()}
 
     def add(self, key, value, ttl):
         return bool(self.client.set(key, value, px=ttl, nx=True))
 
     def incr(self, key, amount, maximum, ttl):
-        with self.client.pipeline() as pipe:
-            while True:
-                try:
-                    pipe.watch(key)
-                    value = int(pipe.get(key) or b"0")
-                    value += amount
-                    if value > maximum:
-                        return False
-
-                    pipe.multi()
-                    pipe.set(key, value, px=ttl)
-                    pipe.execute()
-                    return True
-                except redis.WatchError:
-                    continue
+        return self.scripts["incr"](args=[amount, maximum, ttl], keys=[key]) == 1
 
     def decr(self, key, amount, minimum, ttl):
-        with self.client.pipeline() as pipe:
-            while True:
-                try:
-                    pipe.watch(key)
-                    value = int(pipe.get(key) or b"0")
-                    value -= amount
-                    if value < minimum:
-                        return False
-
-                    pipe.multi()
-                    pipe.set(key, value, px=ttl)
-                    pipe.execute()
-                    return True
-                except redis.WatchError:
-                    continue
+        return self.scripts["decr"](args=[amount, minimum, ttl], keys=[key]) == 1
+
+    def decr_and_notify(self, key, amount, minimum, ttl, *, events, waiters):
+        return self.scripts["decr"](args=[amount, minimum, ttl], keys=[key, events, waiters]) == 1
 
     def incr_and_sum(self, key, keys, amount, maximum, ttl):
-        with self.client.pipeline() as pipe:
-            while True:
-                try:
-                    # TODO: Drop non-callable keys in Dramatiq v2.
-                    key_list = keys() if callable(keys) else keys
-                    pipe.watch(key, *key_list)
-                    value = int(pipe.get(key) or b"0")
-                    value += amount
-                    if value > maximum:
-                        return False
-
-                    # Fetch keys again to account for net/server latency.
-                    values = pipe.mget(keys() if callable(keys) else keys)
-                    total = amount + sum(int(n) for n in values if n)
-                    if total > maximum:
-                        return False
-
-                    pipe.multi()
-                    pipe.set(key, value, px=ttl)
-                    pipe.execute()
-                    return True
-                except redis.WatchError:
-                    continue
-
-    def wait(self, key, timeout):
+        # TODO: Drop non-callable keys in Dramatiq v2.
+        key_list = keys() if callable(keys) else keys
+        return self.scripts["incr_and_sum"](args=[amount, maximum, ttl], keys=[key, *key_list]) == 1
+
+    def gcra(self, key, now, interval, tolerance):
+        return self.scripts["gcra"](args=[now, interval, tolerance], keys=[key]) == 1
+
+    def wait(self, key, timeout, *, consume=False):
+        if consume:
+            # Redis serves clients blocked on a list in the order they
+            # blocked in, so events are handed out fairly.  Timeouts
+            # are rounded up to the nearest second.
+            event = self.client.blpop(key, math.ceil((timeout or 0) / 1000))
+            return event is not None
+
         assert timeout is None or timeout >= 1000, "wait timeouts must be >= 1000"
         event = self.client.brpoplpush(key, key, (timeout or 0) // 1000)
         return event == b"x"
@@ -113,3 +85,11 @@ class RedisBackend(RateLimiterBackend):
             pipe.rpush(key, b"x")
             pipe.pexpire(key, ttl)
             pipe.execute()
+
+
+_scripts = {}
+_scripts_path = path.join(path.abspath(path.dirname(__file__)), "redis")
+for filename in glob.glob(path.join(_scripts_path, "*.lua")):
+    script_name, _ = path.splitext(path.basename(filename))
+    with open(filename, "rb") as f:
+        _scripts[script_name] = f.read()
@@ -0,0 +1,44 @@
+-- This file is a part of Dramatiq.
+--
+-- Copyright (C) 2020 CLEARTYPE SRL <bogdan@cleartype.io>
+--
+-- Dramatiq is free software; you can redistribute it and/or modify it
+-- under the terms of the GNU Lesser General Public License as published by
+-- the Free Software Foundation, either version 3 of the License, or (at
+-- your option) any later version.
+--
+-- Dramatiq is distributed in the hope that it will be useful, but WITHOUT
+-- ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+-- FITNESS FOR A PARTICULAR PURPOSE. See the GNU Lesser General Public
+-- License for more details.
+--
+-- You should have received a copy of the GNU Lesser General Public License
+-- along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+-- luacheck: globals ARGV KEYS redis
+-- gcra(
+--   args=[now, interval, tolerance],
+--   keys=[key]
+-- )
+--
+-- Advances the theoretical arrival time stored at a key by some
+-- interval, unless it's already more than tolerance milliseconds
+-- ahead of now.  Returns 1 if the arrival time was advanced, 0
+-- otherwise.
+
+local key = KEYS[1]
+
+local now = tonumber(ARGV[1])
+local interval = tonumber(ARGV[2])
+local tolerance = tonumber(ARGV[3])
+
+local tat = math.max(tonumber(redis.call("get", key) or now), now)
+if tat - now > tolerance then
+    return 0
+end
+
+-- Arrival times are formatted explicitly since Lua would otherwise
+-- round them to 14 significant digits.
+local new_tat = tat + interval
+redis.call("set", key, string.format("%.3f", new_tat), "px", math.ceil(new_tat - now))
+return 1
@@ -16,7 +16,7 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 import time
-from collections import defaultdict
+from collections import Counter, defaultdict
 from threading import Condition, Lock
 
 from ..backend import RateLimiterBackend
@@ -30,6 +30,7 @@ class StubBackend(RateLimiterBackend):
         self.conditions = defaultdict(lambda: Condition(self.mutex))
         self.mutex = Lock()
         self.db = {}
+        self.events = Counter()
 
     def add(self, key, value, ttl):
         with self.mutex:
@@ -55,6 +56,19 @@ class StubBackend(RateLimiterBackend):
 
             return self._put(key, value, ttl)
 
+    def decr_and_notify(self, key, amount, minimum, ttl, *, events, waiters):
+        cond = self.conditions[events]
+        with cond:
+            value = self._get(key, default=0) - amount
+            if value < minimum:
+                return False
+
+            if self.events[events] < self._get(waiters, default=0):
+                self.events[events] += 1
+                cond.notify_all()
+
+            return self._put(key, value, ttl)
+
     def incr_and_sum(self, key, keys, amount, maximum, ttl):
         self.add(key, 0, ttl)
         with self.mutex:
@@ -71,14 +85,30 @@ class StubBackend(RateLimiterBackend):
 
             return self._put(key, value, ttl)
 
-    def wait(self, key, timeout):
+    def gcra(self, key, now, interval, tolerance):
+        with self.mutex:
+            tat = max(self._get(key, default=now), now)
+            if tat - now > tolerance:
+                return False
+
+            return self._put(key, tat + interval, tat + interval - now)
+
+    def wait(self, key, timeout, *, consume=False):
         cond = self.conditions[key]
         with cond:
-            return cond.wait(timeout=timeout / 1000)
+            if not consume:
+                return cond.wait(timeout=timeout / 1000)
+
+            if not cond.wait_for(lambda: self.events[key], timeout=timeout and timeout / 1000):
+                return False
+
+            self.events[key] -= 1
+            return True
 
     def wait_notify(self, key, ttl):
         cond = self.conditions[key]
         with cond:
+            self.events[key] += 1
             cond.notify_all()
 
     def _get(self, key, *, default=None):
@@ -15,6 +15,9 @@
 # You should have received a copy of the GNU Lesser General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+import sys
+import time
+
 from .rate_limiter import RateLimiter
 
 
@@ -27,6 +30,13 @@ class ConcurrentRateLimiter(RateLimiter):
       You can use a concurrent rate limiter of size 1 to get a
       distributed mutex.
 
+    Warning:
+
+      Blocking acquires are currently only supported by the stub and
+      Redis backends.  Waiters are woken up one at a time as slots are
+      released.  The Redis backend rounds timeouts up to the nearest
+      second.
+
     Parameters:
       backend(RateLimiterBackend): The backend to use.
       key(str): The key to rate limit on.
@@ -38,6 +48,8 @@ class ConcurrentRateLimiter(RateLimiter):
         assert limit >= 1, "limit must be positive"
 
         super().__init__(backend, key)
+        self.key_events = key + "@events"
+        self.key_waiters = key + "@waiters"
         self.limit = limit
         self.ttl = ttl
 
@@ -48,5 +60,37 @@ class ConcurrentRateLimiter(RateLimiter):
 
         return self.backend.incr(self.key, 1, maximum=self.limit, ttl=self.ttl)
 
+    def _acquire_blocking(self, timeout):
+        deadline = timeout is not None and time.monotonic() + timeout / 1000
+        if self._acquire():
+            return True
+
+        # Releases only publish events while someone is waiting for
+        # them, so waiters have to register before they retry.  The
+        # registration is refreshed after every wait so that it can't
+        # expire while we're waiting, which is also why no single wait
+        # lasts longer than half the TTL.
+        self.backend.incr(self.key_waiters, 1, maximum=sys.maxsize, ttl=self.ttl)
+        try:
+            while not self._acquire():
+                wait = max(self.ttl // 2, 1)
+                if deadline:
+                    remaining = int((deadline - time.monotonic()) * 1000)
+                    if remaining <= 0:
+                        return False
+
+                    wait = min(wait, remaining)
+
+                self.backend.wait(self.key_events, wait, consume=True)
+                self.backend.incr(self.key_waiters, 0, maximum=sys.maxsize, ttl=self.ttl)
+
+            return True
+        finally:
+            self.backend.decr(self.key_waiters, 1, minimum=0, ttl=self.ttl)
+
     def _release(self):
-        return self.backend.decr(self.key, 1, minimum=0, ttl=self.ttl)
+        return self.backend.decr_and_notify(
+            self.key, 1, minimum=0, ttl=self.ttl,
+            events=self.key_events,
+            waiters=self.key_waiters,
+        )
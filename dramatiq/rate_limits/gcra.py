@@ -0,0 +1,72 @@
+# This file is a part of Dramatiq.
+#
+# Copyright (C) 2017,2018,2019,2020 CLEARTYPE SRL <bogdan@cleartype.io>
+#
+# Dramatiq is free software; you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or (at
+# your option) any later version.
+#
+# Dramatiq is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU Lesser General Public
+# License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+import time
+
+from .rate_limiter import RateLimiter
+
+
+class GCRARateLimiter(RateLimiter):
+    """A rate limiter that spaces operations out evenly using the
+    `generic cell rate algorithm`_.  Each key is stored as a single
+    value holding its theoretical arrival time and every acquire is a
+    single atomic backend operation.
+
+    Unlike |BucketRateLimiter|, it doesn't allow bursts at bucket
+    boundaries and, unlike |WindowRateLimiter|, its cost doesn't grow
+    with the size of its period.
+
+    Examples:
+
+      Up to 10 operations every second, spaced 100ms apart:
+
+      >>> GCRARateLimiter(backend, "some-key", limit=10, period=1_000)
+
+      Up to 10 operations every second, any 5 of which may happen
+      back to back:
+
+      >>> GCRARateLimiter(backend, "some-key", limit=10, period=1_000, burst=5)
+
+    Parameters:
+      backend(RateLimiterBackend): The backend to use.
+      key(str): The key to rate limit on.
+      limit(int): The maximum number of operations per period per key.
+      period(int): The period in milliseconds.
+      burst(int): The maximum number of operations that may happen
+        back to back, without being spaced out.
+
+    .. _generic cell rate algorithm: https://en.wikipedia.org/wiki/Generic_cell_rate_algorithm
+    .. |BucketRateLimiter| replace:: :class:`BucketRateLimiter<dramatiq.rate_limits.BucketRateLimiter>`
+    .. |WindowRateLimiter| replace:: :class:`WindowRateLimiter<dramatiq.rate_limits.WindowRateLimiter>`
+    """
+
+    def __init__(self, backend, key, *, limit=1, period=1000, burst=1):
+        assert limit >= 1, "limit must be positive"
+        assert period >= 1, "period must be positive"
+        assert burst >= 1, "burst must be positive"
+
+        super().__init__(backend, key)
+        self.limit = limit
+        self.period = period
+        self.burst = burst
+        self.interval = period / limit
+        self.tolerance = self.interval * (burst - 1)
+
+    def _acquire(self):
+        return self.backend.gcra(self.key, time.time() * 1000, self.interval, self.tolerance)
+
+    def _release(self):
+        pass
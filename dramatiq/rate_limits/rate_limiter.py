@@ -16,6 +16,7 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 from contextlib import contextmanager
+from threading import Lock
 
 from ..errors import RateLimitExceeded
 
@@ -49,11 +50,14 @@ class RateLimiter:
     def _acquire(self):  # pragma: no cover
         raise NotImplementedError
 
+    def _acquire_blocking(self, timeout):
+        raise NotImplementedError("%s doesn't support blocking acquires." % type(self).__name__)
+
     def _release(self):  # pragma: no cover
         raise NotImplementedError
 
     @contextmanager
-    def acquire(self, *, raise_on_failure=True):
+    def acquire(self, *, raise_on_failure=True, block=False, timeout=None):
         """Attempt to acquire a slot under this rate limiter.
 
         Parameters:
@@ -61,18 +65,82 @@ class RateLimiter:
             exception.  If this is false, the context manager will instead
             return a boolean value representing whether or not the rate
             limit slot was acquired.
+          block(bool): Whether or not to wait for a slot to be released
+            when none are available.  Only supported by
+            |ConcurrentRateLimiter|.
+          timeout(int): The maximum number of milliseconds to wait for
+            a slot.  Waits forever by default.
 
         Returns:
           bool: Whether or not the slot could be acquired.
+
+        .. |ConcurrentRateLimiter| replace:: :class:`ConcurrentRateLimiter<dramatiq.rate_limits.ConcurrentRateLimiter>`
         """
         acquired = False
 
         try:
-            acquired = self._acquire()
+            acquired = self._acquire_blocking(timeout) if block else self._acquire()
             if raise_on_failure and not acquired:
-                raise RateLimitExceeded("rate limit exceeded for key %(key)r" % vars(self))
+                raise RateLimitExceeded("rate limit exceeded for key %(key)r" % vars(self), self.key)
 
             yield acquired
         finally:
             if acquired:
                 self._release()
+
+
+class _Lease:
+    """Permits reserved from a backend key in bulk and handed out
+    locally to the threads in the current process.
+
+    Parameters:
+      size(int): The number of permits to reserve at a time.
+    """
+
+    def __init__(self, size):
+        self.size = size
+        self.mutex = Lock()
+        self.key = None
+        self.permits = 0
+        self.exhausted = False
+        self.blocked_key = None
+
+    def take(self, key):
+        """Take a permit for the given key.  Must be called while
+        holding the mutex.
+
+        Returns:
+          bool: True if a permit was taken, False if the key was
+          exhausted and None if more permits need to be reserved.
+        """
+        if self.key != key:
+            return None
+
+        if self.permits:
+            self.permits -= 1
+            return True
+
+        return False if self.exhausted else None
+
+    def block_size(self, key):
+        """Get the number of permits to reserve for a key.  Once a
+        block reserve fails for a key, the remaining permits are
+        reserved one at a time.  Must be called while holding the
+        mutex.
+        """
+        return 1 if self.blocked_key == key else self.size
+
+    def block_failed(self, key):
+        """Record that a block reserve failed for the given key.
+        Must be called while holding the mutex.
+        """
+        self.blocked_key = key
+
+    def renew(self, key, permits):
+        """Store the permits reserved for a key, one of which is taken
+        right away, replacing any permits left over for the previous
+        key.  Must be called while holding the mutex.
+        """
+        self.key = key
+        self.permits = max(permits - 1, 0)
+        self.exhausted = permits == 0
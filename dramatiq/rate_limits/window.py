@@ -17,7 +17,7 @@
 
 import time
 
-from .rate_limiter import RateLimiter
+from .rate_limiter import RateLimiter, _Lease
 
 
 class WindowRateLimiter(RateLimiter):
@@ -37,16 +37,25 @@ class WindowRateLimiter(RateLimiter):
       limit(int): The maximum number of operations per window per key.
       window(int): The window size in *seconds*.  The wider the
         window, the more expensive it is to maintain.
+      lease(int): When set, permits are reserved from the backend in
+        blocks of this size and handed out locally, saving a round
+        trip on most acquires.  Leased permits are only valid for the
+        second they were reserved in.  Any that are left unused are
+        returned to the backend before the next block is reserved.
+        Once the backend runs out of permits, acquires fail locally
+        until the next second.
     """
 
-    def __init__(self, backend, key, *, limit=1, window=1):
+    def __init__(self, backend, key, *, limit=1, window=1, lease=None):
         assert limit >= 1, "limit must be positive"
         assert window >= 1, "window must be positive"
+        assert lease is None or lease >= 1, "lease must be positive"
 
         super().__init__(backend, key)
         self.limit = limit
         self.window = window
         self.window_millis = window * 1000
+        self.lease = lease and _Lease(min(lease, limit))
 
     def _get_keys(self):
         timestamp = int(time.time())
@@ -54,11 +63,36 @@ class WindowRateLimiter(RateLimiter):
 
     def _acquire(self):
         keys = self._get_keys()
-        return self.backend.incr_and_sum(
-            keys[0], self._get_keys, 1,
+        if self.lease is None:
+            return self._reserve(keys, 1) == 1
+
+        with self.lease.mutex:
+            taken = self.lease.take(keys[0])
+            if taken is not None:
+                return taken
+
+            # Permits left over from a previous second still count
+            # against the window so they're returned before new ones
+            # are reserved.
+            if self.lease.permits and self.lease.key in keys:
+                self.backend.decr(self.lease.key, self.lease.permits, minimum=0, ttl=self.window_millis)
+
+            size = self.lease.block_size(keys[0])
+            permits = self._reserve(keys, size)
+            if permits == 0 and size > 1:
+                self.lease.block_failed(keys[0])
+                permits = self._reserve(keys, 1)
+
+            self.lease.renew(keys[0], permits)
+            return permits > 0
+
+    def _reserve(self, keys, permits):
+        reserved = self.backend.incr_and_sum(
+            keys[0], keys, permits,
             maximum=self.limit,
             ttl=self.window_millis,
         )
+        return permits if reserved else 0
 
     def _release(self):
         pass
@@ -18,5 +18,6 @@
 from .backend import Missing, ResultBackend
 from .errors import ResultError, ResultFailure, ResultMissing, ResultTimeout
 from .middleware import Results
+from .notifier import Notifier
 
-__all__ = ["Missing", "ResultBackend", "ResultError", "ResultFailure", "ResultTimeout", "ResultMissing", "Results"]
+__all__ = ["Missing", "Notifier", "ResultBackend", "ResultError", "ResultFailure", "ResultTimeout", "ResultMissing", "Results"]
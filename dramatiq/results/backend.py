@@ -15,6 +15,8 @@
 # You should have received a copy of the GNU Lesser General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+import asyncio
+import contextlib
 import hashlib
 import time
 import typing
@@ -22,6 +24,7 @@ import typing
 from ..common import compute_backoff, q_name
 from ..encoder import Encoder
 from .errors import ResultMissing, ResultTimeout
+from .notifier import Notifier
 from .result import unwrap_result, wrap_exception, wrap_result
 
 #: The default timeout for blocking get operations in milliseconds.
@@ -48,13 +51,22 @@ class ResultBackend:
         should be stored.
       encoder(Encoder): The encoder to use when storing and retrieving
         result data.  Defaults to :class:`.JSONEncoder`.
+      notifier(Notifier): An optional notifier that wakes up blocked
+        calls to :meth:`get_result` as soon as their results are
+        stored, instead of letting them wait out their backoff.
     """
 
-    def __init__(self, *, namespace: str = "dramatiq-results", encoder: typing.Optional[Encoder] = None):
+    def __init__(
+            self, *,
+            namespace: str = "dramatiq-results",
+            encoder: typing.Optional[Encoder] = None,
+            notifier: typing.Optional[Notifier] = None,
+    ):
         from ..message import get_encoder
 
         self.namespace = namespace
         self.encoder = encoder or get_encoder()
+        self.notifier = notifier
 
     def unwrap_result(self, res):
         """Unwrap the serialized result.  Passes through to
@@ -92,23 +104,130 @@ class ResultBackend:
         end_time = time.monotonic() + timeout / 1000
         message_key = self.build_message_key(message)
 
-        attempts = 0
-        while True:
-            result = self._get(message_key)
-            if result is Missing and block:
-                attempts, delay = compute_backoff(attempts, factor=BACKOFF_FACTOR)
-                delay /= 1000
-                if time.monotonic() + delay > end_time:
-                    raise ResultTimeout(message)
+        with self._subscribe(block, message_key) as notification:
+            attempts = 0
+            while True:
+                result = self._get(message_key)
+                if result is Missing and block:
+                    attempts, delay = compute_backoff(attempts, factor=BACKOFF_FACTOR)
+                    delay /= 1000
+                    if time.monotonic() + delay > end_time:
+                        raise ResultTimeout(message)
+
+                    self._sleep(notification, delay)
+                    continue
+
+                elif result is Missing:
+                    raise ResultMissing(message)
+
+                else:
+                    return self.unwrap_result(result)
+
+    def get_results(
+            self, messages, *, block: bool = False, timeout: typing.Optional[int] = None, missing_ok: bool = False,
+    ) -> typing.List[MResult]:
+        """Get the results of many messages from the backend.  Results
+        are fetched in bulk so, depending on the backend, this takes a
+        single round trip per poll regardless of how many messages
+        there are.
 
-                time.sleep(delay)
-                continue
+        Parameters:
+          messages(Iterable[Message])
+          block(bool): Whether or not to block until all the results
+            are set.
+          timeout(int): The maximum amount of time, in ms, to wait for
+            the results when block is True.  Defaults to 10 seconds.
+          missing_ok(bool): When this is True and block is False,
+            results that aren't set are returned as :data:`Missing`
+            instead of raising.
+
+        Raises:
+          ResultMissing: When block and missing_ok are False and any
+            of the results isn't set.
+          ResultTimeout: When waiting for the results times out.
+
+        Returns:
+          list[object]: The results, in the same order as the messages.
+        """
+        if timeout is None:
+            timeout = DEFAULT_TIMEOUT
+
+        messages = list(messages)
+        end_time = time.monotonic() + timeout / 1000
+        message_keys = [self.build_message_key(message) for message in messages]
+        results = [Missing] * len(messages)
+        pending = list(range(len(messages)))
+
+        with self._subscribe(block, *message_keys) as notification:
+            attempts = 0
+            while True:
+                pending_results = self._get_many([message_keys[i] for i in pending])
+                for i, result in zip(pending, pending_results):
+                    results[i] = result
+
+                pending = [i for i in pending if results[i] is Missing]
+                if pending and block:
+                    attempts, delay = compute_backoff(attempts, factor=BACKOFF_FACTOR)
+                    delay /= 1000
+                    if time.monotonic() + delay > end_time:
+                        raise ResultTimeout(messages[pending[0]])
+
+                    self._sleep(notification, delay)
+                    continue
+
+                elif pending and not missing_ok:
+                    raise ResultMissing(messages[pending[0]])
+
+                else:
+                    return [result if result is Missing else self.unwrap_result(result) for result in results]
+
+    async def get_result_async(
+            self, message, *, block: bool = False, timeout: typing.Optional[int] = None,
+    ) -> Result:
+        """Get a result from the backend from a coroutine.  The default
+        implementation polls the backend like :meth:`get_result`, but
+        it runs :meth:`_get` on the event loop's default executor and
+        sleeps (or waits on the backend's notifier) without blocking
+        the event loop.
+
+        Parameters:
+          message(Message)
+          block(bool): Whether or not to wait until a result is set.
+          timeout(int): The maximum amount of time, in ms, to wait for
+            a result when block is True.  Defaults to 10 seconds.
+
+        Raises:
+          ResultMissing: When block is False and the result isn't set.
+          ResultTimeout: When waiting for a result times out.
+
+        Returns:
+          object: The result.
+        """
+        if timeout is None:
+            timeout = DEFAULT_TIMEOUT
+
+        loop = asyncio.get_running_loop()
+        end_time = time.monotonic() + timeout / 1000
+        message_key = self.build_message_key(message)
+
+        async with self._subscribe_async(block, message_key) as notification:
+            attempts = 0
+            while True:
+                result = await loop.run_in_executor(None, self._get, message_key)
+                if result is Missing and block:
+                    attempts, delay = compute_backoff(attempts, factor=BACKOFF_FACTOR)
+                    delay /= 1000
+                    if time.monotonic() + delay > end_time:
+                        raise ResultTimeout(message)
 
-            elif result is Missing:
-                raise ResultMissing(message)
+                    await self._sleep_async(notification, delay)
+                    continue
 
-            else:
-                return self.unwrap_result(result)
+                elif result is Missing:
+                    raise ResultMissing(message)
+
+                else:
+                    return self.unwrap_result(result)
 
     def store_result(self, message, result: Result, ttl: int) -> None:
         """Store a result in the backend.
@@ -120,7 +239,9 @@ class ResultBackend:
             stored in the backend for.
         """
         message_key = self.build_message_key(message)
-        return self._store(message_key, wrap_result(result), ttl)
+        self._store(message_key, wrap_result(result), ttl)
+        if self.notifier is not None:
+            self.notifier.notify(message_key)
 
     def store_exception(self, message, exception: Exception, ttl: int) -> None:
         """Store an exception in the backend.
@@ -132,7 +253,9 @@ class ResultBackend:
             stored in the backend for.
         """
         message_key = self.build_message_key(message)
-        return self._store(message_key, wrap_exception(exception), ttl)
+        self._store(message_key, wrap_exception(exception), ttl)
+        if self.notifier is not None:
+            self.notifier.notify(message_key)
 
     def build_message_key(self, message) -> str:
         """Given a message, return its globally-unique key.
@@ -151,6 +274,36 @@ class ResultBackend:
         }
         return hashlib.md5(message_key.encode("utf-8")).hexdigest()
 
+    def _subscribe(self, block, *message_keys):
+        # Waiters have to subscribe before they first check on their
+        # results, otherwise results that are stored in between would
+        # go unnoticed until the next poll.
+        if block and self.notifier is not None:
+            return self.notifier.subscribe(*message_keys)
+        return contextlib.nullcontext()
+
+    def _sleep(self, notification, delay):
+        if notification is None:
+            time.sleep(delay)
+        elif notification.wait(delay):
+            notification.clear()
+
+    def _subscribe_async(self, block, *message_keys):
+        if block and self.notifier is not None:
+            return self.notifier.subscribe_async(*message_keys)
+        return _null_subscription()
+
+    async def _sleep_async(self, notification, delay):
+        if notification is None:
+            await asyncio.sleep(delay)
+            return
+
+        try:
+            await asyncio.wait_for(notification.wait(), delay)
+            notification.clear()
+        except asyncio.TimeoutError:
+            pass
+
     def _get(self, message_key: str) -> MResult:  # pragma: no cover
         """Get a result from the backend.  Subclasses may implement
         this method if they want to use the default, polling,
@@ -160,6 +313,13 @@ class ResultBackend:
             "classname": type(self).__name__,
         })
 
+    def _get_many(self, message_keys: typing.List[str]) -> typing.List[MResult]:
+        """Get many results from the backend.  The default
+        implementation calls :meth:`_get` for each key, but backends
+        may override it to fetch results in bulk.
+        """
+        return [self._get(message_key) for message_key in message_keys]
+
     def _store(self, message_key: str, result: Result, ttl: int) -> None:  # pragma: no cover
         """Store a result in the backend.  Subclasses may implement
         this method if they want to use the default implementation of
@@ -168,3 +328,8 @@ class ResultBackend:
         raise NotImplementedError("%(classname)r does not implement _store()" % {
             "classname": type(self).__name__,
         })
+
+
+@contextlib.asynccontextmanager
+async def _null_subscription():
+    yield None
@@ -22,12 +22,14 @@ from ..backend import Missing, ResultBackend
 
 class MemcachedBackend(ResultBackend):
     """A result backend for Memcached_.  This backend uses long
-    polling to retrieve results.
+    polling to retrieve results, unless it's given a notifier.
 
     Parameters:
       namespace(str): A string with which to prefix result keys.
       encoder(Encoder): The encoder to use when storing and retrieving
         result data.  Defaults to :class:`.JSONEncoder`.
+      notifier(Notifier): An optional notifier that wakes up waiters
+        as soon as their results are stored.
       pool(ClientPool): An optional pylibmc client pool to use.  If
         this is passed, all other connection params are ignored.
       pool_size(int): The size of the connection pool to use.
@@ -37,8 +39,11 @@ class MemcachedBackend(ResultBackend):
     .. _memcached: https://memcached.org
     """
 
-    def __init__(self, *, namespace="dramatiq-results", encoder=None, pool=None, pool_size=8, **parameters):
-        super().__init__(namespace=namespace, encoder=encoder)
+    def __init__(
+            self, *, namespace="dramatiq-results", encoder=None, notifier=None, pool=None, pool_size=8,
+            **parameters
+    ):
+        super().__init__(namespace=namespace, encoder=encoder, notifier=notifier)
         self.pool = pool or ClientPool(Client(**parameters), pool_size)
 
     def _get(self, message_key):
@@ -48,6 +53,15 @@ class MemcachedBackend(ResultBackend):
                 return self.encoder.decode(data)
             return Missing
 
+    def _get_many(self, message_keys):
+        with self.pool.reserve(block=True) as client:
+            data = client.get_multi(message_keys)
+
+        return [
+            self.encoder.decode(data[message_key]) if message_key in data else Missing
+            for message_key in message_keys
+        ]
+
     def _store(self, message_key, result, ttl):
         result_data = self.encoder.encode(result)
         with self.pool.reserve(block=True) as client:
@@ -15,15 +15,26 @@
 # You should have received a copy of the GNU Lesser General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+import asyncio
+import math
+import time
+
 import redis
 
-from ..backend import DEFAULT_TIMEOUT, ResultBackend, ResultMissing, ResultTimeout
+from ...brokers.redis import _make_async_client, _PerLoop, aioredis
+from ...logging import get_logger
+from ..backend import DEFAULT_TIMEOUT, Missing, ResultBackend, ResultMissing, ResultTimeout
 
 
 class RedisBackend(ResultBackend):
     """A result backend for Redis_.  This is the recommended result
     backend as waiting for a result is resource efficient.
 
+    Stored results are announced on pub/sub channels so that all the
+    coroutines waiting on results via :meth:`get_result_async` in an
+    event loop share a single connection.  That connection is only
+    subscribed to the channels of the results being waited on.
+
     Parameters:
       namespace(str): A string with which to prefix result keys.
       encoder(Encoder): The encoder to use when storing and retrieving
@@ -47,6 +58,15 @@ class RedisBackend(ResultBackend):
         # TODO: Replace usages of StrictRedis (redis-py 2.x) with Redis in Dramatiq 2.0.
         self.client = client or redis.StrictRedis(**parameters)
 
+        # asyncio clients are bound to the event loop they're used on
+        # so get_result_async keeps a listener per event loop.
+        self.listeners = _PerLoop(self._make_listener, _ResultListener.close)
+
+    def close(self):
+        """Stop listening for results and close any asyncio clients.
+        """
+        self.listeners.close()
+
     def get_result(self, message, *, block=False, timeout=None):
         """Get a result from the backend.
 
@@ -87,9 +107,278 @@ class RedisBackend(ResultBackend):
 
         return self.unwrap_result(self.encoder.decode(data))
 
+    def get_results(self, messages, *, block=False, timeout=None, missing_ok=False):
+        """Get the results of many messages from the backend.  When
+        blocking, the results that are already set are fetched in a
+        single round trip and the rest are waited on one after another
+        so that each of them is returned as soon as it's stored.
+
+        Warning:
+          Sub-second timeouts are not respected by this backend.
+
+        Parameters:
+          messages(Iterable[Message])
+          block(bool): Whether or not to block until all the results
+            are set.
+          timeout(int): The maximum amount of time, in ms, to wait for
+            the results when block is True.  Defaults to 10 seconds.
+          missing_ok(bool): When this is True and block is False,
+            results that aren't set are returned as :data:`Missing`
+            instead of raising.
+
+        Raises:
+          ResultMissing: When block and missing_ok are False and any
+            of the results isn't set.
+          ResultTimeout: When waiting for the results times out.
+
+        Returns:
+          list[object]: The results, in the same order as the messages.
+        """
+        if not block:
+            return super().get_results(messages, missing_ok=missing_ok)
+
+        if timeout is None:
+            timeout = DEFAULT_TIMEOUT
+
+        messages = list(messages)
+        deadline = time.monotonic() + timeout / 1000
+        message_keys = [self.build_message_key(message) for message in messages]
+        results = self._get_many(message_keys)
+        for i, message_key in enumerate(message_keys):
+            if results[i] is not Missing:
+                continue
+
+            # All of the results are needed so waiting on each one in
+            # turn takes as long as waiting on the last one to be set.
+            # BRPOPLPUSH only takes whole seconds and blocks forever
+            # when given 0, so partial seconds are rounded up.
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                data = self.client.rpoplpush(message_key, message_key)
+            else:
+                data = self.client.brpoplpush(message_key, message_key, math.ceil(remaining))
+
+            if data is None:
+                raise ResultTimeout(messages[i])
+
+            results[i] = self.encoder.decode(data)
+
+        return [self.unwrap_result(result) for result in results]
+
+    async def get_result_async(self, message, *, block=False, timeout=None):
+        """Get a result from the backend from a coroutine.  Unlike
+        :meth:`get_result`, sub-second timeouts are respected and
+        waiting coroutines don't each hold on to a connection.  This
+        requires redis-py 4.2 or later, otherwise the backend is polled
+        on the event loop's default executor.
+
+        Parameters:
+          message(Message)
+          block(bool): Whether or not to wait until a result is set.
+          timeout(int): The maximum amount of time, in ms, to wait for
+            a result when block is True.  Defaults to 10 seconds.
+
+        Raises:
+          ResultMissing: When block is False and the result isn't set.
+          ResultTimeout: When waiting for a result times out.
+
+        Returns:
+          object: The result.
+        """
+        if aioredis is None:  # pragma: no cover
+            return await super().get_result_async(message, block=block, timeout=timeout)
+
+        if timeout is None:
+            timeout = DEFAULT_TIMEOUT
+
+        loop = asyncio.get_running_loop()
+        listener = await self.listeners.get()
+        message_key = self.build_message_key(message)
+        if block:
+            deadline = loop.time() + timeout / 1000
+            while True:
+                # The waiter has to be subscribed before checking for
+                # the result, otherwise a result that's stored in
+                # between would be missed.
+                waiter = await listener.add_waiter(message_key)
+                try:
+                    data = await listener.client.lindex(message_key, 0)
+                    remaining = deadline - loop.time()
+                    if data is not None or remaining <= 0:
+                        break
+
+                    try:
+                        await asyncio.wait_for(waiter, remaining)
+                    except asyncio.TimeoutError:
+                        pass
+                finally:
+                    listener.remove_waiter(message_key, waiter)
+
+            if data is None:
+                raise ResultTimeout(message)
+
+        else:
+            data = await listener.client.lindex(message_key, 0)
+            if data is None:
+                raise ResultMissing(message)
+
+        return self.unwrap_result(self.encoder.decode(data))
+
+    def _make_listener(self):
+        return _ResultListener(_make_async_client(self.client))
+
+    def _get(self, message_key):
+        data = self.client.lindex(message_key, 0)
+        if data is None:
+            return Missing
+        return self.encoder.decode(data)
+
+    def _get_many(self, message_keys):
+        with self.client.pipeline(transaction=False) as pipe:
+            for message_key in message_keys:
+                pipe.lindex(message_key, 0)
+
+            return [Missing if data is None else self.encoder.decode(data) for data in pipe.execute()]
+
     def _store(self, message_key, result, ttl):
         with self.client.pipeline() as pipe:
             pipe.delete(message_key)
             pipe.lpush(message_key, self.encoder.encode(result))
             pipe.pexpire(message_key, ttl)
+            pipe.publish(message_key, message_key)
             pipe.execute()
+
+
+class _ResultListener:
+    """Wakes up the coroutines that are waiting on results once those
+    results are stored.  The channel of each result is subscribed to
+    on a single pub/sub connection for as long as there are
+    coroutines waiting on it.
+    """
+
+    def __init__(self, client):
+        self.logger = get_logger(__name__, type(self))
+        self.client = client
+        self.pubsub = client.pubsub()
+        self.waiters = {}
+        self.subscriptions = {}
+        self.commands = set()
+        self.lock = asyncio.Lock()
+        self.task = None
+
+    async def add_waiter(self, message_key):
+        """Add a waiter for a result and wait until this listener is
+        subscribed to that result's channel.
+
+        Returns:
+          asyncio.Future: A future that's resolved once the result is
+          stored or this listener loses its connection.
+        """
+        waiter = asyncio.get_running_loop().create_future()
+        waiters = self.waiters.setdefault(message_key, set())
+        waiters.add(waiter)
+        if len(waiters) == 1:
+            self.subscriptions.setdefault(message_key, []).append(asyncio.get_running_loop().create_future())
+            self._send(self.pubsub.subscribe, message_key)
+
+        if self.task is None:
+            self.task = asyncio.ensure_future(self._listen(self.pubsub))
+
+        subscriptions = self.subscriptions.get(message_key)
+        if subscriptions:
+            try:
+                await asyncio.shield(subscriptions[-1])
+            except BaseException:
+                self.remove_waiter(message_key, waiter)
+                raise
+
+        return waiter
+
+    def remove_waiter(self, message_key, waiter):
+        waiters = self.waiters.get(message_key)
+        if waiters is not None:
+            waiters.discard(waiter)
+            if not waiters:
+                del self.waiters[message_key]
+                self._send(self.pubsub.unsubscribe, message_key)
+
+    async def close(self):
+        """Stop listening and close the underlying client.
+        """
+        for task in list(self.commands):
+            task.cancel()
+
+        if self.task is not None:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+
+        await self.pubsub.reset()
+        await self.client.close(close_connection_pool=True)
+
+    def _send(self, command, *args):
+        # Commands are sent from tasks so that removing a waiter
+        # doesn't have to block, and under a lock so that they're
+        # sent in the order they were issued in.
+        task = asyncio.ensure_future(self._send_locked(self.pubsub, command, *args))
+        self.commands.add(task)
+        task.add_done_callback(self.commands.discard)
+
+    async def _send_locked(self, pubsub, command, *args):
+        async with self.lock:
+            # Commands meant for a connection that has since been
+            # lost are dropped.
+            if pubsub is not self.pubsub:
+                return
+
+            try:
+                await command(*args)
+            except Exception:
+                self.logger.debug("Failed to send pub/sub command.", exc_info=True)
+
+    async def _listen(self, pubsub):
+        try:
+            async with self.lock:
+                await pubsub.connect()
+
+            while True:
+                message = await pubsub.get_message(timeout=None)
+                if message is None:
+                    continue
+
+                channel = message["channel"].decode("utf-8")
+                if message["type"] == "subscribe":
+                    subscriptions = self.subscriptions.get(channel)
+                    if subscriptions:
+                        subscriptions.pop(0).set_result(None)
+                        if not subscriptions:
+                            del self.subscriptions[channel]
+
+                elif message["type"] == "message":
+                    for waiter in self.waiters.get(channel, ()):
+                        if not waiter.done():
+                            waiter.set_result(None)
+
+        except Exception as e:
+            self.logger.warning("Lost connection while listening for results.", exc_info=True)
+
+            # Start over with a new connection on the next wait and
+            # wake up all the waiters so they can check on their
+            # results and subscribe again.
+            self.pubsub = self.client.pubsub()
+            self.task = None
+            for subscriptions in self.subscriptions.values():
+                for subscription in subscriptions:
+                    if not subscription.done():
+                        subscription.set_exception(e)
+
+            for waiters in self.waiters.values():
+                for waiter in waiters:
+                    if not waiter.done():
+                        waiter.set_result(None)
+
+            self.subscriptions = {}
+            self.waiters = {}
+            await pubsub.reset()
@@ -28,6 +28,8 @@ class StubBackend(ResultBackend):
       namespace(str): A string with which to prefix result keys.
       encoder(Encoder): The encoder to use when storing and retrieving
         result data.  Defaults to :class:`.JSONEncoder`.
+      notifier(Notifier): An optional notifier that wakes up waiters
+        as soon as their results are stored.
     """
 
     results: Dict[str, Tuple[Optional[str], Optional[float]]] = {}
@@ -0,0 +1,162 @@
+# This file is a part of Dramatiq.
+#
+# Copyright (C) 2017,2018,2019,2020 CLEARTYPE SRL <bogdan@cleartype.io>
+#
+# Dramatiq is free software; you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or (at
+# your option) any later version.
+#
+# Dramatiq is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU Lesser General Public
+# License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import asyncio
+from contextlib import asynccontextmanager, contextmanager
+from threading import Event, Lock
+from typing import AsyncIterator, Dict, Iterator, List, Set
+
+
+class Notifier:
+    """ABC for result notifiers.  Notifiers wake up the threads and
+    coroutines that are waiting on results as soon as those results
+    are stored, so that result backends that poll for results don't
+    have to wait out their backoff.
+
+    Waiters are tracked in a registry that's shared by all the threads
+    in a process.  Subclasses implement how notifications get from the
+    process that stores a result to the processes waiting on it, and
+    call :meth:`wake` when they receive one.
+    """
+
+    def __init__(self) -> None:
+        self.waiters: Dict[str, Set] = {}
+        self.waiters_mutex = Lock()
+
+    def notify(self, message_key: str) -> None:  # pragma: no cover
+        """Notify all the processes waiting on a result that it has
+        been stored.
+
+        Parameters:
+          message_key(str): The key of the stored result.
+        """
+        raise NotImplementedError
+
+    def start(self, *message_keys: str) -> None:
+        """Start receiving notifications about a set of results.  This
+        is called every time a waiter subscribes to results and it
+        must return once notifications about them can be received.
+
+        Parameters:
+          *message_keys(str): The keys of the results.
+        """
+
+    def stop(self, *message_keys: str) -> None:
+        """Stop receiving notifications about a set of results that
+        nothing is waiting on anymore.
+
+        Parameters:
+          *message_keys(str): The keys of the results.
+        """
+
+    def close(self) -> None:
+        """Stop receiving notifications altogether and release any
+        resources held by this notifier.  Waiters that subscribe
+        afterwards fall back to polling.
+        """
+
+    @contextmanager
+    def subscribe(self, *message_keys: str) -> Iterator[Event]:
+        """Subscribe to notifications about a set of results.
+
+        Parameters:
+          *message_keys(str): The keys of the results.
+
+        Returns:
+          Event: An event that gets set whenever any of the results
+          is stored.  Callers should clear it once they've handled a
+          notification.
+        """
+        event = Event()
+        self._add_waiter(event, message_keys)
+        try:
+            self.start(*message_keys)
+            yield event
+        finally:
+            unused_keys = self._remove_waiter(event, message_keys)
+            if unused_keys:
+                self.stop(*unused_keys)
+
+    @asynccontextmanager
+    async def subscribe_async(self, *message_keys: str) -> AsyncIterator[asyncio.Event]:
+        """Subscribe to notifications about a set of results from a
+        coroutine.  See :meth:`subscribe`.
+
+        Parameters:
+          *message_keys(str): The keys of the results.
+
+        Returns:
+          asyncio.Event: An event that gets set whenever any of the
+          results is stored.
+        """
+        loop = asyncio.get_running_loop()
+        event = _LoopEvent(loop)
+        self._add_waiter(event, message_keys)
+        try:
+            await loop.run_in_executor(None, self.start, *message_keys)
+            yield event.event
+        finally:
+            unused_keys = self._remove_waiter(event, message_keys)
+            if unused_keys:
+                await loop.run_in_executor(None, self.stop, *unused_keys)
+
+    def wake(self, message_key: str) -> None:
+        """Wake up all the waiters in this process that are waiting on
+        a result.
+
+        Parameters:
+          message_key(str): The key of the stored result.
+        """
+        with self.waiters_mutex:
+            events = list(self.waiters.get(message_key, ()))
+
+        for event in events:
+            event.set()
+
+    def _add_waiter(self, event, message_keys):
+        with self.waiters_mutex:
+            for message_key in message_keys:
+                self.waiters.setdefault(message_key, set()).add(event)
+
+    def _remove_waiter(self, event, message_keys) -> List[str]:
+        unused_keys = []
+        with self.waiters_mutex:
+            for message_key in message_keys:
+                events = self.waiters.get(message_key)
+                if events is not None:
+                    events.discard(event)
+                    if not events:
+                        del self.waiters[message_key]
+                        unused_keys.append(message_key)
+
+        return unused_keys
+
+
+class _LoopEvent:
+    """An asyncio event that can be set from any thread.
+    """
+
+    def __init__(self, loop):
+        self.loop = loop
+        self.event = asyncio.Event()
+
+    def set(self):
+        try:
+            self.loop.call_soon_threadsafe(self.event.set)
+        except RuntimeError:  # pragma: no cover
+            # The loop was closed.
+            pass
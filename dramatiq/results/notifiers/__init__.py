@@ -0,0 +1,49 @@
+# This file is a part of Dramatiq.
+#
+# Copyright (C) 2017,2018 CLEARTYPE SRL <bogdan@cleartype.io>
+#
+# Dramatiq is free software; you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or (at
+# your option) any later version.
+#
+# Dramatiq is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU Lesser General Public
+# License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+import warnings
+
+from .local import LocalNotifier
+
+__all__ = ["LocalNotifier", "RedisNotifier"]
+
+
+def __getattr__(name):
+    module_importer = _module_importers.get(name)
+    if module_importer is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    return module_importer()
+
+
+def import_redis():
+    try:
+        from .redis import RedisNotifier
+
+        return RedisNotifier
+    except ModuleNotFoundError:
+        warnings.warn(
+            "RedisNotifier is not available.  Run `pip install dramatiq[redis]` "
+            "to add support for that notifier.",
+            category=ImportWarning,
+            stacklevel=2,
+        )
+        raise
+
+
+_module_importers = {
+    "RedisNotifier": import_redis,
+}
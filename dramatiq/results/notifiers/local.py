@@ -0,0 +1,28 @@
+# This file is a part of Dramatiq.
+#
+# Copyright (C) 2017,2018,2019,2020 CLEARTYPE SRL <bogdan@cleartype.io>
+#
+# Dramatiq is free software; you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or (at
+# your option) any later version.
+#
+# Dramatiq is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU Lesser General Public
+# License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from ..notifier import Notifier
+
+
+class LocalNotifier(Notifier):
+    """A notifier that only wakes up threads in the process that
+    stored a result.  Useful when results are waited on by the same
+    process that produces them, and in unit tests.
+    """
+
+    def notify(self, message_key):
+        self.wake(message_key)
@@ -0,0 +1,189 @@
+# This file is a part of Dramatiq.
+#
+# Copyright (C) 2017,2018,2019,2020 CLEARTYPE SRL <bogdan@cleartype.io>
+#
+# Dramatiq is free software; you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or (at
+# your option) any later version.
+#
+# Dramatiq is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU Lesser General Public
+# License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from threading import Condition, Event, Lock, Thread
+
+import redis
+
+from ...logging import get_logger
+from ..notifier import Notifier
+
+#: The number of seconds to wait before reconnecting after the
+#: listener loses its connection.
+RECONNECT_DELAY = 1
+
+#: The max number of seconds to wait for a subscription to be
+#: confirmed before falling back to polling.
+SUBSCRIBE_TIMEOUT = 1
+
+#: The max number of seconds the listener blocks for at a time.
+LISTEN_TIMEOUT = 1
+
+
+class RedisNotifier(Notifier):
+    """A notifier that publishes stored results over Redis pub/sub.
+    Each result is published on a channel named after its key, which
+    is the same channel that :class:`RedisBackend<dramatiq.results.backends.RedisBackend>`
+    publishes on.  Each process listens for notifications on a single
+    connection from a background thread, and that connection is only
+    subscribed to the channels of the results being waited on.  While
+    that connection is down, waiters fall back to polling.
+
+    Examples:
+
+      >>> backend = MemcachedBackend(notifier=RedisNotifier(url="redis://127.0.0.1:6379/0"))
+
+    Parameters:
+      client(Redis): An optional client.  If this is passed,
+        then all other parameters are ignored.
+      url(str): An optional connection URL.  If both a URL and
+        connection parameters are provided, the URL is used.
+      **parameters: Connection parameters are passed directly
+        to :class:`redis.Redis`.
+    """
+
+    def __init__(self, *, client=None, url=None, **parameters):
+        super().__init__()
+
+        if url:
+            parameters["connection_pool"] = redis.ConnectionPool.from_url(url)
+
+        self.logger = get_logger(__name__, type(self))
+        # TODO: Replace usages of StrictRedis (redis-py 2.x) with Redis in Dramatiq 2.0.
+        self.client = client or redis.StrictRedis(**parameters)
+        self.closed = Event()
+
+        # The pub/sub connection is shared by every thread that
+        # subscribes to results so commands are sent under a mutex.
+        # Only the listener thread reads from it.
+        self.pubsub = None
+        self.pubsub_mutex = Lock()
+        self.channels = set()
+        self.confirmed_channels = set()
+        self.confirmed = Condition()
+        self.listener = None
+
+    def notify(self, message_key):
+        self.client.publish(message_key, message_key)
+
+    def start(self, *message_keys):
+        if not self._subscribe(message_keys):
+            return
+
+        # Notifications sent before the subscriptions are confirmed
+        # would be lost, so wait for them before letting the caller
+        # check on its results.
+        with self.confirmed:
+            self.confirmed.wait_for(lambda: self.confirmed_channels.issuperset(message_keys), SUBSCRIBE_TIMEOUT)
+
+    def stop(self, *message_keys):
+        with self.pubsub_mutex:
+            message_keys = self.channels.intersection(message_keys)
+            if self.pubsub is None or not message_keys:
+                return
+
+            self.channels.difference_update(message_keys)
+            with self.confirmed:
+                self.confirmed_channels.difference_update(message_keys)
+
+            try:
+                self.pubsub.unsubscribe(*message_keys)
+            except redis.ConnectionError:
+                self.logger.debug("Failed to unsubscribe from results.", exc_info=True)
+
+    def close(self):
+        self.closed.set()
+        with self.pubsub_mutex:
+            listener, self.listener = self.listener, None
+            self._reset()
+
+        if listener is not None:
+            listener.join()
+
+    def _subscribe(self, message_keys):
+        with self.pubsub_mutex:
+            if self.closed.is_set():
+                return False
+
+            if self.pubsub is None:
+                self.pubsub = self.client.pubsub()
+
+            new_keys = set(message_keys) - self.channels
+            if new_keys:
+                try:
+                    self.pubsub.subscribe(*new_keys)
+                    self.channels.update(new_keys)
+                except redis.ConnectionError:
+                    self.logger.warning("Failed to subscribe to results.", exc_info=True)
+                    self._reset()
+                    return False
+
+            if self.listener is None:
+                self.listener = Thread(target=self._listen, name="RedisNotifierThread", daemon=True)
+                self.listener.start()
+
+            return True
+
+    def _reset(self):
+        if self.pubsub is not None:
+            self.pubsub.close()
+
+        self.pubsub = None
+        self.channels = set()
+        with self.confirmed:
+            self.confirmed_channels = set()
+
+    def _listen(self):
+        while not self.closed.is_set():
+            with self.pubsub_mutex:
+                pubsub = self.pubsub
+
+            if pubsub is None:
+                self.closed.wait(RECONNECT_DELAY)
+                continue
+
+            try:
+                message = pubsub.get_message(timeout=LISTEN_TIMEOUT)
+                if message is None:
+                    continue
+
+                channel = message["channel"].decode("utf-8")
+                if message["type"] == "subscribe":
+                    with self.confirmed:
+                        self.confirmed_channels.add(channel)
+                        self.confirmed.notify_all()
+
+                elif message["type"] == "message":
+                    self.wake(channel)
+
+            except Exception:
+                if self.closed.is_set():
+                    break
+
+                self.logger.warning("Lost connection while listening for results.", exc_info=True)
+                with self.pubsub_mutex:
+                    if pubsub is self.pubsub:
+                        self._reset()
+
+                # Subscribe to the results that are still being
+                # waited on once the connection is back.
+                self.closed.wait(RECONNECT_DELAY)
+                with self.waiters_mutex:
+                    message_keys = list(self.waiters)
+
+                if message_keys:
+                    self._subscribe(message_keys)
@@ -15,14 +15,18 @@
 # You should have received a copy of the GNU Lesser General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+import math
 import os
 import time
-from collections import defaultdict
-from functools import lru_cache
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache, partial
+from heapq import heappop, heappush
 from itertools import chain
-from queue import Empty, PriorityQueue
-from threading import Event, Thread
+from queue import Empty, PriorityQueue, Queue
+from threading import Condition, Event, Thread
 
+from .asyncio import get_event_loop_thread
 from .common import current_millis, iter_queue, join_all, q_name
 from .errors import ActorNotFound, ConnectionError, RateLimitExceeded, Retry
 from .logging import get_logger
@@ -50,6 +54,28 @@ QUEUE_PREFETCH = int(os.getenv("dramatiq_queue_prefetch", 0))
 #: prefetched.
 DELAY_QUEUE_PREFETCH = int(os.getenv("dramatiq_delay_queue_prefetch", 0))
 
+#: The interval in seconds at which consumers running with adaptive
+#: prefetch resize their prefetch.
+ADAPTIVE_PREFETCH_INTERVAL_SECS = 1
+
+#: The max factor by which consumers running with adaptive prefetch
+#: may grow their prefetch past the static prefetch.
+ADAPTIVE_PREFETCH_MAX_FACTOR = 16
+
+#: The weight given to new samples by the moving averages used to
+#: size adaptive prefetches.
+ADAPTIVE_PREFETCH_ALPHA = 0.2
+
+#: The number of seconds workers running with ``defer_rate_limited``
+#: wait between attempts to process messages held under a rate limit
+#: key.
+RATE_LIMIT_DEFER_DELAY_SECS = 0.5
+
+#: The max number of seconds workers running with
+#: ``defer_rate_limited`` hold on to a rate limited message before
+#: letting it be retried via the broker.
+RATE_LIMIT_DEFER_MAX_SECS = 60
+
 
 class Worker:
     """Workers consume messages off of all declared queues and
@@ -67,9 +93,33 @@ class Worker:
       worker_timeout(int): The number of milliseconds workers should
         wake up after if the queue is idle.
       worker_threads(int): The number of worker threads to spawn.
+      queue_weights(dict[str, int]): An optional map from queue names
+        to weights.  When provided, worker threads take turns
+        processing messages from each queue that has messages waiting,
+        processing up to as many messages in a row from each queue as
+        its weight.  Queues without a weight have a weight of 1 and
+        actor priorities only apply within each queue.  By default,
+        messages from all queues are processed in priority order.
+      adaptive_prefetch(bool): Whether or not to size the prefetch of
+        each queue based on how long its messages take to process and
+        fetch.  When set, consumers prefetch enough messages to keep
+        every worker thread busy while the next batch is being
+        fetched, but no more.  Delay queues and queues whose
+        consumers don't report their fetch times (eg. RabbitMQ's)
+        always use a static prefetch.
+      defer_rate_limited(bool): Whether or not to hold messages that
+        fail with :class:`RateLimitExceeded<dramatiq.RateLimitExceeded>`
+        in memory and process them again once their rate limiter lets
+        another message through, instead of retrying them via the
+        broker.  Held messages count against their queue's prefetch
+        and they're retried via the broker if they've been held for
+        more than a minute.
     """
 
-    def __init__(self, broker, *, queues=None, worker_timeout=1000, worker_threads=8):
+    def __init__(
+            self, broker, *, queues=None, worker_timeout=1000, worker_threads=8, queue_weights=None,
+            adaptive_prefetch=False, defer_rate_limited=False,
+    ):
         self.logger = get_logger(__name__, type(self))
         self.broker = broker
 
@@ -84,9 +134,12 @@ class Worker:
         self.delay_prefetch = DELAY_QUEUE_PREFETCH or min(worker_threads * 1000, 65535)
 
         self.workers = []
-        self.work_queue = PriorityQueue()
+        self.work_queue = _WeightedWorkQueue(queue_weights) if queue_weights else _WorkQueue()
+        self.async_messages = _AsyncMessages(worker_threads=worker_threads)
         self.worker_timeout = worker_timeout
         self.worker_threads = worker_threads
+        self.adaptive_prefetch = adaptive_prefetch
+        self.defer_rate_limited = defer_rate_limited
 
     def start(self):
         """Initialize the worker boot sequence and start up all the
@@ -136,6 +189,9 @@ class Worker:
 
         join_all(self.workers, timeout)
         self.logger.debug("Workers stopped.")
+        self.logger.debug("Waiting for async messages...")
+        self.async_messages.join(timeout)
+        self.logger.debug("Async messages done.")
         self.logger.debug("Stopping consumers...")
         for thread in self.consumers.values():
             thread.stop()
@@ -159,6 +215,7 @@ class Worker:
         for consumer in self.consumers.values():
             consumer.close()
 
+        self.async_messages.close()
         self.logger.debug("Consumers closed.")
         self.broker.emit_after("worker_shutdown", self)
         self.logger.info("Worker has been shut down.")
@@ -170,6 +227,7 @@ class Worker:
         while True:
             for consumer in self.consumers.values():
                 consumer.delay_queue.join()
+                consumer.held_messages.join()
 
             self.work_queue.join()
 
@@ -177,7 +235,7 @@ class Worker:
             # joining on the work queue then it should be safe to exit.
             # This could still miss stuff but the chances are slim.
             for consumer in self.consumers.values():
-                if consumer.delay_queue.unfinished_tasks:
+                if consumer.delay_queue.unfinished_tasks or consumer.held_messages:
                     break
             else:
                 if self.work_queue.unfinished_tasks:
@@ -194,12 +252,20 @@ class Worker:
             self.logger.debug("Dropping consumer for queue %r: not whitelisted.", queue_name)
             return
 
+        adaptive_prefetch = None
+        if self.adaptive_prefetch and not delay:
+            adaptive_prefetch = _AdaptivePrefetch(
+                worker_threads=self.worker_threads,
+                max_prefetch=min(self.queue_prefetch * ADAPTIVE_PREFETCH_MAX_FACTOR, 65535),
+            )
+
         consumer = self.consumers[queue_name] = _ConsumerThread(
             broker=self.broker,
             queue_name=queue_name,
             prefetch=self.delay_prefetch if delay else self.queue_prefetch,
             work_queue=self.work_queue,
             worker_timeout=self.worker_timeout,
+            adaptive_prefetch=adaptive_prefetch,
         )
         consumer.start()
 
@@ -208,7 +274,9 @@ class Worker:
             broker=self.broker,
             consumers=self.consumers,
             work_queue=self.work_queue,
-            worker_timeout=self.worker_timeout
+            worker_timeout=self.worker_timeout,
+            async_messages=self.async_messages,
+            defer_rate_limited=self.defer_rate_limited,
         )
         worker.start()
         self.workers.append(worker)
@@ -229,7 +297,7 @@ class _WorkerMiddleware(Middleware):
 
 
 class _ConsumerThread(Thread):
-    def __init__(self, *, broker, queue_name, prefetch, work_queue, worker_timeout):
+    def __init__(self, *, broker, queue_name, prefetch, work_queue, worker_timeout, adaptive_prefetch=None):
         super().__init__(daemon=True)
 
         self.logger = get_logger(__name__, "ConsumerThread(%s)" % queue_name)
@@ -243,6 +311,12 @@ class _ConsumerThread(Thread):
         self.work_queue = work_queue
         self.worker_timeout = worker_timeout
         self.delay_queue = PriorityQueue()
+        self.held_messages = _HeldMessages(
+            delay=RATE_LIMIT_DEFER_DELAY_SECS,
+            max_hold=RATE_LIMIT_DEFER_MAX_SECS,
+        )
+        self.adaptive_prefetch = adaptive_prefetch
+        self.prefetch_deadline = 0
 
     def run(self):
         self.logger.debug("Running consumer thread...")
@@ -263,18 +337,22 @@ class _ConsumerThread(Thread):
 
                 for message in self.consumer:
                     if message is not None:
+                        self.record_fetch_time()
                         self.handle_message(message)
 
                     elif self.paused:
                         break
 
                     self.handle_delayed_messages()
+                    self.handle_held_messages()
+                    self.adjust_prefetch()
                     if not self.running:
                         break
 
             except ConnectionError as e:
                 self.logger.critical("Consumer encountered a connection error: %s", e)
                 self.delay_queue = PriorityQueue()
+                self.held_messages.drain()
 
             except Exception:
                 self.logger.critical("Consumer encountered an unexpected error.", exc_info=True)
@@ -310,6 +388,63 @@ class _ConsumerThread(Thread):
             self.post_process_message(message)
             self.delay_queue.task_done()
 
+    def handle_held_messages(self):
+        """Put held messages that are due to be tried again back on
+        the work queue.
+        """
+        self.held_messages.dispatch_due(self.dispatch_message)
+
+    def dispatch_message(self, message):
+        actor = self.broker.get_actor(message.actor_name)
+        self.work_queue.put((actor.priority, message))
+
+    def hold_message(self, message):
+        """Called by worker threads to hold messages that were
+        deferred because they exceeded a rate limit.
+        """
+        self.logger.debug("Holding rate limited message %r.", message.message_id)
+        message.deferred = False
+        self.held_messages.hold(message)
+
+    def release_held_messages(self, message, *, succeeded):
+        """Called by worker threads whenever they're done processing
+        individual messages.  If the message was held and it ran
+        successfully, then its rate limiter let it through so the next
+        message held under the same key is put back on the work queue.
+        """
+        self.held_messages.release(message, self.dispatch_message, succeeded=succeeded)
+
+    def adjust_prefetch(self):
+        """Resize the prefetch of the underlying consumer when running
+        with adaptive prefetch.
+        """
+        if not self.adaptive_prefetch or time.monotonic() < self.prefetch_deadline:
+            return
+
+        self.prefetch_deadline = time.monotonic() + ADAPTIVE_PREFETCH_INTERVAL_SECS
+        prefetch = self.adaptive_prefetch.compute(self.prefetch)
+        if prefetch != self.prefetch:
+            self.logger.debug("Changing prefetch from %d to %d.", self.prefetch, prefetch)
+            self.prefetch = prefetch
+            self.consumer.set_prefetch(prefetch)
+            self.broker.emit_after("adjust_prefetch", self.queue_name, prefetch)
+
+    def record_processing_time(self, duration):
+        """Called by worker threads with the amount of time (in
+        seconds) they spent processing each message.
+        """
+        if self.adaptive_prefetch:
+            self.adaptive_prefetch.record_processing_time(duration)
+
+    def record_fetch_time(self):
+        # Consumers report the duration of their round trips to the
+        # broker themselves since the time it takes them to return a
+        # message also includes any time spent waiting on an empty
+        # queue.  Each round trip is only recorded once.
+        if self.adaptive_prefetch and self.consumer.fetch_time is not None:
+            self.adaptive_prefetch.record_fetch_time(self.consumer.fetch_time)
+            self.consumer.fetch_time = None
+
     def handle_message(self, message):
         """Handle a message received off of the underlying consumer.
         If the message has an eta, delay it.  Otherwise, put it on the
@@ -417,6 +552,7 @@ class _ConsumerThread(Thread):
         try:
             if self.consumer:
                 self.requeue_messages(m for _, m in iter_queue(self.delay_queue))
+                self.requeue_messages(self.held_messages.drain())
                 self.consumer.close()
         except ConnectionError:
             pass
@@ -431,9 +567,13 @@ class _WorkerThread(Thread):
       consumers(dict[str, _ConsumerThread])
       work_queue(Queue)
       worker_timeout(int)
+      async_messages(_AsyncMessages)
+      defer_rate_limited(bool)
     """
 
-    def __init__(self, *, broker, consumers, work_queue, worker_timeout):
+    def __init__(
+            self, *, broker, consumers, work_queue, worker_timeout, async_messages=None, defer_rate_limited=False,
+    ):
         super().__init__(daemon=True)
 
         self.logger = get_logger(__name__, "WorkerThread")
@@ -444,6 +584,8 @@ class _WorkerThread(Thread):
         self.consumers = consumers
         self.work_queue = work_queue
         self.timeout = worker_timeout / 1000
+        self.async_messages = async_messages
+        self.defer_rate_limited = defer_rate_limited
 
     def run(self):
         self.logger.debug("Running worker thread...")
@@ -471,10 +613,17 @@ class _WorkerThread(Thread):
         by the stub broker to provide a nicer testing experience. Also used by the
         results middleware to pass exceptions into results.
 
+        Messages for async actors are handed off to the event loop
+        thread, if there is one, and finished once their coroutine is
+        done.
+
         Parameters:
           message(MessageProxy)
         """
         actor = None
+        start = time.monotonic()
+        handed_off = False
+        succeeded = False
         try:
             self.logger.debug("Received message %s with id %r.", message, message.message_id)
             self.broker.emit_before("process_message", message)
@@ -482,50 +631,103 @@ class _WorkerThread(Thread):
             res = None
             if not message.failed:
                 actor = self.broker.get_actor(message.actor_name)
-                res = actor(*message.args, **message.kwargs)
-                if res is not None \
-                   and message.options.get("pipe_target") is None \
-                   and not has_results_middleware(self.broker):
-                    self.logger.warning(
-                        "Actor '%s' returned a value that is not None, and you haven't added the "
-                        "Results middleware to the broker, so the value has been discarded. "
-                        "Consider adding the Results middleware to your broker or piping the "
-                        "result into another actor." % actor.actor_name
+                event_loop_thread = get_event_loop_thread() if actor.is_async else None
+                if event_loop_thread is not None and self.async_messages is not None:
+                    # Coroutines are keyed by the identity of their proxy
+                    # rather than their message id so that redeliveries
+                    # of a message that's still running don't clash.
+                    coroutine = actor.fn(*message.args, **message.kwargs)
+                    self.async_messages.submit(
+                        event_loop_thread, id(message), coroutine,
+                        partial(self.finish_async_message, message, actor, start),
                     )
+                    handed_off = True
+                    return
 
-            self.broker.emit_after("process_message", message, result=res)
+                res = actor(*message.args, **message.kwargs)
 
-        except SkipMessage as e:
-            if message.failed:
-                message.stuff_exception(e)
-            self.logger.warning("Message %s was skipped.", message)
-            self.broker.emit_after("skip_message", message)
+            self.handle_result(message, actor, res)
+            succeeded = not message.failed
 
         except BaseException as e:
-            message.stuff_exception(e)
+            self.handle_exception(message, actor, e)
 
-            throws = message.options.get("throws") or (actor and actor.options.get("throws"))
-            if isinstance(e, RateLimitExceeded):
-                self.logger.debug("Rate limit exceeded in message %s: %s.", message, e)
-            elif throws and isinstance(e, throws):
-                self.logger.info("Failed to process message %s with expected exception %s.", message, type(e).__name__)
-            elif not isinstance(e, Retry):
-                self.logger.error("Failed to process message %s with unhandled exception.", message, exc_info=True)
-
-            self.broker.emit_after("process_message", message, exception=e)
+        finally:
+            if not handed_off:
+                self.post_process_message(message, start, succeeded=succeeded)
 
+    def finish_async_message(self, message, actor, start, future):
+        """Finish processing a message whose coroutine is done.  This
+        is called from one of the threads owned by _AsyncMessages.
+        """
+        succeeded = False
+        try:
+            try:
+                res = future.result()
+            except BaseException as e:
+                self.handle_exception(message, actor, e)
+            else:
+                self.handle_result(message, actor, res)
+                succeeded = True
         finally:
-            # NOTE: There is no race here as any message that was
-            # processed must have come off of a consumer.  Therefore,
-            # there has to be a consumer for that message's queue so
-            # this is safe.  Probably.
-            self.consumers[message.queue_name].post_process_message(message)
-            self.work_queue.task_done()
-
-            # See discussion #351.  Keeping a reference to the
-            # exception can lead to memory bloat because it may be a
-            # while before a GC triggers.
-            message.clear_exception()
+            self.post_process_message(message, start, succeeded=succeeded)
+
+    def handle_result(self, message, actor, res):
+        if res is not None \
+           and message.options.get("pipe_target") is None \
+           and not has_results_middleware(self.broker):
+            self.logger.warning(
+                "Actor '%s' returned a value that is not None, and you haven't added the "
+                "Results middleware to the broker, so the value has been discarded. "
+                "Consider adding the Results middleware to your broker or piping the "
+                "result into another actor." % actor.actor_name
+            )
+
+        self.broker.emit_after("process_message", message, result=res)
+
+    def handle_exception(self, message, actor, e):
+        if isinstance(e, SkipMessage):
+            if message.failed:
+                message.stuff_exception(e)
+            self.logger.warning("Message %s was skipped.", message)
+            self.broker.emit_after("skip_message", message)
+            return
+
+        message.stuff_exception(e)
+
+        throws = message.options.get("throws") or (actor and actor.options.get("throws"))
+        if isinstance(e, RateLimitExceeded):
+            self.logger.debug("Rate limit exceeded in message %s: %s.", message, e)
+            consumer = self.consumers[message.queue_name]
+            if self.defer_rate_limited and consumer.held_messages.admit(message, e.key or message.actor_name):
+                message.defer()
+        elif throws and isinstance(e, throws):
+            self.logger.info("Failed to process message %s with expected exception %s.", message, type(e).__name__)
+        elif not isinstance(e, Retry):
+            self.logger.error("Failed to process message %s with unhandled exception.", message, exc_info=True)
+
+        self.broker.emit_after("process_message", message, exception=e)
+
+    def post_process_message(self, message, start, *, succeeded=False):
+        # NOTE: There is no race here as any message that was
+        # processed must have come off of a consumer.  Therefore,
+        # there has to be a consumer for that message's queue so
+        # this is safe.  Probably.
+        consumer = self.consumers[message.queue_name]
+        consumer.record_processing_time(time.monotonic() - start)
+        if message.deferred:
+            consumer.hold_message(message)
+        else:
+            consumer.post_process_message(message)
+            if self.defer_rate_limited:
+                consumer.release_held_messages(message, succeeded=succeeded)
+
+        self.work_queue.task_done()
+
+        # See discussion #351.  Keeping a reference to the
+        # exception can lead to memory bloat because it may be a
+        # while before a GC triggers.
+        message.clear_exception()
 
     def pause(self):
         """Pause this worker.
@@ -549,6 +751,328 @@ class _WorkerThread(Thread):
         self.running = False
 
 
+class _AsyncMessages:
+    """Keeps track of the messages of async actors that are running on
+    the event loop thread, and finishes them on a pool of threads once
+    their coroutines are done so that middleware never block the
+    event loop.
+
+    Parameters:
+      worker_threads(int): The number of threads to finish messages on.
+    """
+
+    def __init__(self, *, worker_threads):
+        self.logger = get_logger(__name__, type(self))
+        self.executor = ThreadPoolExecutor(max_workers=worker_threads, thread_name_prefix="AsyncMessages")
+        self.futures = set()
+        self.futures_cond = Condition()
+
+    def submit(self, event_loop_thread, key, coroutine, callback):
+        """Run a coroutine on the event loop thread, then call
+        ``callback`` with its future on the pool once it's done.
+        """
+        future = event_loop_thread.submit(key, coroutine)
+        with self.futures_cond:
+            self.futures.add(future)
+
+        future.add_done_callback(partial(self._schedule, callback))
+
+    def join(self, timeout):
+        """Wait for all the messages that are in flight to finish.
+
+        Parameters:
+          timeout(int): The number of milliseconds to wait for.
+        """
+        with self.futures_cond:
+            if not self.futures_cond.wait_for(lambda: not self.futures, timeout / 1000):
+                self.logger.warning("%d async messages are still in flight.", len(self.futures))
+
+    def close(self):
+        self.executor.shutdown(wait=False)
+
+    def _schedule(self, callback, future):
+        try:
+            self.executor.submit(self._finish, callback, future)
+        except RuntimeError:
+            self.logger.warning("Dropping async message because the worker has shut down.")
+            self._discard(future)
+
+    def _finish(self, callback, future):
+        try:
+            callback(future)
+        except Exception:  # pragma: no cover
+            self.logger.exception("Unhandled error while finishing async message.")
+        finally:
+            self._discard(future)
+
+    def _discard(self, future):
+        with self.futures_cond:
+            self.futures.discard(future)
+            self.futures_cond.notify_all()
+
+
+class _HeldMessages:
+    """Rate limited messages held in worker memory, grouped by the key
+    of the rate limiter they exceeded.  Every ``delay`` seconds, the
+    oldest message held under each key is dispatched again to probe
+    its rate limiter.  Every time a held message runs successfully,
+    the next message held under its key is dispatched right away.
+
+    Parameters:
+      delay(float): The number of seconds between probes.
+      max_hold(float): The max number of seconds a message can be held
+        for in total.
+    """
+
+    def __init__(self, *, delay, max_hold):
+        self.delay = delay
+        self.max_hold = max_hold
+        self.condition = Condition()
+        self.messages_by_key = {}
+        self.deadlines = {}
+        self.holds = {}
+
+    def __len__(self):
+        with self.condition:
+            return sum(len(messages) for messages in self.messages_by_key.values())
+
+    def admit(self, message, key):
+        """Check whether a rate limited message may be held.  Messages
+        that have already been held for too long may not.
+
+        Returns:
+          bool: True if the message may be held.
+        """
+        now = time.monotonic()
+        with self.condition:
+            _, held_at = self.holds.get(message.message_id, (key, now))
+            if now - held_at >= self.max_hold:
+                self.holds.pop(message.message_id, None)
+                return False
+
+            self.holds[message.message_id] = (key, held_at)
+            return True
+
+    def hold(self, message):
+        """Hold a message that was previously admitted.
+        """
+        with self.condition:
+            key, _ = self.holds.setdefault(message.message_id, (message.actor_name, time.monotonic()))
+            self.messages_by_key.setdefault(key, deque()).append(message)
+            self.deadlines.setdefault(key, time.monotonic() + self.delay)
+
+    def release(self, message, dispatch, *, succeeded):
+        """Forget about a message that is done being processed.  If
+        it was ever held and it ran successfully, dispatch the oldest
+        message held under the same key.
+        """
+        with self.condition:
+            key, _ = self.holds.pop(message.message_id, (None, None))
+            if key is None or not succeeded or key not in self.messages_by_key:
+                return
+
+            messages = self.messages_by_key[key]
+            dispatch(messages.popleft())
+            if not messages:
+                del self.messages_by_key[key]
+                del self.deadlines[key]
+
+            self.condition.notify_all()
+
+    def dispatch_due(self, dispatch):
+        """Dispatch the oldest message held under each key whose
+        probe is due.
+        """
+        now = time.monotonic()
+        with self.condition:
+            for key, deadline in list(self.deadlines.items()):
+                if deadline > now:
+                    continue
+
+                messages = self.messages_by_key[key]
+                dispatch(messages.popleft())
+                if messages:
+                    self.deadlines[key] = now + self.delay
+                else:
+                    del self.messages_by_key[key]
+                    del self.deadlines[key]
+
+            self.condition.notify_all()
+
+    def drain(self):
+        """Forget about all the held messages.
+
+        Returns:
+          list[MessageProxy]: The messages that were being held.
+        """
+        with self.condition:
+            messages = [message for messages in self.messages_by_key.values() for message in messages]
+            self.messages_by_key.clear()
+            self.deadlines.clear()
+            self.holds.clear()
+            self.condition.notify_all()
+            return messages
+
+    def join(self):
+        """Wait until no messages are being held.
+        """
+        with self.condition:
+            self.condition.wait_for(lambda: not self.messages_by_key)
+
+
+class _PriorityBuckets:
+    """Holds (priority, message) pairs in one FIFO bucket per priority
+    so that messages never have to be compared to one another and
+    messages with the same priority come out in the order they were
+    put in.  Messages with lower priority values come out first.
+    """
+
+    def __init__(self):
+        self.buckets = {}
+        self.priorities = []
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    def put(self, item):
+        priority = item[0]
+        bucket = self.buckets.get(priority)
+        if bucket is None:
+            bucket = self.buckets[priority] = deque()
+            heappush(self.priorities, priority)
+
+        bucket.append(item)
+        self.size += 1
+
+    def get(self):
+        priority = self.priorities[0]
+        bucket = self.buckets[priority]
+        item = bucket.popleft()
+        if not bucket:
+            heappop(self.priorities)
+            del self.buckets[priority]
+
+        self.size -= 1
+        return item
+
+
+class _WorkQueue(Queue):
+    """A queue of (priority, message) pairs that returns messages in
+    priority order regardless of the queue they came from.
+    """
+
+    def _init(self, maxsize):
+        self.messages = _PriorityBuckets()
+
+    def _qsize(self):
+        return len(self.messages)
+
+    def _put(self, item):
+        self.messages.put(item)
+
+    def _get(self):
+        return self.messages.get()
+
+
+class _WeightedWorkQueue(Queue):
+    """A queue of (priority, message) pairs that takes turns returning
+    messages from each of the queues that have any messages waiting.
+    Each queue gets to return as many messages in a row as its weight
+    before the next queue's turn comes up, so a flood of messages on
+    one queue can't starve the others.  Priorities only apply between
+    messages from the same queue.
+
+    Parameters:
+      weights(dict[str, int]): A map from queue names to weights.
+        Queues without a weight have a weight of 1.
+    """
+
+    def __init__(self, weights):
+        self.weights = weights
+        super().__init__()
+
+    def _init(self, maxsize):
+        self.messages_by_queue = {}
+        self.turns = deque()
+        self.turn_credits = 0
+        self.size = 0
+
+    def _qsize(self):
+        return self.size
+
+    def _put(self, item):
+        queue_name = q_name(item[1].queue_name)
+        messages = self.messages_by_queue.get(queue_name)
+        if messages is None:
+            messages = self.messages_by_queue[queue_name] = _PriorityBuckets()
+            self.turns.append(queue_name)
+
+        messages.put(item)
+        self.size += 1
+
+    def _get(self):
+        queue_name = self.turns[0]
+        if self.turn_credits <= 0:
+            self.turn_credits = max(self.weights.get(queue_name, 1), 1)
+
+        messages = self.messages_by_queue[queue_name]
+        item = messages.get()
+        self.turn_credits -= 1
+        self.size -= 1
+
+        if not messages:
+            del self.messages_by_queue[queue_name]
+            self.turns.popleft()
+            self.turn_credits = 0
+        elif self.turn_credits == 0:
+            self.turns.rotate(-1)
+
+        return item
+
+
+class _AdaptivePrefetch:
+    """Sizes the prefetch of a consumer using moving averages of the
+    time it takes to process its messages and to fetch them from the
+    broker.  The prefetch has to cover one message per worker thread
+    plus however many messages the worker threads get through while
+    the next batch of messages is being fetched.
+
+    Parameters:
+      worker_threads(int): The number of worker threads.
+      max_prefetch(int): The max prefetch.
+    """
+
+    def __init__(self, *, worker_threads, max_prefetch):
+        self.worker_threads = worker_threads
+        self.max_prefetch = max_prefetch
+        self.fetch_time = None
+        self.processing_time = None
+
+    def record_fetch_time(self, duration):
+        self.fetch_time = _update_average(self.fetch_time, duration)
+
+    def record_processing_time(self, duration):
+        self.processing_time = _update_average(self.processing_time, duration)
+
+    def compute(self, prefetch):
+        """Compute the new prefetch given the current one.
+        """
+        if self.fetch_time is None or self.processing_time is None:
+            return prefetch
+
+        # Consumers fetch messages in batches of up to prefetch
+        # messages so the prefetch is refilled in one round trip.
+        new_prefetch = math.ceil(self.worker_threads * (1 + self.fetch_time / max(self.processing_time, 1e-6)))
+        return max(1, min(new_prefetch, self.max_prefetch))
+
+
+def _update_average(average, sample):
+    if average is None:
+        return sample
+    return average + ADAPTIVE_PREFETCH_ALPHA * (sample - average)
+
+
 @lru_cache(maxsize=128)
 def has_results_middleware(broker):
     return any(type(m) is Results for m in broker.middleware)
@@ -52,6 +52,10 @@ extra_dependencies = {
         "pylibmc>=1.5,<2.0",
     ],
 
+    "msgpack": [
+        "msgpack>=1.0,<2.0",
+    ],
+
     "rabbitmq": [
         "pika>=1.0,<2.0",
     ],
@@ -1,5 +1,6 @@
 import os
 import platform
+import time
 from contextlib import contextmanager
 
 import pika
@@ -19,6 +20,17 @@ def worker(*args, **kwargs):
         worker.stop()
 
 
+def get_consumer(worker, queue_name):
+    """Wait for a worker to start consuming a queue and return the
+    underlying broker consumer.
+    """
+    consumer_thread = worker.consumers[queue_name]
+    while consumer_thread.consumer is None:
+        time.sleep(0.01)
+
+    return consumer_thread.consumer
+
+
 skip_in_ci = pytest.mark.skipif(
     os.getenv("APPVEYOR") is not None or
     os.getenv("GITHUB_ACTION") is not None,
@@ -12,9 +12,11 @@ import dramatiq
 from dramatiq import Worker
 from dramatiq.brokers.rabbitmq import RabbitmqBroker
 from dramatiq.brokers.redis import RedisBroker
+from dramatiq.brokers.redis_streams import RedisStreamsBroker
 from dramatiq.brokers.stub import StubBroker
 from dramatiq.rate_limits import backends as rl_backends
 from dramatiq.results import backends as res_backends
+from dramatiq.results import notifiers as res_notifiers
 
 from .common import RABBITMQ_CREDENTIALS
 
@@ -86,6 +88,18 @@ def redis_broker():
     broker.close()
 
 
+@pytest.fixture()
+def redis_streams_broker():
+    broker = RedisStreamsBroker()
+    check_redis(broker.client)
+    broker.client.flushall()
+    broker.emit_after("process_boot")
+    dramatiq.set_broker(broker)
+    yield broker
+    broker.client.flushall()
+    broker.close()
+
+
 @pytest.fixture()
 def stub_worker(stub_broker):
     worker = Worker(stub_broker, worker_timeout=100, worker_threads=32)
@@ -110,6 +124,14 @@ def redis_worker(redis_broker):
     worker.stop()
 
 
+@pytest.fixture()
+def redis_streams_worker(redis_streams_broker):
+    worker = Worker(redis_streams_broker, worker_threads=32)
+    worker.start()
+    yield worker
+    worker.stop()
+
+
 @pytest.fixture
 def info_logging():
     logger = logging.getLogger()
@@ -206,3 +228,26 @@ def result_backends(memcached_result_backend, redis_result_backend, stub_result_
 @pytest.fixture(params=["memcached", "redis", "stub"])
 def result_backend(request, result_backends):
     return result_backends[request.param]
+
+
+@pytest.fixture(params=["redis", "stub"])
+def async_result_backend(request):
+    return request.getfixturevalue("%s_result_backend" % request.param)
+
+
+@pytest.fixture
+def local_result_notifier():
+    return res_notifiers.LocalNotifier()
+
+
+@pytest.fixture
+def redis_result_notifier():
+    notifier = res_notifiers.RedisNotifier()
+    check_redis(notifier.client)
+    yield notifier
+    notifier.close()
+
+
+@pytest.fixture(params=["local", "redis"])
+def result_notifier(request):
+    return request.getfixturevalue("%s_result_notifier" % request.param)
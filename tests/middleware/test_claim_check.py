@@ -0,0 +1,277 @@
+import os
+import time
+
+import pytest
+
+import dramatiq
+from dramatiq import DecodeError, Message
+from dramatiq.middleware import ClaimCheck, ClaimCheckEncoder, FileSystemBlobStore
+
+from ..common import worker
+
+
+@pytest.fixture
+def blob_store(tmp_path):
+    return FileSystemBlobStore(str(tmp_path / "blobs"), sweep_interval=0)
+
+
+@pytest.fixture
+def claim_check_encoder(blob_store):
+    old_encoder = dramatiq.get_encoder()
+    new_encoder = ClaimCheckEncoder(dramatiq.JSONEncoder(), blob_store, threshold=1024)
+    dramatiq.set_encoder(new_encoder)
+    yield new_encoder
+    dramatiq.set_encoder(old_encoder)
+
+
+def test_file_system_blob_store_can_store_blobs(blob_store):
+    # When I put a blob in the store
+    blob_store.put("some-key", b"some-data")
+
+    # Then I should be able to get it back
+    assert blob_store.get("some-key") == b"some-data"
+
+    # When I delete it
+    blob_store.delete("some-key")
+
+    # Then getting it should raise a KeyError
+    with pytest.raises(KeyError):
+        blob_store.get("some-key")
+
+    # And deleting it again should have no effect
+    blob_store.delete("some-key")
+
+
+def test_file_system_blob_store_can_expire_blobs(blob_store):
+    # Given that I have a couple of blobs in the store
+    blob_store.put("some-key", b"some-data")
+    blob_store.put("other-key", b"other-data")
+
+    # When I expire one of them in the future
+    blob_store.expire("some-key", 60000)
+
+    # Then I should still be able to get it
+    assert blob_store.get("some-key") == b"some-data"
+
+    # When I expire the other one right away
+    blob_store.expire("other-key", 0)
+
+    # Then it should be deleted
+    with pytest.raises(KeyError):
+        blob_store.get("other-key")
+
+    # And the first one should be left alone
+    assert _list_blobs(blob_store) == ["some-key"]
+
+
+def test_file_system_blob_store_rejects_keys_outside_its_directory(blob_store):
+    # When I try to put a blob outside of the store's directory
+    # Then a ValueError should be raised
+    with pytest.raises(ValueError):
+        blob_store.put("../some-key", b"some-data")
+
+
+def test_claim_check_encoder_offloads_large_arguments(blob_store, claim_check_encoder):
+    # Given that I have a message with large arguments
+    message = Message(
+        queue_name="default",
+        actor_name="do_work",
+        args=("a" * 4096,), kwargs={"b": 1},
+        options={},
+    )
+
+    # When I encode that message
+    data = message.encode()
+
+    # Then its arguments should be offloaded to the blob store
+    assert len(data) < 1024
+    assert len(_list_blobs(blob_store)) == 1
+
+    # And decoding it should only load them once they're accessed
+    decoded_message = Message.decode(data)
+    assert decoded_message.options == {"claim_check": _list_blobs(blob_store)[0]}
+    assert "args" not in decoded_message.__dict__
+    assert decoded_message.args == message.args
+    assert decoded_message.kwargs == message.kwargs
+
+
+def test_claim_check_encoder_leaves_small_arguments_alone(blob_store, claim_check_encoder):
+    # Given that I have a message with small arguments
+    message = Message(
+        queue_name="default",
+        actor_name="do_work",
+        args=(1,), kwargs={},
+        options={},
+    )
+
+    # When I encode and decode that message
+    decoded_message = Message.decode(message.encode())
+
+    # Then its arguments shouldn't be offloaded
+    assert decoded_message == message
+    assert _list_blobs(blob_store) == []
+
+
+def test_claim_check_encoder_raises_decode_errors_for_missing_arguments(blob_store, claim_check_encoder):
+    # Given that I have an encoded message whose arguments were offloaded
+    message = Message(
+        queue_name="default",
+        actor_name="do_work",
+        args=("a" * 4096,), kwargs={},
+        options={},
+    )
+    data = message.encode()
+
+    # And its arguments have since been deleted
+    blob_store.delete(_list_blobs(blob_store)[0])
+
+    # When I decode that message
+    decoded_message = Message.decode(data)
+
+    # Then accessing its arguments should raise a DecodeError
+    with pytest.raises(DecodeError):
+        decoded_message.args
+
+
+def test_claim_check_expires_arguments_after_messages_are_processed(
+        stub_broker, stub_worker, blob_store, claim_check_encoder,
+):
+    # Given that I have a broker with the claim check middleware
+    stub_broker.add_middleware(ClaimCheck(blob_store, ack_grace_ttl=0))
+
+    # And an actor that fails once and then stores its argument
+    db, failures = [], []
+
+    @dramatiq.actor(min_backoff=10, max_backoff=10)
+    def do_work(value):
+        if not failures:
+            failures.append(1)
+            raise RuntimeError("First failure.")
+
+        db.append(value)
+
+    # When I send that actor a message with a large argument
+    do_work.send("a" * 4096)
+
+    # And wait on the broker and worker
+    stub_broker.join(do_work.queue_name)
+    stub_worker.join()
+
+    # Then the retried message should have been processed with that argument
+    assert db == ["a" * 4096]
+
+    # And the argument should have been deleted from the blob store
+    assert _list_blobs(blob_store) == []
+
+
+def test_claim_check_keeps_arguments_of_acked_messages_for_a_grace_period(
+        stub_broker, stub_worker, blob_store, claim_check_encoder,
+):
+    # Given that I have a broker with the claim check middleware
+    stub_broker.add_middleware(ClaimCheck(blob_store, ack_grace_ttl=60000))
+
+    # And an actor
+    @dramatiq.actor
+    def do_work(value):
+        pass
+
+    # When I send that actor a message with a large argument
+    do_work.send("a" * 4096)
+
+    # And wait on the broker and worker
+    stub_broker.join(do_work.queue_name)
+    stub_worker.join()
+
+    # Then the argument should still be in the blob store
+    assert len(_list_blobs(blob_store)) == 1
+
+    # And it should be set to expire once the grace period is over
+    assert _get_expiration(blob_store, _list_blobs(blob_store)[0]) == pytest.approx(time.time() + 60, abs=5)
+
+
+def test_claim_check_keeps_arguments_of_dead_lettered_messages(
+        stub_broker, stub_worker, blob_store, claim_check_encoder,
+):
+    # Given that I have a broker with the claim check middleware
+    stub_broker.add_middleware(ClaimCheck(blob_store, ack_grace_ttl=0, dead_message_ttl=3600000))
+
+    # And an actor that always fails
+    @dramatiq.actor(max_retries=0)
+    def do_work(value):
+        raise RuntimeError("Failure.")
+
+    # When I send that actor a message with a large argument
+    do_work.send("a" * 4096)
+
+    # And wait on the broker and worker
+    stub_broker.join(do_work.queue_name, fail_fast=False)
+    stub_worker.join()
+
+    # Then the message should have been dead-lettered
+    assert len(stub_broker.dead_letters) == 1
+
+    # And its argument should be kept for as long as dead-lettered messages are
+    key = stub_broker.dead_letters[0].options["claim_check"]
+    assert _list_blobs(blob_store) == [key]
+    assert _get_expiration(blob_store, key) == pytest.approx(time.time() + 3600, abs=5)
+
+    # And requeueing it should still be able to load it
+    assert Message.decode(stub_broker.dead_letters[0].encode()).args == ("a" * 4096,)
+
+
+def test_claim_check_keeps_arguments_until_messages_are_acked(
+        stub_broker, blob_store, claim_check_encoder,
+):
+    # Given that I have a broker with the claim check middleware
+    stub_broker.add_middleware(ClaimCheck(blob_store, ack_grace_ttl=0))
+
+    # And an actor
+    stored = []
+
+    @dramatiq.actor
+    def do_work(value):
+        pass
+
+    # And a middleware that checks the blob store right before messages are acked
+    class AckRecorder(dramatiq.Middleware):
+        def before_ack(self, broker, message):
+            stored.append(_list_blobs(blob_store) == [message.options["claim_check"]])
+
+    stub_broker.add_middleware(AckRecorder())
+
+    # When I send that actor a message with a large argument
+    do_work.send("a" * 4096)
+
+    # And process it
+    with worker(stub_broker, worker_timeout=100):
+        stub_broker.join(do_work.queue_name)
+
+    # Then the argument should still have been stored right before the ack
+    assert stored == [True]
+
+    # And it should have been deleted afterwards
+    assert _list_blobs(blob_store) == []
+
+
+def test_claim_check_encoder_offloads_every_encoding_to_its_own_blob(blob_store, claim_check_encoder):
+    # Given that I have a message with large arguments
+    message = Message(queue_name="default", actor_name="do_work", args=("a" * 4096,), kwargs={}, options={})
+
+    # When I encode it twice, as happens when it's sent twice
+    first_message = Message.decode(message.encode())
+    second_message = Message.decode(message.encode())
+
+    # Then each encoding should have offloaded its arguments to its own blob
+    assert first_message.options["claim_check"] != second_message.options["claim_check"]
+
+    # And expiring the first one's arguments should leave the second one's alone
+    blob_store.expire(first_message.options["claim_check"], 0)
+    assert second_message.args == message.args
+
+
+def _list_blobs(blob_store):
+    return sorted(name for name in os.listdir(blob_store.path) if not name.startswith("."))
+
+
+def _get_expiration(blob_store, key):
+    return os.stat(os.path.join(blob_store.expirations_path, key)).st_mtime
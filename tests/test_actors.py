@@ -1,3 +1,5 @@
+import asyncio
+import threading
 import time
 from unittest.mock import patch
 
@@ -109,6 +111,60 @@ def test_actors_can_be_sent_messages(stub_broker):
     assert enqueued_message == Message.decode(enqueued_message_data)
 
 
+def test_actors_can_be_sent_many_messages_at_once(stub_broker):
+    # Given that I have an actor
+    @dramatiq.actor
+    def add(x, y):
+        return x + y
+
+    # If I send it many messages at once
+    enqueued_messages = add.send_many([(1, 2), (3, 4)])
+
+    # I expect all of them to be enqueued in order
+    assert [m.args for m in enqueued_messages] == [(1, 2), (3, 4)]
+    for enqueued_message in enqueued_messages:
+        enqueued_message_data = stub_broker.queues["default"].get(timeout=1)
+        assert enqueued_message == Message.decode(enqueued_message_data)
+
+
+def test_actors_can_be_sent_messages_from_coroutines(stub_broker):
+    # Given that I have an actor
+    @dramatiq.actor
+    def add(x, y):
+        return x + y
+
+    # If I send it a message from a coroutine
+    enqueued_message = asyncio.run(add.send_async(1, 2))
+
+    # I expect it to enqueue a message
+    enqueued_message_data = stub_broker.queues["default"].get(timeout=1)
+    assert enqueued_message == Message.decode(enqueued_message_data)
+
+
+def test_brokers_enqueue_messages_from_coroutines_on_an_executor_by_default(stub_broker):
+    # Given that I have an actor
+    @dramatiq.actor
+    def add(x, y):
+        return x + y
+
+    # And a broker whose enqueue method records the thread it's called from
+    threads = []
+    enqueue = stub_broker.enqueue
+
+    def record_enqueue(message, *, delay=None):
+        threads.append(threading.current_thread())
+        return enqueue(message, delay=delay)
+
+    # If I enqueue a message from a coroutine using the default implementation
+    with patch.object(stub_broker, "enqueue", record_enqueue):
+        enqueued_message = asyncio.run(dramatiq.Broker.enqueue_async(stub_broker, add.message(1, 2)))
+
+    # I expect it to have been enqueued off of the event loop's thread
+    assert threads and threads[0] is not threading.current_thread()
+    enqueued_message_data = stub_broker.queues["default"].get(timeout=1)
+    assert enqueued_message == Message.decode(enqueued_message_data)
+
+
 def test_actors_can_perform_work(stub_broker, stub_worker):
     # Given that I have a database
     database = {}
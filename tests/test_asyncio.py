@@ -0,0 +1,218 @@
+import asyncio
+import time
+from unittest import mock
+
+import pytest
+
+import dramatiq
+from dramatiq.asyncio import EventLoopThread, get_event_loop_thread
+from dramatiq.middleware import AsyncIO, CurrentMessage, ShutdownNotifications, TimeLimitExceeded
+
+from .common import worker
+
+
+@pytest.fixture
+def event_loop_thread():
+    event_loop_thread = EventLoopThread()
+    event_loop_thread.start()
+    yield event_loop_thread
+    event_loop_thread.stop()
+    event_loop_thread.join()
+
+
+def test_async_actors_can_be_called_directly(stub_broker):
+    # Given that I have an async actor
+    @dramatiq.actor
+    async def add(x, y):
+        await asyncio.sleep(0)
+        return x + y
+
+    # When I call it outside of a worker
+    # Then I expect it to run to completion
+    assert add.is_async
+    assert add(1, 2) == 3
+
+
+def test_event_loop_threads_can_interrupt_coroutines(event_loop_thread):
+    # Given that I have a coroutine that runs for a long time
+    cancelled = []
+
+    async def sleep():
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+
+    # When I schedule an interrupt for it and submit it to the event loop
+    event_loop_thread.interrupt_after("sleep", 0.05, TimeLimitExceeded)
+    future = event_loop_thread.submit("sleep", sleep())
+
+    # Then I expect it to be cancelled and the interrupt to be raised in its place
+    with pytest.raises(TimeLimitExceeded):
+        future.result(timeout=5)
+
+    assert cancelled == [True]
+
+
+def test_workers_run_async_actors_concurrently(stub_broker):
+    # Given that I have a broker with the AsyncIO middleware
+    stub_broker.add_middleware(AsyncIO())
+
+    # And an async actor that waits for all of its messages to be running at once
+    running, done = [], []
+
+    @dramatiq.actor
+    async def wait_for_others(x):
+        running.append(x)
+        deadline = time.monotonic() + 5
+        while len(running) < 3 and time.monotonic() < deadline:
+            await asyncio.sleep(0.01)
+
+        if len(running) == 3:
+            done.append(x)
+
+    # When I send it more messages than there are worker threads
+    with worker(stub_broker, worker_threads=2, worker_timeout=100) as stub_worker:
+        assert get_event_loop_thread() is not None
+        for i in range(3):
+            wait_for_others.send(i)
+
+        stub_broker.join(wait_for_others.queue_name, fail_fast=True)
+        stub_worker.join()
+
+    # Then I expect all of the messages to have run concurrently
+    assert sorted(done) == [0, 1, 2]
+
+    # And the event loop thread to have been stopped with the worker
+    assert get_event_loop_thread() is None
+
+
+def test_async_actors_respect_time_limits(stub_broker):
+    # Given that I have a broker with the AsyncIO middleware
+    stub_broker.add_middleware(AsyncIO())
+
+    # And an async actor with a short time limit
+    cancelled = []
+
+    @dramatiq.actor(time_limit=50, max_retries=0)
+    async def sleep():
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+
+    # When I send it a message
+    with worker(stub_broker, worker_threads=1, worker_timeout=100) as stub_worker:
+        sleep.send()
+
+        # Then I expect the message to fail with TimeLimitExceeded
+        with pytest.raises(TimeLimitExceeded):
+            stub_broker.join(sleep.queue_name, fail_fast=True)
+
+        stub_worker.join()
+
+    # And the coroutine to have been cancelled
+    assert cancelled == [True]
+
+
+def test_async_actors_can_access_the_current_message(stub_broker):
+    # Given that I have a broker with the AsyncIO and CurrentMessage middleware
+    stub_broker.add_middleware(AsyncIO())
+    stub_broker.add_middleware(CurrentMessage())
+
+    # And an async actor that accesses the current message
+    received_messages = []
+
+    @dramatiq.actor
+    async def accessor(x):
+        await asyncio.sleep(0)
+        received_messages.append(CurrentMessage.get_current_message()._message)
+
+    # When I send it a couple of messages
+    with worker(stub_broker, worker_threads=1, worker_timeout=100) as stub_worker:
+        sent_messages = [accessor.send(1), accessor.send(2)]
+        stub_broker.join(accessor.queue_name, fail_fast=True)
+        stub_worker.join()
+
+    # Then the sent messages and the received messages should be the same
+    assert sorted(sent_messages) == sorted(received_messages)
+
+
+def test_async_actors_are_interrupted_on_shutdown(stub_broker):
+    # Given that I have a broker with the AsyncIO middleware
+    stub_broker.add_middleware(AsyncIO())
+
+    # And an async actor that asks to be notified on shutdown
+    started, cancelled = [], []
+
+    @dramatiq.actor(notify_shutdown=True, max_retries=0)
+    async def sleep():
+        started.append(True)
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+
+    # When I send it a message and stop the worker once it has started
+    with worker(stub_broker, worker_threads=1, worker_timeout=100):
+        sleep.send()
+        deadline = time.monotonic() + 5
+        while not started and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+    # Then I expect the coroutine to have been cancelled
+    assert cancelled == [True]
+
+
+def test_async_actors_dont_remove_thread_shutdown_notifications(stub_broker):
+    # Given that I have a broker with the AsyncIO middleware
+    stub_broker.add_middleware(AsyncIO())
+
+    # And its shutdown notifications middleware
+    shutdown_notifications, = (m for m in stub_broker.middleware if isinstance(m, ShutdownNotifications))
+
+    # And an async actor that asks to be notified on shutdown
+    @dramatiq.actor(notify_shutdown=True)
+    async def do_work():
+        pass
+
+    # When I send it a couple of messages and process them
+    with mock.patch.object(shutdown_notifications.manager, "remove_notification") as remove_notification:
+        with worker(stub_broker, worker_threads=1, worker_timeout=100) as stub_worker:
+            do_work.send()
+            do_work.send()
+            stub_broker.join(do_work.queue_name, fail_fast=True)
+            stub_worker.join()
+
+    # Then no thread notifications should have been removed on their behalf
+    assert remove_notification.call_count == 0
+
+    # And no async notifications should be left over
+    assert shutdown_notifications.async_notifications == set()
+
+
+def test_async_actors_can_run_several_deliveries_of_a_message_at_once(stub_broker):
+    # Given that I have a broker with the AsyncIO middleware
+    stub_broker.add_middleware(AsyncIO())
+
+    # And an async actor that sleeps
+    runs = []
+
+    @dramatiq.actor
+    async def sleep():
+        runs.append(True)
+        await asyncio.sleep(0.1)
+
+    # When I enqueue the same message twice and process both copies at once
+    message = sleep.message()
+    with worker(stub_broker, worker_threads=2, worker_timeout=100) as stub_worker:
+        stub_broker.enqueue(message)
+        stub_broker.enqueue(message)
+        stub_broker.join(sleep.queue_name, fail_fast=True)
+        stub_worker.join()
+
+    # Then both copies should have run
+    assert runs == [True, True]
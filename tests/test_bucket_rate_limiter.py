@@ -1,4 +1,5 @@
 import time
+from unittest.mock import patch
 
 from dramatiq.rate_limits import BucketRateLimiter
 
@@ -26,3 +27,25 @@ def test_bucket_rate_limiter_limits_per_bucket(rate_limiter_backend):
 
     # I expect it to have succeeded four times
     assert calls == 4
+
+
+def test_bucket_rate_limiter_can_lease_permits(rate_limiter_backend):
+    # Given that I have a bucket rate limiter that leases permits in blocks
+    limiter = BucketRateLimiter(rate_limiter_backend, "lease-test", limit=10, bucket=3_600_000, lease=4)
+
+    # When I acquire it more times than its limit
+    with patch.object(rate_limiter_backend, "incr", wraps=rate_limiter_backend.incr) as incr:
+        calls = 0
+        for _ in range(20):
+            with limiter.acquire(raise_on_failure=False) as acquired:
+                if acquired:
+                    calls += 1
+
+    # Then I expect it to have succeeded up to its limit
+    assert calls == 10
+
+    # And the backend to have been hit far fewer times than the limiter was acquired
+    assert incr.call_count <= 8
+
+    # And no block reserves to have been retried once one failed
+    assert [call.args[1] for call in incr.call_args_list] == [4, 4, 1, 1, 1]
@@ -3,8 +3,11 @@ import signal
 import time
 from subprocess import PIPE, STDOUT
 
+import pytest
+
 import dramatiq
 from dramatiq.brokers.redis import RedisBroker
+from dramatiq.cli import make_argument_parser
 from dramatiq.common import current_millis
 from dramatiq.middleware import Middleware
 
@@ -295,3 +298,25 @@ def test_after_process_boot_call_has_no_blocked_signals(start_cli):
 
     # Then I expect that no signals are blocked
     assert blocked_signals == "current_sigmask=[]"
+
+
+def test_cli_parses_queue_weights():
+    # Given that I have an argument parser
+    parser = make_argument_parser()
+
+    # When I parse some queue weights
+    args = parser.parse_args(["some_module", "--queue-weights", "critical=5,bulk=1"])
+
+    # Then I expect them to be parsed into a dict
+    assert args.queue_weights == {"critical": 5, "bulk": 1}
+
+
+@pytest.mark.parametrize("value", ["critical", "critical=", "critical=0", "=5", "critical=a"])
+def test_cli_rejects_invalid_queue_weights(value):
+    # Given that I have an argument parser
+    parser = make_argument_parser()
+
+    # When I parse an invalid queue weight
+    # Then I expect parsing to fail
+    with pytest.raises(SystemExit):
+        parser.parse_args(["some_module", "--queue-weights", value])
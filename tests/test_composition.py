@@ -1,5 +1,7 @@
+import asyncio
 import time
 from threading import Condition, Event
+from unittest.mock import patch
 
 import pytest
 
@@ -239,6 +241,53 @@ def test_groups_can_time_out(stub_broker, stub_worker, result_backend):
     assert not g.completed
 
 
+def test_group_results_can_be_awaited_concurrently(stub_broker, stub_worker, async_result_backend):
+    # Given that I have a result backend
+    stub_broker.add_middleware(Results(backend=async_result_backend))
+
+    # And I have an actor that sleeps for 100ms
+    @dramatiq.actor(store_results=True)
+    def wait(x):
+        time.sleep(0.1)
+        return x
+
+    # When I group a group and a pipeline with a few messages and run it
+    g = group([
+        group(wait.message(i) for i in range(3)),
+        wait.message(3) | wait.message_with_options(args=(4,), pipe_ignore=True),
+        wait.message(5),
+    ])
+    g.run()
+
+    # And I await its results
+    results = asyncio.run(g.get_results_async(block=True))
+
+    # Then I should get back the result of every child
+    assert results == [[0, 1, 2], 4, 5]
+
+    # And awaiting the group should be successful
+    asyncio.run(g.wait_async())
+
+
+def test_awaiting_groups_can_time_out(stub_broker, stub_worker, async_result_backend):
+    # Given that I have a result backend
+    stub_broker.add_middleware(Results(backend=async_result_backend))
+
+    # And I have an actor that sleeps for 300ms
+    @dramatiq.actor(store_results=True)
+    def wait():
+        time.sleep(0.3)
+
+    # When I group a few jobs together and run it
+    g = group(wait.message() for _ in range(2))
+    g.run()
+
+    # And await the group with a timeout
+    # Then a ResultTimeout error should be raised
+    with pytest.raises(ResultTimeout):
+        asyncio.run(g.wait_async(timeout=100))
+
+
 def test_groups_expose_completion_stats(stub_broker, stub_worker, result_backend):
     # Given that I have a result backend
     stub_broker.add_middleware(Results(backend=result_backend))
@@ -268,6 +317,43 @@ def test_groups_expose_completion_stats(stub_broker, stub_worker, result_backend
     assert g.completed
 
 
+@pytest.mark.parametrize("backend", ["redis", "stub"])
+def test_groups_fetch_results_in_bulk(request, stub_broker, stub_worker, backend):
+    # Given that I have a result backend
+    result_backend = request.getfixturevalue("%s_result_backend" % backend)
+    stub_broker.add_middleware(Results(backend=result_backend))
+
+    # And an actor that stores results
+    @dramatiq.actor(store_results=True)
+    def add(x, y):
+        return x + y
+
+    # When I run a group of messages, groups and pipelines
+    g = group([
+        add.message(1, 2),
+        group(add.message(i, i) for i in range(3)),
+        add.message(1, 1) | add.message(1),
+    ])
+    g.run()
+
+    # And wait on its results
+    with patch.object(result_backend, "_get_many", wraps=result_backend._get_many) as get_many:
+        results = list(g.get_results(block=True))
+
+    # Then I should get back the results of every child
+    assert results == [3, [0, 2, 4], 3]
+
+    # When I check how many of its children completed
+    with patch.object(result_backend, "_get_many", wraps=result_backend._get_many) as get_many:
+        completed_count = g.completed_count
+
+    # Then all of them should have completed
+    assert completed_count == 3
+
+    # And the results should have been fetched in a single call to the backend
+    assert get_many.call_count == 1
+
+
 def test_pipeline_does_not_continue_to_next_actor_when_message_is_marked_as_failed(stub_broker, stub_worker):
     # Given that I have an actor that fails messages
     class FailMessageMiddleware(middleware.Middleware):
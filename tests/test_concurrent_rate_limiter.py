@@ -1,7 +1,12 @@
+import copy
+import pickle
 import time
 from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
 
-from dramatiq.rate_limits import ConcurrentRateLimiter, RateLimitExceeded
+import pytest
+
+from dramatiq.rate_limits import BucketRateLimiter, ConcurrentRateLimiter, RateLimitExceeded
 
 
 def test_concurrent_rate_limiter_releases_the_lock_after_each_call(rate_limiter_backend):
@@ -73,3 +78,157 @@ def test_concurrent_rate_limiter_limits_concurrency(rate_limiter_backend):
 
     # I expect at most 4 calls to have succeeded
     assert 3 <= sum(calls) <= 4
+
+
+def test_rate_limiter_backends_leave_keys_alone_when_increments_fail(rate_limiter_backend):
+    # Given a key that's close to its maximum
+    rate_limiter_backend.add("failed-incr-test", 3, ttl=1000)
+
+    # When I try to increment it past its maximum
+    # Then I expect the increment to fail
+    assert not rate_limiter_backend.incr("failed-incr-test", 4, maximum=5, ttl=1000)
+
+    # And the permits that were left to still be available
+    assert rate_limiter_backend.incr("failed-incr-test", 2, maximum=5, ttl=1000)
+    assert not rate_limiter_backend.incr("failed-incr-test", 1, maximum=5, ttl=1000)
+
+
+def test_redis_rate_limiter_backend_operations_take_a_single_round_trip(redis_rate_limiter_backend):
+    # Given a Redis rate limiter backend that has loaded its scripts
+    backend = redis_rate_limiter_backend
+    backend.incr("round-trip-test", 1, maximum=10, ttl=1000)
+    backend.decr("round-trip-test", 1, minimum=0, ttl=1000)
+    backend.incr_and_sum("round-trip-test", ["round-trip-test"], 1, maximum=10, ttl=1000)
+
+    # When I increment and decrement keys while counting the commands sent to Redis
+    with patch.object(backend.client, "execute_command", wraps=backend.client.execute_command) as execute_command:
+        assert backend.incr("round-trip-test", 1, maximum=10, ttl=1000)
+        assert not backend.incr("round-trip-test", 10, maximum=10, ttl=1000)
+        assert backend.decr("round-trip-test", 1, minimum=0, ttl=1000)
+        assert not backend.decr("round-trip-test", 10, minimum=0, ttl=1000)
+        assert backend.incr_and_sum("round-trip-test", lambda: ["round-trip-test", "other"], 1, maximum=10, ttl=1000)
+
+    # Then each operation should have been a single command
+    assert execute_command.call_count == 5
+
+
+@pytest.mark.parametrize("backend", ["redis", "stub"])
+def test_concurrent_rate_limiter_keeps_waiters_registered_while_they_wait(request, backend):
+    # Given that I have a distributed mutex whose keys expire quickly
+    rate_limiter_backend = request.getfixturevalue("%s_rate_limiter_backend" % backend)
+    mutex = ConcurrentRateLimiter(rate_limiter_backend, "waiters-test", limit=1, ttl=2000)
+
+    # And a holder of that mutex whose slot doesn't expire
+    holder = ConcurrentRateLimiter(rate_limiter_backend, "waiters-test", limit=1, ttl=60000)
+
+    with ThreadPoolExecutor(max_workers=1) as e:
+        with holder.acquire():
+            # When I wait on the mutex for longer than its keys live for
+            future = e.submit(lambda: mutex._acquire_blocking(timeout=5000))
+            time.sleep(3)
+
+            # Then I expect the waiter to still be registered
+            assert not future.done()
+            assert rate_limiter_backend.incr(mutex.key_waiters, 0, maximum=1, ttl=2000)
+            assert not rate_limiter_backend.incr(mutex.key_waiters, 1, maximum=1, ttl=2000)
+
+        # And to acquire the mutex once it's released
+        assert future.result()
+
+    mutex._release()
+
+
+def test_rate_limiters_that_cant_block_refuse_blocking_acquires(stub_rate_limiter_backend):
+    # Given that I have a bucket rate limiter
+    limiter = BucketRateLimiter(stub_rate_limiter_backend, "blocking-bucket-test")
+
+    # When I try to acquire it in blocking mode
+    # Then I expect a NotImplementedError to be raised
+    with pytest.raises(NotImplementedError):
+        with limiter.acquire(block=True):
+            pass
+
+
+@pytest.mark.parametrize("backend", ["redis", "stub"])
+def test_concurrent_rate_limiter_can_block_until_slots_are_released(request, backend):
+    # Given that I have a distributed mutex
+    rate_limiter_backend = request.getfixturevalue("%s_rate_limiter_backend" % backend)
+    mutex = ConcurrentRateLimiter(rate_limiter_backend, "blocking-test", limit=1)
+    calls = []
+
+    # And a function that holds the mutex for a short while
+    def work(i):
+        with mutex.acquire(block=True, timeout=10000):
+            calls.append(i)
+            time.sleep(0.05)
+
+    # When I execute multiple workers concurrently
+    start = time.monotonic()
+    with ThreadPoolExecutor(max_workers=8) as e:
+        for future in [e.submit(work, i) for i in range(8)]:
+            future.result()
+
+    # Then I expect every one of them to have acquired the mutex in turn
+    assert sorted(calls) == list(range(8))
+
+    # And to have been woken up as soon as it was released
+    assert time.monotonic() - start < 2
+
+
+@pytest.mark.parametrize("backend", ["redis", "stub"])
+def test_concurrent_rate_limiter_blocking_acquires_can_time_out(request, backend):
+    # Given that I have a distributed mutex
+    rate_limiter_backend = request.getfixturevalue("%s_rate_limiter_backend" % backend)
+    mutex = ConcurrentRateLimiter(rate_limiter_backend, "blocking-timeout-test", limit=1)
+
+    # When I acquire it
+    with mutex.acquire():
+        # And try to acquire it again while blocking
+        # Then I expect a RateLimitExceeded error once the timeout elapses
+        with pytest.raises(RateLimitExceeded):
+            with mutex.acquire(block=True, timeout=1000):
+                pass
+
+
+@pytest.mark.parametrize("backend", ["redis", "stub"])
+def test_concurrent_rate_limiter_only_publishes_events_to_waiters(request, backend):
+    # Given that I have a distributed mutex
+    rate_limiter_backend = request.getfixturevalue("%s_rate_limiter_backend" % backend)
+    mutex = ConcurrentRateLimiter(rate_limiter_backend, "stale-events-test", limit=1)
+
+    # When I acquire and release it many times while nobody is waiting
+    for _ in range(10):
+        with mutex.acquire():
+            pass
+
+    # Then I expect no events to have been left behind for future waiters
+    assert not rate_limiter_backend.wait(mutex.key_events, 1000, consume=True)
+
+
+def test_redis_concurrent_rate_limiter_releases_take_a_single_round_trip(redis_rate_limiter_backend):
+    # Given that I have a distributed mutex that has been acquired
+    mutex = ConcurrentRateLimiter(redis_rate_limiter_backend, "release-round-trip-test", limit=1)
+    assert mutex._acquire()
+
+    # When I release it while counting the commands sent to Redis
+    client = redis_rate_limiter_backend.client
+    with patch.object(client, "execute_command", wraps=client.execute_command) as execute_command:
+        assert mutex._release()
+
+    # Then the release should have been a single command
+    assert execute_command.call_count == 1
+
+
+def test_rate_limit_exceeded_errors_can_be_pickled_and_copied(stub_rate_limiter_backend):
+    # Given that I have a distributed mutex that has been acquired
+    mutex = ConcurrentRateLimiter(stub_rate_limiter_backend, "pickle-test", limit=1)
+    with mutex.acquire():
+        # When I fail to acquire it again
+        with pytest.raises(RateLimitExceeded) as e:
+            with mutex.acquire():
+                pass
+
+    # Then I expect the error to keep its key when pickled and copied
+    assert pickle.loads(pickle.dumps(e.value)).key == "pickle-test"
+    assert copy.copy(e.value).key == "pickle-test"
+    assert e.value.args == (str(e.value), "pickle-test")
@@ -1,6 +1,11 @@
+import copy
+import pickle
+
 import pytest
 
 import dramatiq
+from dramatiq import DecodeError, Message
+from dramatiq.encoder import COMPRESSION_MARKER
 
 
 @pytest.fixture
@@ -39,3 +44,197 @@ def test_pickle_encoder(pickle_encoder, stub_broker, stub_worker):
 
     # Then I expect the message to have been processed
     assert db == [1]
+
+
+@pytest.fixture
+def msgpack_encoder():
+    old_encoder = dramatiq.get_encoder()
+    new_encoder = dramatiq.MsgPackEncoder()
+    dramatiq.set_encoder(new_encoder)
+    yield new_encoder
+    dramatiq.set_encoder(old_encoder)
+
+
+def test_msgpack_encoder(msgpack_encoder, stub_broker, stub_worker):
+    # Given that I've set a MsgPack encoder as the global encoder
+    # And I have an actor that adds a value to a db
+    db = []
+
+    @dramatiq.actor
+    def add_value(x, *, y):
+        db.append((x, y))
+
+    # When I send that actor a message
+    add_value.send(1, y={"a": [1, 2]})
+
+    # And wait on the broker and worker
+    stub_broker.join(add_value.queue_name)
+    stub_worker.join()
+
+    # Then I expect the message to have been processed
+    assert db == [(1, {"a": [1, 2]})]
+
+
+def test_msgpack_encoder_decodes_message_arguments_lazily(msgpack_encoder):
+    # Given that I've set a MsgPack encoder as the global encoder
+    # And I have an encoded message
+    message = Message(
+        queue_name="default",
+        actor_name="do_work",
+        args=(1, "a"), kwargs={"b": None},
+        options={"eta": 1},
+    )
+    data = message.encode()
+
+    # When I decode that message
+    decoded_message = Message.decode(data)
+
+    # Then its envelope should be decoded
+    assert decoded_message.message_id == message.message_id
+    assert decoded_message.options == {"eta": 1}
+
+    # But its arguments shouldn't be
+    assert "args" not in decoded_message.__dict__
+
+    # Until they're accessed
+    assert decoded_message.args == (1, "a")
+    assert decoded_message.kwargs == {"b": None}
+    assert decoded_message == message
+
+
+def test_lazily_decoded_messages_can_be_pickled_and_copied(msgpack_encoder):
+    # Given that I've set a MsgPack encoder as the global encoder
+    # And I have a message whose arguments haven't been decoded yet
+    message = Message(
+        queue_name="default",
+        actor_name="do_work",
+        args=(1, "a"), kwargs={"b": None},
+        options={},
+    )
+    decoded_message = Message.decode(message.encode())
+
+    # When I pickle and deep copy that message
+    pickled_message = pickle.loads(pickle.dumps(decoded_message))
+    copied_message = copy.deepcopy(Message.decode(message.encode()))
+
+    # Then both should be equal to the original message
+    assert pickled_message == message
+    assert copied_message == message
+
+
+def test_msgpack_encoder_raises_decode_errors_for_invalid_arguments(msgpack_encoder):
+    # Given that I've set a MsgPack encoder as the global encoder
+    # And I have a message whose arguments are corrupt
+    data = msgpack_encoder.encode({
+        "queue_name": "default",
+        "actor_name": "do_work",
+        "options": {},
+        "message_id": "some-id",
+        "message_timestamp": 0,
+        "arguments": b"\xc1",
+    })
+
+    # When I decode that message
+    message = Message.decode(data)
+
+    # Then accessing its arguments should raise a DecodeError
+    with pytest.raises(DecodeError):
+        message.args
+
+    # And it should keep raising it on subsequent accesses
+    with pytest.raises(DecodeError):
+        message.kwargs
+
+
+@pytest.mark.parametrize("algorithm", ["zlib", "bz2", "lzma"])
+def test_compressing_encoder_compresses_large_payloads(algorithm):
+    # Given that I have a compressing encoder
+    encoder = dramatiq.CompressingEncoder(dramatiq.JSONEncoder(), threshold=1024, algorithm=algorithm)
+
+    # And a large payload
+    data = {"args": ["a" * 4096]}
+
+    # When I encode that payload
+    encoded_data = encoder.encode(data)
+
+    # Then it should get compressed
+    assert encoded_data.startswith(COMPRESSION_MARKER)
+    assert len(encoded_data) < 4096
+
+    # And it should decode to the original payload
+    assert encoder.decode(encoded_data) == data
+
+
+def test_compressing_encoder_leaves_small_payloads_alone():
+    # Given that I have a compressing encoder
+    inner_encoder = dramatiq.JSONEncoder()
+    encoder = dramatiq.CompressingEncoder(inner_encoder, threshold=1024)
+
+    # When I encode a small payload
+    data = {"args": ["a" * 128]}
+    encoded_data = encoder.encode(data)
+
+    # Then it should be left as the inner encoder encoded it
+    assert encoded_data == inner_encoder.encode(data)
+    assert encoder.decode(encoded_data) == data
+
+
+def test_compressing_encoder_can_decode_payloads_compressed_with_other_algorithms():
+    # Given that I have a payload compressed using lzma
+    data = {"args": ["a" * 4096]}
+    encoded_data = dramatiq.CompressingEncoder(dramatiq.JSONEncoder(), algorithm="lzma").encode(data)
+
+    # When I decode it using an encoder that compresses using zlib
+    encoder = dramatiq.CompressingEncoder(dramatiq.JSONEncoder(), algorithm="zlib")
+
+    # Then I should get back the original payload
+    assert encoder.decode(encoded_data) == data
+
+
+def test_compressing_encoder_raises_decode_errors_for_corrupt_payloads():
+    # Given that I have a compressing encoder
+    encoder = dramatiq.CompressingEncoder(dramatiq.JSONEncoder())
+
+    # When I decode a corrupt payload
+    # Then a DecodeError should be raised
+    with pytest.raises(DecodeError):
+        encoder.decode(COMPRESSION_MARKER + b"zgarbage")
+
+
+def test_compressing_encoder_rejects_unknown_algorithms():
+    # When I create a compressing encoder with an unknown algorithm
+    # Then a ValueError should be raised
+    with pytest.raises(ValueError):
+        dramatiq.CompressingEncoder(dramatiq.JSONEncoder(), algorithm="rot13")
+
+
+def test_compressing_encoder_keeps_message_arguments_lazy(stub_broker, stub_worker):
+    # Given that I've set a compressing MsgPack encoder as the global encoder
+    old_encoder = dramatiq.get_encoder()
+    dramatiq.set_encoder(dramatiq.CompressingEncoder(dramatiq.MsgPackEncoder(), threshold=0))
+
+    try:
+        # And I have an actor that adds a value to a db
+        db = []
+
+        @dramatiq.actor
+        def add_value(x):
+            db.append(x)
+
+        # When I encode and decode a message for that actor
+        message = Message.decode(add_value.message("a" * 4096).encode())
+
+        # Then its arguments shouldn't be decoded up front
+        assert "args" not in message.__dict__
+
+        # When I send that actor a message
+        add_value.send("a" * 4096)
+
+        # And wait on the broker and worker
+        stub_broker.join(add_value.queue_name)
+        stub_worker.join()
+
+        # Then I expect the message to have been processed
+        assert db == ["a" * 4096]
+    finally:
+        dramatiq.set_encoder(old_encoder)
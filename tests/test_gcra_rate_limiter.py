@@ -0,0 +1,51 @@
+from unittest.mock import patch
+
+from dramatiq.rate_limits import GCRARateLimiter
+
+
+def acquire_at(limiter, timestamp):
+    with patch("dramatiq.rate_limits.gcra.time.time", return_value=timestamp):
+        with limiter.acquire(raise_on_failure=False) as acquired:
+            return acquired
+
+
+def test_gcra_rate_limiter_spaces_out_operations(rate_limiter_backend):
+    # Given that I have a GCRA rate limiter that allows 10 operations per second
+    limiter = GCRARateLimiter(rate_limiter_backend, "gcra-test", limit=10, period=1000)
+
+    # When I acquire it
+    # Then I expect it to succeed
+    assert acquire_at(limiter, 1000.0)
+
+    # When I acquire it again before 100ms have passed
+    # Then I expect it to fail
+    assert not acquire_at(limiter, 1000.05)
+
+    # When I acquire it again once 100ms have passed
+    # Then I expect it to succeed
+    assert acquire_at(limiter, 1000.1)
+
+
+def test_gcra_rate_limiter_allows_bursts_up_to_a_limit(rate_limiter_backend):
+    # Given that I have a GCRA rate limiter that allows bursts of 5 operations
+    limiter = GCRARateLimiter(rate_limiter_backend, "gcra-burst-test", limit=10, period=1000, burst=5)
+
+    # When I acquire it many times at once
+    # Then I expect only the burst to succeed
+    assert [acquire_at(limiter, 1000.0) for _ in range(8)] == [True] * 5 + [False] * 3
+
+    # When I acquire it many times once a second has passed
+    # Then I expect a whole burst to succeed again
+    assert [acquire_at(limiter, 1001.0) for _ in range(8)] == [True] * 5 + [False] * 3
+
+
+def test_gcra_rate_limiter_doesnt_allow_bursts_at_period_boundaries(rate_limiter_backend):
+    # Given that I have a GCRA rate limiter that allows 2 operations per second back to back
+    limiter = GCRARateLimiter(rate_limiter_backend, "gcra-boundary-test", limit=2, period=1000, burst=2)
+
+    # When I use up its limit right before a second ends
+    assert [acquire_at(limiter, 1000.99) for _ in range(2)] == [True, True]
+
+    # And I acquire it again right after the next second starts
+    # Then I expect it to fail
+    assert not acquire_at(limiter, 1001.01)
@@ -3,12 +3,15 @@ import time
 from threading import Event
 from unittest.mock import Mock, patch
 
+import pika.channel
 import pika.exceptions
 import pytest
 
 import dramatiq
 from dramatiq import Message, QueueJoinTimeout, Worker
-from dramatiq.brokers.rabbitmq import RabbitmqBroker, URLRabbitmqBroker, _IgnoreScaryLogs
+from dramatiq.brokers.rabbitmq import (
+    RabbitmqBroker, URLRabbitmqBroker, _DeliveryConfirmations, _find_delay_bucket, _get_channel_impl, _IgnoreScaryLogs
+)
 from dramatiq.common import current_millis
 
 from .common import RABBITMQ_CREDENTIALS, RABBITMQ_PASSWORD, RABBITMQ_USERNAME
@@ -194,6 +197,86 @@ def test_rabbitmq_actors_can_delay_messages_independent_of_each_other(rabbitmq_b
     assert results == [2, 1]
 
 
+def test_rabbitmq_actors_can_have_their_messages_delayed_inside_of_rabbitmq(rabbitmq_broker):
+    # Given that I have a broker that delays messages using TTL queues
+    rabbitmq_broker.ttl_delays = True
+    rabbitmq_broker.delay_buckets = [200, 400, 800]
+
+    # And an actor that records the time it ran
+    start_time, run_time = current_millis(), None
+
+    @dramatiq.actor
+    def record():
+        nonlocal run_time
+        run_time = current_millis()
+
+    # If I send it a delayed message
+    record.send_with_options(delay=1500)
+
+    # Then I expect it to wait in a delay bucket rather than the delay queue
+    _, dq_count, _ = rabbitmq_broker.get_queue_message_counts(record.queue_name)
+    assert dq_count == 1
+    assert rabbitmq_broker.channel.queue_declare(queue="default.DQ", passive=True).method.message_count == 0
+
+    # When I start a worker and join on the queue
+    worker = Worker(rabbitmq_broker, worker_threads=1)
+    worker.start()
+    try:
+        rabbitmq_broker.join(record.queue_name, min_successes=20)
+        worker.join()
+    finally:
+        worker.stop()
+
+    # I expect that message to have been processed at least delayed milliseconds later
+    assert run_time - start_time >= 1500
+
+
+def test_rabbitmq_consumers_hold_delayed_messages_that_cant_be_forwarded(rabbitmq_broker):
+    # Given that I have a broker that delays messages using TTL queues
+    rabbitmq_broker.ttl_delays = True
+    rabbitmq_broker.delay_buckets = [200, 400, 800]
+
+    # And an actor that records the time it ran
+    start_time, run_time = current_millis(), None
+
+    @dramatiq.actor
+    def record():
+        nonlocal run_time
+        run_time = current_millis()
+
+    # And RabbitMQ rejects every message forwarded between delay buckets
+    with patch.object(rabbitmq_broker, "_forward", return_value=False) as forward:
+        # When I send that actor a delayed message
+        record.send_with_options(delay=1500)
+
+        # And start a worker and join on the queue
+        worker = Worker(rabbitmq_broker, worker_threads=1)
+        worker.start()
+        try:
+            rabbitmq_broker.join(record.queue_name, min_successes=20)
+            worker.join()
+        finally:
+            worker.stop()
+
+    # Then I expect the consumer to have tried to forward the message
+    assert forward.called
+
+    # And the message to still have been processed at least delayed milliseconds later
+    assert run_time - start_time >= 1500
+
+
+def test_rabbitmq_delay_buckets_are_picked_by_remaining_delay():
+    # Given a set of delay buckets
+    delay_buckets = [1000, 2000, 4000]
+
+    # When I look up buckets for various delays
+    # Then I expect to get the largest bucket that fits inside each delay
+    assert _find_delay_bucket(delay_buckets, 500) is None
+    assert _find_delay_bucket(delay_buckets, 1000) == 1000
+    assert _find_delay_bucket(delay_buckets, 3999) == 2000
+    assert _find_delay_bucket(delay_buckets, 86400000) == 4000
+
+
 def test_rabbitmq_actors_can_have_retry_limits(rabbitmq_broker, rabbitmq_worker):
     # Given that I have an actor that always fails
     @dramatiq.actor(max_retries=0)
@@ -290,6 +373,95 @@ def test_rabbitmq_broker_reconnects_after_enqueue_failure(rabbitmq_broker):
     assert rabbitmq_broker.connection.is_open
 
 
+def test_rabbitmq_actors_can_be_sent_many_messages_with_delivery_confirmations(rabbitmq_broker, rabbitmq_worker):
+    # Given that my broker waits for delivery confirmations
+    rabbitmq_broker.confirm_delivery = True
+
+    # And I have a database
+    database = {}
+
+    # And an actor that can write data to that database
+    @dramatiq.actor
+    def put(key, value):
+        database[key] = value
+
+    # If I send that actor many messages at once
+    messages = put.send_many(("key-%s" % i, i) for i in range(100))
+    assert len(messages) == 100
+
+    # And I give the workers time to process the messages
+    rabbitmq_broker.join(put.queue_name)
+    rabbitmq_worker.join()
+
+    # I expect the database to be populated
+    assert len(database) == 100
+
+
+def test_rabbitmq_broker_only_republishes_lost_messages_after_enqueue_failure(rabbitmq_broker):
+    # Given that I have an actor
+    @dramatiq.actor
+    def do_nothing():
+        pass
+
+    # And publishing fails once in the middle of a batch
+    published = []
+    publish = rabbitmq_broker._publish
+
+    def flaky_publish(channel, message):
+        if len(published) == 3:
+            published.append(None)
+            raise pika.exceptions.AMQPConnectionError()
+
+        published.append(message)
+        return publish(channel, message)
+
+    # When I enqueue many messages at once
+    with patch.object(rabbitmq_broker, "_publish", flaky_publish):
+        messages = rabbitmq_broker.enqueue_many([do_nothing.message() for _ in range(10)])
+
+    # Then every message should have been published exactly once
+    assert [m for m in published if m is not None] == messages
+
+    # And they should all be on the queue
+    rabbitmq_broker.connection.sleep(0.5)
+    assert rabbitmq_broker.get_queue_message_counts(do_nothing.queue_name)[0] == 10
+
+
+def test_rabbitmq_delivery_confirmations_can_acknowledge_multiple_messages():
+    # Given that I'm tracking the delivery of some messages
+    confirms = _DeliveryConfirmations()
+    for message in ["a", "b", "c", "d"]:
+        confirms.track(message)
+
+    # When RabbitMQ acks the first two at once
+    confirms.on_confirmation(Mock(method=pika.spec.Basic.Ack(delivery_tag=2, multiple=True)))
+
+    # And nacks the third one
+    confirms.on_confirmation(Mock(method=pika.spec.Basic.Nack(delivery_tag=3, multiple=False)))
+
+    # Then only the last one should still be outstanding
+    assert list(confirms.outstanding.values()) == ["d"]
+
+    # And the third one should have been rejected
+    assert confirms.nacked == ["c"]
+
+
+def test_rabbitmq_delivery_confirmations_fail_clearly_on_unsupported_pika_versions():
+    # Given a blocking channel that wraps an asynchronous one
+    channel = Mock(_impl=Mock(spec=pika.channel.Channel))
+
+    # When the installed version of pika isn't known to support confirmation callbacks
+    with patch.object(pika, "__version__", "2.0.0"):
+        # Then a RuntimeError should be raised
+        with pytest.raises(RuntimeError, match="requires pika"):
+            _get_channel_impl(channel)
+
+    # When it is
+    with patch.object(pika, "__version__", "1.3.2"):
+        # Then the asynchronous channel should be returned
+        assert _get_channel_impl(channel) is channel._impl
+
+
 def test_rabbitmq_workers_handle_rabbit_failures_gracefully(rabbitmq_broker, rabbitmq_worker):
     # Given that I have an attempts database
     attempts = []
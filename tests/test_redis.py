@@ -1,3 +1,4 @@
+import asyncio
 import time
 from unittest import mock
 
@@ -6,11 +7,11 @@ import redis
 
 import dramatiq
 from dramatiq import Message, QueueJoinTimeout
-from dramatiq.brokers.redis import MAINTENANCE_SCALE, RedisBroker
+from dramatiq.brokers.redis import RedisBroker
 from dramatiq.common import current_millis, dq_name, xq_name
-from dramatiq.errors import ConnectionError
+from dramatiq.errors import ConnectionClosed, ConnectionError
 
-from .common import worker
+from .common import get_consumer, worker
 
 LUA_MAX_UNPACK_SIZE = 7999
 
@@ -36,6 +37,82 @@ def test_redis_actors_can_be_sent_messages(redis_broker, redis_worker):
     assert len(database) == 100
 
 
+def test_redis_actors_can_be_sent_messages_from_coroutines(redis_broker, redis_worker):
+    # Given that I have a middleware that records enqueued messages
+    enqueued = []
+
+    class EnqueueRecorder(dramatiq.Middleware):
+        def after_enqueue(self, broker, message, delay):
+            enqueued.append((message.message_id, delay))
+
+    redis_broker.add_middleware(EnqueueRecorder())
+
+    # And an actor that can write data to a database
+    database = {}
+
+    @dramatiq.actor()
+    def put(key, value):
+        database[key] = value
+
+    # If I send that actor messages from a coroutine, some of them delayed
+    async def send_messages():
+        return await asyncio.gather(
+            *(put.send_async("key-%s" % i, i) for i in range(10)),
+            put.send_with_options_async(args=("delayed", 10), delay=100),
+        )
+
+    messages = asyncio.run(send_messages())
+
+    # And I give the workers time to process the messages
+    redis_broker.join(put.queue_name)
+    redis_worker.join()
+
+    # I expect the database to be populated
+    assert len(database) == 11
+
+    # And the enqueue hooks to have been called for every message
+    assert sorted(enqueued, key=str) == sorted(
+        [(message.message_id, None) for message in messages[:-1]] + [(messages[-1].message_id, 100)],
+        key=str,
+    )
+
+
+def test_redis_broker_closes_asyncio_clients_when_their_loop_shuts_down(redis_broker):
+    # Given that I have an actor
+    @dramatiq.actor
+    def do_work():
+        pass
+
+    # When I send it a message from a coroutine
+    connections_before = len(redis_broker.client.client_list())
+    asyncio.run(do_work.send_async())
+
+    # Then the asyncio client should be closed along with its event loop
+    assert len(redis_broker.client.client_list()) == connections_before
+
+
+def test_redis_broker_closes_asyncio_clients_when_it_is_closed(redis_broker):
+    # Given that I have an actor
+    @dramatiq.actor
+    def do_work():
+        pass
+
+    # And I've sent it a message from a coroutine on an event loop that's still open
+    connections_before = len(redis_broker.client.client_list())
+    loop = asyncio.new_event_loop()
+    try:
+        loop.run_until_complete(do_work.send_async())
+        assert len(redis_broker.client.client_list()) > connections_before
+
+        # When I close the broker
+        redis_broker.close()
+
+        # Then its asyncio client should be closed
+        assert len(redis_broker.client.client_list()) == connections_before
+    finally:
+        loop.close()
+
+
 def test_redis_actors_retry_with_backoff_on_failure(redis_broker, redis_worker):
     # Given that I have a database
     failure_time, success_time = None, None
@@ -134,9 +211,10 @@ def test_redis_actors_can_delay_messages_independent_of_each_other(redis_broker)
 
 
 def test_redis_unacked_messages_can_be_requeued(redis_broker):
-    # Given that I have a Redis broker
+    # Given that I have a Redis broker that has sent a heartbeat
     queue_name = "some-queue"
     redis_broker.declare_queue(queue_name)
+    redis_broker.heartbeat()
 
     num_messages = LUA_MAX_UNPACK_SIZE * 2
     # The lua max stack size is 8000, so try to work with double that
@@ -155,11 +233,10 @@ def test_redis_unacked_messages_can_be_requeued(redis_broker):
     unacked = redis_broker.client.smembers(ack_group)
     assert sorted(unacked) == sorted(message_ids)
 
-    # When I close that broker and open another and dispatch a command
+    # When I close that broker and open another and run maintenance
     redis_broker.broker_id = "some-other-id"
     redis_broker.heartbeat_timeout = 0
-    redis_broker.maintenance_chance = MAINTENANCE_SCALE
-    redis_broker.do_qsize(queue_name)
+    redis_broker.maintain()
 
     # Then all messages should be requeued
     ack_group = "dramatiq:__acks__.%s.%s" % (redis_broker.broker_id, queue_name)
@@ -170,6 +247,110 @@ def test_redis_unacked_messages_can_be_requeued(redis_broker):
     assert set(message_ids) == set(queued)
 
 
+def test_redis_maintenance_requeues_messages_from_undeclared_queues(redis_broker):
+    # Given that I have a message that was fetched from a queue by a live worker
+    queue_name = "some-queue"
+    redis_broker.heartbeat()
+    redis_broker.do_enqueue(queue_name, b"message-id", b"message-data")
+    redis_broker.do_fetch(queue_name, 1)
+
+    # When another broker that hasn't declared that queue runs maintenance
+    redis_broker.broker_id = "some-other-id"
+    redis_broker.heartbeat_timeout = 0
+    redis_broker.maintain()
+
+    # Then the message should be requeued
+    queued = redis_broker.client.lrange("dramatiq:%s" % queue_name, 0, -1)
+    assert queued == [b"message-id"]
+
+
+def test_redis_maintenance_requeues_unindexed_messages_from_undeclared_queues(redis_broker):
+    # Given that I have a message that was fetched from a queue by a worker that predates ack set indexes
+    queue_name = "some-queue"
+    redis_broker.do_enqueue(queue_name, b"message-id", b"message-data")
+    redis_broker.client.lpop("dramatiq:%s" % queue_name)
+    redis_broker.client.sadd("dramatiq:__acks__.old-worker.%s" % queue_name, b"message-id")
+    redis_broker.client.zadd("dramatiq:__heartbeats__", {"old-worker": 0})
+
+    # When a broker that hasn't declared that queue runs maintenance
+    keys_calls = _count_calls(redis_broker.client, "keys")
+    redis_broker.heartbeat_timeout = 0
+    redis_broker.maintain()
+
+    # Then the message should be requeued
+    queued = redis_broker.client.lrange("dramatiq:%s" % queue_name, 0, -1)
+    assert queued == [b"message-id"]
+
+    # And that worker's ack set should be gone
+    assert not redis_broker.client.exists("dramatiq:__acks__.old-worker.%s" % queue_name)
+
+    # And the KEYS command should never have been used
+    assert _count_calls(redis_broker.client, "keys") == keys_calls
+
+
+def _count_calls(client, command):
+    return client.info("commandstats").get("cmdstat_%s" % command, {}).get("calls", 0)
+
+
+def test_redis_consumers_run_maintenance_in_the_background(redis_broker):
+    # Given that I have a Redis broker with a short maintenance interval
+    redis_broker.maintenance_interval = 10
+
+    # When I create a consumer
+    with mock.patch.object(redis_broker, "maintain") as maintain:
+        redis_broker.consume("default")
+        time.sleep(0.1)
+
+        # Then maintenance should run in the background
+        assert maintain.called
+
+        # And it should stop when the broker is closed
+        redis_broker.close()
+        maintain.reset_mock()
+        time.sleep(0.1)
+        assert not maintain.called
+
+
+def test_redis_consumers_raise_connection_closed_when_heartbeats_fail(redis_broker):
+    # Given that Redis is unreachable
+    with mock.patch.object(redis_broker, "heartbeat", side_effect=redis.ConnectionError("unreachable")):
+        # When I create a consumer
+        # Then a ConnectionClosed error should be raised
+        with pytest.raises(ConnectionClosed):
+            redis_broker.consume("default")
+
+
+def test_redis_consumers_send_heartbeats_in_the_background(redis_broker):
+    # Given that I have a Redis broker with a short heartbeat interval
+    redis_broker.heartbeat_interval = 10
+
+    # When I create a consumer
+    with mock.patch.object(redis_broker, "heartbeat") as heartbeat:
+        redis_broker.consume("default")
+
+        # Then a heartbeat should be sent right away
+        assert heartbeat.call_count == 1
+
+        # And more heartbeats should be sent in the background
+        time.sleep(0.1)
+        assert heartbeat.call_count > 1
+
+        redis_broker.close()
+
+
+def test_redis_producers_dont_send_heartbeats(redis_broker):
+    # Given that I have an actor
+    @dramatiq.actor
+    def do_work():
+        pass
+
+    # When I send it a message
+    do_work.send()
+
+    # Then no heartbeats should be recorded
+    assert redis_broker.client.zcard("dramatiq:__heartbeats__") == 0
+
+
 def test_redis_messages_can_be_dead_lettered(redis_broker, redis_worker):
     # Given that I have an actor that always fails
     @dramatiq.actor(max_retries=0)
@@ -205,8 +386,7 @@ def test_redis_dead_lettered_messages_are_cleaned_up(redis_broker, redis_worker)
 
     # And trigger maintenance
     redis_broker.dead_message_ttl = 0
-    redis_broker.maintenance_chance = MAINTENANCE_SCALE
-    redis_broker.do_qsize(do_work.queue_name)
+    redis_broker.maintain()
 
     # Then all the messages should be removed from the DLQ.
     dead_queue_name = "dramatiq:%s" % xq_name(do_work.queue_name)
@@ -259,8 +439,8 @@ def test_redis_requeues_unhandled_messages_on_shutdown(redis_broker):
         assert message_1.options["redis_message_id"].encode("utf-8") in messages
 
 
-def test_redis_requeues_unhandled_delay_messages_on_shutdown(redis_broker):
-    # Given that I have an actor that takes its time
+def test_redis_keeps_delayed_messages_in_redis_until_they_are_due(redis_broker):
+    # Given that I have an actor
     @dramatiq.actor
     def do_work():
         pass
@@ -270,11 +450,37 @@ def test_redis_requeues_unhandled_delay_messages_on_shutdown(redis_broker):
 
     # Then start a worker and subsequently shut it down
     with worker(redis_broker, worker_threads=1):
+        time.sleep(0.25)
+
+    # I expect the message to still be scheduled in Redis
+    etas_key = "dramatiq:%s.etas" % dq_name(do_work.queue_name)
+    scheduled = redis_broker.client.zrange(etas_key, 0, -1)
+    assert scheduled == [message.options["redis_message_id"].encode("utf-8")]
+
+
+def test_redis_promotes_delayed_messages_once_they_are_due(redis_broker):
+    # Given that I have an actor
+    @dramatiq.actor
+    def do_work():
         pass
 
-    # I expect it to have re-enqueued the message
-    messages = redis_broker.client.lrange("dramatiq:%s" % dq_name(do_work.queue_name), 0, 10)
-    assert message.options["redis_message_id"].encode("utf-8") in messages
+    # And I've sent it a delayed message
+    message = do_work.send_with_options(delay=100)
+
+    # When I fetch messages from its queue before the message is due
+    # Then I expect to get nothing back
+    assert redis_broker.do_fetch(do_work.queue_name, 1) == []
+
+    # When I fetch messages from its queue after the message is due
+    time.sleep(0.2)
+    fetched = redis_broker.do_fetch(do_work.queue_name, 1)
+
+    # Then I expect to get the message back without an eta on its original queue
+    assert len(fetched) == 1
+    fetched_message = Message.decode(fetched[0])
+    assert fetched_message.message_id == message.message_id
+    assert fetched_message.queue_name == do_work.queue_name
+    assert "eta" not in fetched_message.options
 
 
 def test_redis_broker_can_join_with_timeout(redis_broker, redis_worker):
@@ -292,6 +498,97 @@ def test_redis_broker_can_join_with_timeout(redis_broker, redis_worker):
         redis_broker.join(do_work.queue_name, timeout=500)
 
 
+def test_redis_actors_can_be_sent_many_messages_at_once(redis_broker, redis_worker):
+    # Given that I have a database
+    database = {}
+
+    # And an actor that can write data to that database
+    @dramatiq.actor()
+    def put(key, value):
+        database[key] = value
+
+    # If I send that actor more messages than fit on the Lua stack at once
+    num_messages = LUA_MAX_UNPACK_SIZE * 2
+    messages = put.send_many(("key-%s" % i, i) for i in range(num_messages))
+    assert len(messages) == num_messages
+
+    # And I give the workers time to process the messages
+    redis_broker.join(put.queue_name)
+    redis_worker.join()
+
+    # I expect the database to be populated
+    assert len(database) == num_messages
+
+
+def test_redis_broker_can_enqueue_many_delayed_messages(redis_broker):
+    # Given that I have an actor
+    @dramatiq.actor
+    def do_work():
+        pass
+
+    # When I enqueue many delayed messages at once
+    messages = redis_broker.enqueue_many([do_work.message(), do_work.message()], delay=1000)
+
+    # Then each of them should have been moved to the delay queue
+    for message in messages:
+        assert message.queue_name == dq_name(do_work.queue_name)
+        assert "eta" in message.options
+
+    # And they should all be scheduled in Redis
+    scheduled = redis_broker.client.zrange("dramatiq:%s.etas" % dq_name(do_work.queue_name), 0, -1)
+    assert set(scheduled) == {m.options["redis_message_id"].encode("utf-8") for m in messages}
+
+
+def test_redis_consumers_can_block_until_messages_are_enqueued(redis_broker):
+    # Given that I have a Redis broker whose consumers block when idle
+    redis_broker.blocking_fetch = True
+
+    # And an actor that records the time it ran
+    run_time = None
+
+    @dramatiq.actor
+    def record():
+        nonlocal run_time
+        run_time = current_millis()
+
+    # When I start a worker with a long idle timeout and give it time to go idle
+    with worker(redis_broker, worker_timeout=2000, worker_threads=1) as redis_worker:
+        time.sleep(0.5)
+
+        # And then send the actor a message
+        send_time = current_millis()
+        record.send()
+
+        redis_broker.join(record.queue_name)
+        redis_worker.join()
+
+    # I expect the message to have been processed without waiting for the idle timeout
+    assert run_time - send_time < 500
+
+
+def test_redis_broker_caps_queue_notifications(redis_broker):
+    # Given that I have an actor
+    @dramatiq.actor
+    def do_work():
+        pass
+
+    # When I send it many messages without blocking consumers
+    do_work.send_many(() for _ in range(200))
+
+    # Then no notifications should be stored
+    notify_key = "dramatiq:%s.notify" % do_work.queue_name
+    assert redis_broker.client.llen(notify_key) == 0
+
+    # When I enable blocking consumers and send it many messages
+    redis_broker.blocking_fetch = True
+    do_work.send_many(() for _ in range(200))
+    for _ in range(200):
+        do_work.send()
+
+    # Then the number of stored notifications should be capped
+    assert redis_broker.client.llen(notify_key) == 100
+
+
 def test_redis_broker_can_flush_queues(redis_broker):
     # Given that I have an actor
     @dramatiq.actor
@@ -368,9 +665,8 @@ def test_redis_broker_maintains_backwards_compat_with_old_acks(redis_broker):
             redis_broker.client.zadd("dramatiq:default.acks", {expired_message_id: 0})
             redis_broker.client.zadd("dramatiq:default.acks", {valid_message_id: current_millis()})
 
-    # When maintenance runs for that actor's queue
-    redis_broker.maintenance_chance = MAINTENANCE_SCALE
-    redis_broker.do_qsize(do_work.queue_name)
+    # When maintenance runs
+    redis_broker.maintain()
 
     # Then maintenance should move the expired message to the new style acks set
     unacked = redis_broker.client.smembers("dramatiq:__acks__.%s.default" % redis_broker.broker_id)
@@ -387,39 +683,93 @@ def test_redis_consumer_ack_can_retry_on_connection_error(redis_broker, redis_wo
     def do_work():
         pass
 
-    # If I send that actor an async message
-    message = do_work.send()
-    consumer = redis_worker.consumers[do_work.queue_name].consumer
+    consumer = get_consumer(redis_worker, do_work.queue_name)
 
     do_ack = redis_broker.do_ack
 
     with mock.patch.object(consumer.broker, "do_ack") as ack_mock:
-        def side_effect(queue, msg_id):
-            if ack_mock.call_count == 1:
-                # On the first try, I expect there to be an outstanding message
-                assert consumer.outstanding_message_count == 1
-            else:
-                # On each subsequent try, there should be 0 messages
-                assert consumer.outstanding_message_count == 0
-
-            result = do_ack(queue, msg_id)
-
+        def side_effect(queue, *msg_ids):
             if ack_mock.call_count < 2:
                 # Trigger a retry by raising a ConnectionError
-                raise ConnectionError(message)
+                raise redis.ConnectionError(message)
 
-            return result
+            return do_ack(queue, *msg_ids)
 
         ack_mock.side_effect = side_effect
 
+        # If I send that actor an async message
+        message = do_work.send()
+
         # And I give the workers time to process the messages
         redis_broker.join(do_work.queue_name)
         redis_worker.join()
 
         # I expect `do_ack` to have been called at least 2 times
         assert ack_mock.call_count >= 2
-        # And I expect there to be no outstanding messages
+        # And I expect there to be no outstanding messages or acks
         assert consumer.outstanding_message_count == 0
+        assert not consumer.pending_acks
+
+
+def test_redis_consumer_buffers_acks(redis_broker):
+    # Given that I have a Redis broker that buffers lots of acks for a long time
+    redis_broker.ack_batch_size = 10
+    redis_broker.ack_interval = 60000
+
+    # And an actor
+    @dramatiq.actor
+    def do_work():
+        pass
+
+    # And I've sent that actor a few messages
+    for _ in range(3):
+        do_work.send()
+
+    # When I consume and ack those messages
+    consumer = redis_broker.consume(do_work.queue_name, prefetch=3)
+    messages = [next(consumer) for _ in range(3)]
+    for message in messages:
+        consumer.ack(message)
+
+    # Then their acks should be buffered
+    ack_group = "dramatiq:__acks__.%s.%s" % (redis_broker.broker_id, do_work.queue_name)
+    assert len(redis_broker.client.smembers(ack_group)) == 3
+    assert consumer.outstanding_message_count == 0
+
+    # When I flush the consumer's acks
+    with mock.patch.object(redis_broker, "do_ack", wraps=redis_broker.do_ack) as ack_mock:
+        consumer.flush_acks()
+
+    # Then they should all be acked with a single call
+    assert ack_mock.call_count == 1
+    assert not redis_broker.client.smembers(ack_group)
+    assert redis_broker.do_qsize(do_work.queue_name) == 0
+
+
+def test_redis_consumer_flushes_acks_before_requeueing(redis_broker):
+    # Given that I have a Redis broker that buffers acks for a long time
+    redis_broker.ack_interval = 60000
+
+    # And an actor
+    @dramatiq.actor
+    def do_work():
+        pass
+
+    # And I've sent that actor two messages
+    do_work.send()
+    do_work.send()
+
+    # When I consume both messages, ack the first and requeue the second
+    consumer = redis_broker.consume(do_work.queue_name, prefetch=2)
+    message_1, message_2 = next(consumer), next(consumer)
+    consumer.ack(message_1)
+    consumer.requeue([message_2])
+
+    # Then the first message should be gone and the second should be back on the queue
+    assert not consumer.pending_acks
+    queued = redis_broker.client.lrange("dramatiq:%s" % do_work.queue_name, 0, 10)
+    assert queued == [message_2.options["redis_message_id"].encode("utf-8")]
+    assert redis_broker.do_qsize(do_work.queue_name) == 1
 
 
 def test_redis_consumer_nack_can_retry_on_connection_error(redis_broker, redis_worker):
@@ -428,9 +778,7 @@ def test_redis_consumer_nack_can_retry_on_connection_error(redis_broker, redis_w
     def do_work():
         raise RuntimeError
 
-    # If I send that actor an async message
-    message = do_work.send()
-    consumer = redis_worker.consumers[do_work.queue_name].consumer
+    consumer = get_consumer(redis_worker, do_work.queue_name)
 
     do_nack = redis_broker.do_nack
 
@@ -453,6 +801,9 @@ def test_redis_consumer_nack_can_retry_on_connection_error(redis_broker, redis_w
 
         nack_mock.side_effect = side_effect
 
+        # If I send that actor an async message
+        message = do_work.send()
+
         # And I give the workers time to process the messages
         redis_broker.join(do_work.queue_name)
         redis_worker.join()
@@ -478,7 +829,7 @@ def test_redis_consumer_nack_does_not_raise_on_missing_id(redis_worker):
     def do_work():
         raise RuntimeError
 
-    consumer = redis_worker.consumers[do_work.queue_name].consumer
+    consumer = get_consumer(redis_worker, do_work.queue_name)
 
     # If I send a bogus message to nack, I expect no exception to be raised.
     message = Message(
@@ -504,7 +855,7 @@ def test_redis_join_race_condition(redis_broker):
     def go():
         go_again.send_with_options(delay=1000)
         time.sleep(0.25)
-        # go ack + go msg + go_again dq.msg + go_again db.ack
+        # go ack + go msg + go_again scheduled msg
         size.append(redis_broker.do_qsize("default"))
         size.append(redis_broker.do_qsize(dq_name("default")))  # does the same
 
@@ -521,4 +872,4 @@ def test_redis_join_race_condition(redis_broker):
         redis_worker.join()
 
     assert called
-    assert size == [4, 4, 2, 2]
+    assert size == [3, 3, 2, 2]
@@ -0,0 +1,333 @@
+import asyncio
+import time
+
+import pytest
+
+import dramatiq
+from dramatiq import Message, QueueJoinTimeout
+from dramatiq.brokers.redis_streams import CONSUMER_GROUP
+from dramatiq.common import current_millis, dq_name, xq_name
+
+from .common import worker
+
+
+def test_redis_streams_actors_can_be_sent_messages(redis_streams_broker, redis_streams_worker):
+    # Given that I have a database
+    database = {}
+
+    # And an actor that can write data to that database
+    @dramatiq.actor()
+    def put(key, value):
+        database[key] = value
+
+    # If I send that actor many async messages
+    for i in range(100):
+        assert put.send("key-%s" % i, i)
+
+    # And I give the workers time to process the messages
+    redis_streams_broker.join(put.queue_name)
+    redis_streams_worker.join()
+
+    # I expect the database to be populated
+    assert len(database) == 100
+
+
+def test_redis_streams_actors_can_be_sent_messages_from_coroutines(redis_streams_broker, redis_streams_worker):
+    # Given that I have a database
+    database = {}
+
+    # And an actor that can write data to that database
+    @dramatiq.actor()
+    def put(key, value):
+        database[key] = value
+
+    # If I send that actor messages from a coroutine
+    async def send_messages():
+        await asyncio.gather(*(put.send_async("key-%s" % i, i) for i in range(10)))
+
+    asyncio.run(send_messages())
+
+    # And I give the workers time to process the messages
+    redis_streams_broker.join(put.queue_name)
+    redis_streams_worker.join()
+
+    # I expect the database to be populated
+    assert len(database) == 10
+
+
+def test_redis_streams_actors_can_be_sent_many_messages_at_once(redis_streams_broker, redis_streams_worker):
+    # Given that I have a database
+    database = {}
+
+    # And an actor that can write data to that database
+    @dramatiq.actor()
+    def put(key, value):
+        database[key] = value
+
+    # If I send that actor many messages at once
+    put.send_many(("key-%s" % i, i) for i in range(100))
+
+    # And I give the workers time to process the messages
+    redis_streams_broker.join(put.queue_name)
+    redis_streams_worker.join()
+
+    # I expect the database to be populated
+    assert len(database) == 100
+
+
+def test_redis_streams_actors_can_retry_multiple_times(redis_streams_broker, redis_streams_worker):
+    # Given that I have a database
+    attempts = []
+
+    # And an actor that fails 3 times then succeeds
+    @dramatiq.actor(min_backoff=1000, max_backoff=1000)
+    def do_work():
+        attempts.append(1)
+        if sum(attempts) < 4:
+            raise RuntimeError("Failure #%s" % sum(attempts))
+
+    # If I send it a message
+    do_work.send()
+
+    # Then join on the queue
+    redis_streams_broker.join(do_work.queue_name)
+    redis_streams_worker.join()
+
+    # I expect it to have been attempted 4 times
+    assert sum(attempts) == 4
+
+
+def test_redis_streams_actors_retry_with_backoff_on_failure(redis_streams_broker, redis_streams_worker):
+    # Given that I have a database
+    failure_time, success_time = None, None
+
+    # And an actor that fails the first time it's called
+    @dramatiq.actor(min_backoff=1000, max_backoff=5000, max_retries=1)
+    def do_work():
+        nonlocal failure_time, success_time
+        if not failure_time:
+            failure_time = current_millis()
+            raise RuntimeError("First failure.")
+        else:
+            success_time = current_millis()
+
+    # If I send it a message
+    do_work.send()
+
+    # Then join on the queue
+    redis_streams_broker.join(do_work.queue_name)
+    redis_streams_worker.join()
+
+    # I expect backoff time to have passed between success and failure
+    # + the worker idle timeout as padding in case the worker is long polling
+    assert 500 <= success_time - failure_time <= 2500 + redis_streams_worker.worker_timeout
+
+
+def test_redis_streams_actors_can_have_their_messages_delayed(redis_streams_broker, redis_streams_worker):
+    # Given that I have a database
+    start_time, run_time = current_millis(), None
+
+    # And an actor that records the time it ran
+    @dramatiq.actor()
+    def record():
+        nonlocal run_time
+        run_time = current_millis()
+
+    # If I send it a delayed message
+    record.send_with_options(delay=1000)
+
+    # Then join on the queue
+    redis_streams_broker.join(record.queue_name)
+    redis_streams_worker.join()
+
+    # I expect that message to have been processed at least delayed milliseconds later
+    assert run_time - start_time >= 1000
+
+
+def test_redis_streams_actors_can_delay_messages_independent_of_each_other(redis_streams_broker):
+    # Given that I have a database
+    results = []
+
+    # And an actor that appends a number to the database
+    @dramatiq.actor()
+    def append(x):
+        results.append(x)
+
+    # When I pause the worker
+    with worker(redis_streams_broker, worker_timeout=100, worker_threads=1) as redis_streams_worker:
+        redis_streams_worker.pause()
+
+        # And I send it a delayed message
+        append.send_with_options(args=(1,), delay=2000)
+
+        # And then another delayed message with a smaller delay
+        append.send_with_options(args=(2,), delay=1000)
+
+        # Then resume the worker and join on the queue
+        redis_streams_worker.resume()
+        redis_streams_broker.join(append.queue_name)
+        redis_streams_worker.join()
+
+        # I expect the latter message to have been run first
+        assert results == [2, 1]
+
+
+def test_redis_streams_broker_can_enqueue_many_delayed_messages(redis_streams_broker):
+    # Given that I have an actor
+    @dramatiq.actor
+    def do_work():
+        pass
+
+    # When I enqueue many delayed messages at once
+    messages = redis_streams_broker.enqueue_many([do_work.message(), do_work.message()], delay=1000)
+
+    # Then each of them should have been moved to the delay queue
+    for message in messages:
+        assert message.queue_name == dq_name(do_work.queue_name)
+        assert "eta" in message.options
+
+    # And they should all be on the delay queue's stream
+    entries = redis_streams_broker.client.xrange("dramatiq:%s.stream" % dq_name(do_work.queue_name))
+    assert {Message.decode(fields[b"data"]).message_id for _, fields in entries} == {m.message_id for m in messages}
+
+
+def test_redis_streams_consumers_block_until_messages_are_enqueued(redis_streams_broker):
+    # Given that I have an actor that records the time it ran
+    run_time = None
+
+    @dramatiq.actor
+    def record():
+        nonlocal run_time
+        run_time = current_millis()
+
+    # When I start a worker with a long idle timeout and give it time to go idle
+    with worker(redis_streams_broker, worker_timeout=2000, worker_threads=1) as redis_streams_worker:
+        time.sleep(0.5)
+
+        # And then send the actor a message
+        send_time = current_millis()
+        record.send()
+
+        redis_streams_broker.join(record.queue_name)
+        redis_streams_worker.join()
+
+    # I expect the message to have been processed without waiting for the idle timeout
+    assert run_time - send_time < 500
+
+
+def test_redis_streams_messages_can_be_dead_lettered(redis_streams_broker, redis_streams_worker):
+    # Given that I have a broker without actors
+    # If I send it a message
+    message = Message(
+        queue_name="some-queue",
+        actor_name="some-actor",
+        args=(), kwargs={},
+        options={},
+    )
+    redis_streams_broker.declare_queue("some-queue")
+    message = redis_streams_broker.enqueue(message)
+
+    # Then join on the queue
+    redis_streams_broker.join("some-queue")
+    redis_streams_worker.join()
+
+    # I expect the message to end up on the dead letter stream
+    dead_stream_name = "dramatiq:%s.stream" % xq_name("some-queue")
+    entries = redis_streams_broker.client.xrange(dead_stream_name)
+    assert [Message.decode(fields[b"data"]).message_id for _, fields in entries] == [message.message_id]
+
+
+def test_redis_streams_failed_messages_are_dead_lettered(redis_streams_broker, redis_streams_worker):
+    # Given that I have an actor that always fails
+    @dramatiq.actor(max_retries=0)
+    def do_work():
+        raise RuntimeError("failed")
+
+    # If I send it a message
+    message = do_work.send()
+
+    # And then join on its queue
+    redis_streams_broker.join(do_work.queue_name)
+    redis_streams_worker.join()
+
+    # I expect it to end up on the dead letter stream
+    dead_stream_name = "dramatiq:%s.stream" % xq_name(do_work.queue_name)
+    entries = redis_streams_broker.client.xrange(dead_stream_name)
+    assert [Message.decode(fields[b"data"]).message_id for _, fields in entries] == [message.message_id]
+
+
+def test_redis_streams_unacked_messages_are_redelivered_after_the_heartbeat_timeout(redis_streams_broker):
+    # Given that I have a consumer that has read a message but never acks it
+    redis_streams_broker.declare_queue("some-queue")
+    message = redis_streams_broker.enqueue(Message(
+        queue_name="some-queue",
+        actor_name="some-actor",
+        args=(), kwargs={},
+        options={},
+    ))
+
+    consumer = redis_streams_broker.consume("some-queue", timeout=100)
+    assert next(consumer).message_id == message.message_id
+
+    # When another consumer reads from that queue after the heartbeat timeout
+    redis_streams_broker.broker_id = "some-other-id"
+    redis_streams_broker.heartbeat_timeout = 0
+    other_consumer = redis_streams_broker.consume("some-queue", timeout=100)
+
+    # Then it should get the message
+    assert next(other_consumer).message_id == message.message_id
+
+
+def test_redis_streams_requeues_unhandled_messages_on_shutdown(redis_streams_broker):
+    # Given that I have an actor that takes its time
+    @dramatiq.actor
+    def do_work():
+        time.sleep(1)
+
+    # If I send it two messages
+    do_work.send()
+    do_work.send()
+
+    # Then start a worker and subsequently shut it down
+    with worker(redis_streams_broker, worker_threads=1):
+        time.sleep(0.25)
+
+    # I expect it to have processed one of the messages and re-enqueued the other
+    stream_name = "dramatiq:%s.stream" % do_work.queue_name
+    assert redis_streams_broker.client.xlen(stream_name) == 1
+
+    # And for no messages to be pending
+    pending = redis_streams_broker.client.xpending(stream_name, CONSUMER_GROUP)
+    assert pending["pending"] == 0
+
+
+def test_redis_streams_broker_can_join_with_timeout(redis_streams_broker, redis_streams_worker):
+    # Given that I have an actor that takes a long time to run
+    @dramatiq.actor
+    def do_work():
+        time.sleep(1)
+
+    # When I send that actor a message
+    do_work.send()
+
+    # And join on its queue with a timeout
+    # Then I expect a QueueJoinTimeout to be raised
+    with pytest.raises(QueueJoinTimeout):
+        redis_streams_broker.join(do_work.queue_name, timeout=500)
+
+
+def test_redis_streams_broker_can_flush_queues(redis_streams_broker):
+    # Given that I have an actor
+    @dramatiq.actor
+    def do_work():
+        pass
+
+    # When I send that actor a message
+    do_work.send()
+
+    # And then tell the broker to flush all queues
+    redis_streams_broker.flush_all()
+
+    # And then join on the actor's queue
+    # Then it should join immediately
+    assert redis_streams_broker.join(do_work.queue_name, timeout=200) is None
@@ -1,3 +1,4 @@
+import asyncio
 import time
 from unittest.mock import patch
 
@@ -6,9 +7,11 @@ import pytest
 import dramatiq
 from dramatiq.message import Message
 from dramatiq.middleware import Middleware, SkipMessage
-from dramatiq.results import ResultFailure, ResultMissing, Results, ResultTimeout
+from dramatiq.results import Missing, ResultFailure, ResultMissing, Results, ResultTimeout
 from dramatiq.results.backends import StubBackend
 
+from .common import worker
+
 
 def test_actors_can_store_results(stub_broker, stub_worker, result_backend):
     # Given a result backend
@@ -151,6 +154,295 @@ def test_messages_can_get_results_from_inferred_backend(stub_broker, stub_worker
     assert message.get_result(block=True) == 42
 
 
+@pytest.mark.parametrize("backend", ["redis", "stub"])
+def test_backends_can_get_many_results_at_once(request, stub_broker, stub_worker, backend):
+    # Given a result backend
+    result_backend = request.getfixturevalue("%s_result_backend" % backend)
+
+    # And a broker with the results middleware
+    stub_broker.add_middleware(Results(backend=result_backend))
+
+    # And an actor that stores results
+    @dramatiq.actor(store_results=True)
+    def do_work(x):
+        return x
+
+    # When I send that actor a few messages
+    messages = [do_work.send(i) for i in range(5)]
+
+    # And wait for their results
+    # Then I should get them back in order
+    assert result_backend.get_results(messages, block=True) == [0, 1, 2, 3, 4]
+
+    # When I get the results of those messages along with one that was never sent
+    missing_message = do_work.message(5)
+
+    # Then a ResultMissing error should be raised
+    with pytest.raises(ResultMissing):
+        result_backend.get_results(messages + [missing_message])
+
+    # And asking for missing results to be returned should return a Missing result in its place
+    assert result_backend.get_results(messages + [missing_message], missing_ok=True) == [0, 1, 2, 3, 4, Missing]
+
+    # And waiting on them should time out
+    with pytest.raises(ResultTimeout):
+        result_backend.get_results(messages + [missing_message], block=True, timeout=100)
+
+
+def test_redis_result_backend_returns_many_results_as_soon_as_they_are_stored(
+        stub_broker, stub_worker, redis_result_backend,
+):
+    # Given a broker with the results middleware
+    stub_broker.add_middleware(Results(backend=redis_result_backend))
+
+    # And an actor that stores results after a short while
+    @dramatiq.actor(store_results=True)
+    def do_work(x):
+        time.sleep(0.1 * x)
+        return x
+
+    # And a backoff that's much longer than it takes that actor to run
+    with patch("dramatiq.results.backend.BACKOFF_FACTOR", 1000):
+        # When I send that actor a few messages
+        messages = [do_work.send(i) for i in range(3)]
+
+        # And wait for all of their results at once
+        start = time.monotonic()
+        results = redis_result_backend.get_results(messages, block=True)
+
+    # Then I should get the results back
+    assert results == [0, 1, 2]
+
+    # And they should've been returned without waiting out the backoff
+    assert time.monotonic() - start < 0.5
+
+
+def test_redis_result_backend_waits_on_many_results_for_less_than_a_second(
+        stub_broker, stub_worker, redis_result_backend,
+):
+    # Given a broker with the results middleware
+    stub_broker.add_middleware(Results(backend=redis_result_backend))
+
+    # And an actor that stores a result after a short while
+    @dramatiq.actor(store_results=True)
+    def do_work(x):
+        time.sleep(0.2)
+        return x
+
+    # When I send that actor a message
+    messages = [do_work.send(1)]
+
+    # And wait for its result with a sub-second timeout
+    # Then I should get the result back instead of timing out right away
+    assert redis_result_backend.get_results(messages, block=True, timeout=900) == [1]
+
+
+def test_notifiers_wake_up_waiters_as_soon_as_results_are_stored(stub_broker, stub_worker, result_notifier):
+    # Given a result backend with a notifier
+    result_backend = StubBackend(notifier=result_notifier)
+
+    # And a broker with the results middleware
+    stub_broker.add_middleware(Results(backend=result_backend))
+
+    # And an actor that stores results after a short while
+    @dramatiq.actor(store_results=True)
+    def do_work(x):
+        time.sleep(0.05)
+        return x
+
+    # And a backoff that's much longer than it takes that actor to run
+    with patch("dramatiq.results.backend.BACKOFF_FACTOR", 1000):
+        # When I send that actor a few messages
+        messages = [do_work.send(i) for i in range(3)]
+
+        # And wait for the result of each one
+        start = time.monotonic()
+        results = [message.get_result(backend=result_backend, block=True) for message in messages]
+
+        # And for all of them at once
+        bulk_results = result_backend.get_results(messages, block=True)
+
+    # Then I should get the results back
+    assert results == bulk_results == [0, 1, 2]
+
+    # And they should've been returned without waiting out the backoff
+    assert time.monotonic() - start < 1.5
+
+    # And the notifier should not keep track of any waiters
+    assert result_notifier.waiters == {}
+
+
+def test_notifiers_wake_up_coroutines_as_soon_as_results_are_stored(stub_broker, stub_worker, result_notifier):
+    # Given a result backend with a notifier
+    result_backend = StubBackend(notifier=result_notifier)
+
+    # And a broker with the results middleware
+    stub_broker.add_middleware(Results(backend=result_backend))
+
+    # And an actor that stores results after a short while
+    @dramatiq.actor(store_results=True)
+    def do_work(x):
+        time.sleep(0.05)
+        return x
+
+    # And a backoff that's much longer than it takes that actor to run
+    with patch("dramatiq.results.backend.BACKOFF_FACTOR", 1000):
+        # When I send that actor a few messages
+        messages = [do_work.send(i) for i in range(3)]
+
+        # And wait for their results from a coroutine
+        async def get_results():
+            return await asyncio.gather(*(
+                message.get_result_async(backend=result_backend, block=True)
+                for message in messages
+            ))
+
+        start = time.monotonic()
+        results = asyncio.run(get_results())
+
+    # Then I should get the results back
+    assert results == [0, 1, 2]
+
+    # And they should've been returned without waiting out the backoff
+    assert time.monotonic() - start < 0.5
+
+    # And the notifier should not keep track of any waiters
+    assert result_notifier.waiters == {}
+
+
+def test_redis_notifier_only_subscribes_to_awaited_results(redis_result_notifier):
+    # Given a Redis notifier
+    # When I subscribe to a couple of results
+    with redis_result_notifier.subscribe("a", "b") as notification:
+        # Then only the channels of those results should be subscribed to
+        assert set(redis_result_notifier.client.pubsub_channels()) == {b"a", b"b"}
+
+        # When one of them is stored
+        redis_result_notifier.notify("b")
+
+        # Then I should be notified
+        assert notification.wait(1)
+
+    # When I stop waiting
+    # Then those channels should be unsubscribed from
+    time.sleep(0.1)
+    assert redis_result_notifier.client.pubsub_channels() == []
+
+
+def test_redis_notifier_can_be_closed(redis_result_notifier):
+    # Given a Redis notifier that's listening for results
+    with redis_result_notifier.subscribe("a"):
+        listener = redis_result_notifier.listener
+        assert listener.is_alive()
+
+    # When I close it
+    redis_result_notifier.close()
+
+    # Then its listener thread should stop
+    assert not listener.is_alive()
+
+    # And subscribing afterwards should fall back to polling
+    with redis_result_notifier.subscribe("a") as notification:
+        assert not notification.is_set()
+        assert redis_result_notifier.listener is None
+
+
+def test_results_can_be_awaited(stub_broker, stub_worker, async_result_backend):
+    # Given a result backend
+    # And a broker with the results middleware
+    stub_broker.add_middleware(Results(backend=async_result_backend))
+
+    # And an actor that stores results after a short while
+    @dramatiq.actor(store_results=True)
+    def do_work(x):
+        time.sleep(0.05)
+        return x
+
+    # When I send that actor a few messages
+    messages = [do_work.send(i) for i in range(5)]
+
+    # And wait for their results from a coroutine
+    async def get_results():
+        return await asyncio.gather(*(
+            message.get_result_async(backend=async_result_backend, block=True)
+            for message in messages
+        ))
+
+    # Then the results should be what the actor returned
+    assert asyncio.run(get_results()) == [0, 1, 2, 3, 4]
+
+
+def test_awaiting_a_result_respects_sub_second_timeouts(stub_broker, async_result_backend):
+    # Given a result backend
+    # And a broker with the results middleware
+    stub_broker.add_middleware(Results(backend=async_result_backend))
+
+    # And an actor that stores results
+    @dramatiq.actor(store_results=True)
+    def do_work():
+        return 42
+
+    # When I send that actor a message without a worker to process it
+    message = do_work.send()
+
+    # And I wait on its result with a sub-second timeout
+    # Then a ResultTimeout error should be raised
+    start = time.monotonic()
+    with pytest.raises(ResultTimeout):
+        asyncio.run(async_result_backend.get_result_async(message, block=True, timeout=200))
+
+    # And it should've been raised in a timely fashion
+    assert time.monotonic() - start < 0.9
+
+    # When I get its result without waiting
+    # Then a ResultMissing error should be raised
+    with pytest.raises(ResultMissing):
+        asyncio.run(async_result_backend.get_result_async(message))
+
+
+def test_redis_result_backend_only_subscribes_to_awaited_results(stub_broker, redis_result_backend):
+    # Given a broker with the results middleware
+    stub_broker.add_middleware(Results(backend=redis_result_backend))
+
+    # And an actor that stores results
+    @dramatiq.actor(store_results=True)
+    def do_work(x):
+        return x
+
+    # And a couple of messages that haven't been processed yet
+    messages = [do_work.send(i) for i in range(2)]
+    message_keys = {redis_result_backend.build_message_key(message).encode() for message in messages}
+    connections = []
+
+    async def get_results():
+        tasks = [
+            asyncio.ensure_future(message.get_result_async(backend=redis_result_backend, block=True))
+            for message in messages
+        ]
+
+        # When I wait for their results from a coroutine
+        await asyncio.sleep(0.1)
+
+        # Then the channels of those results should be subscribed to
+        assert message_keys <= set(redis_result_backend.client.pubsub_channels())
+
+        # When the results are stored
+        with worker(stub_broker, worker_timeout=100):
+            results = await asyncio.gather(*tasks)
+
+        # Then those channels should be unsubscribed from
+        await asyncio.sleep(0.1)
+        assert not message_keys & set(redis_result_backend.client.pubsub_channels())
+        connections.append(len(redis_result_backend.client.client_list()))
+        return results
+
+    # And the results should be what the actor returned
+    assert asyncio.run(get_results()) == [0, 1]
+
+    # And the listener should be closed along with its event loop
+    assert len(redis_result_backend.client.client_list()) < connections[0]
+
+
 def test_messages_without_actor_not_crashing_lookup_options(stub_broker, redis_result_backend):
     message = Message(
         queue_name="default", actor_name="idontexist",
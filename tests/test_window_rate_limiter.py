@@ -1,6 +1,7 @@
 import time
 from collections import defaultdict
 from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
 
 from dramatiq.rate_limits import WindowRateLimiter
 
@@ -36,3 +37,64 @@ def test_window_rate_limiter_limits_per_window(rate_limiter_backend):
 
     # I expect between 8 and 10 calls to have been made in total
     assert 8 <= sum(calls.values()) <= 10
+
+
+def test_window_rate_limiter_computes_its_keys_once_per_acquire(rate_limiter_backend):
+    # Given that I have a window rate limiter
+    limiter = WindowRateLimiter(rate_limiter_backend, "keys-test", limit=10, window=5)
+
+    # When I acquire it
+    with patch.object(limiter, "_get_keys", wraps=limiter._get_keys) as get_keys:
+        with limiter.acquire(raise_on_failure=False) as acquired:
+            pass
+
+    # Then I expect it to have succeeded
+    assert acquired
+
+    # And its keys to have been computed only once
+    assert get_keys.call_count == 1
+
+
+def test_window_rate_limiter_can_lease_permits(rate_limiter_backend):
+    # Given that I have a window rate limiter that leases permits in blocks
+    limiter = WindowRateLimiter(rate_limiter_backend, "lease-test", limit=10, window=5, lease=4)
+
+    # When I acquire it more times than its limit within the same second
+    with patch("dramatiq.rate_limits.window.time.time", return_value=1000):
+        with patch.object(rate_limiter_backend, "incr_and_sum", wraps=rate_limiter_backend.incr_and_sum) as incr:
+            calls = 0
+            for _ in range(20):
+                with limiter.acquire(raise_on_failure=False) as acquired:
+                    if acquired:
+                        calls += 1
+
+    # Then I expect it to have succeeded up to its limit
+    assert calls == 10
+
+    # And the backend to have been hit far fewer times than the limiter was acquired
+    assert incr.call_count <= 8
+
+    # And no block reserves to have been retried once one failed
+    assert [call.args[2] for call in incr.call_args_list] == [4, 4, 4, 1, 1, 1]
+
+
+def test_window_rate_limiter_returns_unused_leased_permits(stub_rate_limiter_backend):
+    # Given that I have a window rate limiter that leases permits in blocks
+    limiter = WindowRateLimiter(stub_rate_limiter_backend, "lease-test", limit=10, window=5, lease=4)
+
+    # When I acquire it once
+    with patch("dramatiq.rate_limits.window.time.time", return_value=1000):
+        with limiter.acquire():
+            pass
+
+    # Then I expect a whole block of permits to have been reserved
+    assert stub_rate_limiter_backend._get("lease-test@1000") == 4
+
+    # When I acquire it again during the next second
+    with patch("dramatiq.rate_limits.window.time.time", return_value=1001):
+        with limiter.acquire():
+            pass
+
+    # Then I expect the permits left unused in the previous second to have been returned
+    assert stub_rate_limiter_backend._get("lease-test@1000") == 1
+    assert stub_rate_limiter_backend._get("lease-test@1001") == 4
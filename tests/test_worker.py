@@ -1,3 +1,13 @@
+import threading
+import time
+from unittest.mock import patch
+
+import dramatiq
+from dramatiq import Message, Middleware
+from dramatiq.rate_limits import ConcurrentRateLimiter
+from dramatiq.rate_limits.backends import StubBackend
+from dramatiq.worker import _AdaptivePrefetch, _HeldMessages, _WeightedWorkQueue, _WorkQueue
+
 from .common import worker
 
 
@@ -11,3 +21,243 @@ def test_workers_dont_register_queues_that_arent_whitelisted(stub_broker):
         # Then a consumer should not get spun up for that queue
         assert "c" not in stub_worker.consumers
         assert "c.DQ" not in stub_worker.consumers
+
+
+def test_work_queue_returns_messages_by_priority_then_in_fifo_order():
+    # Given that I have a work queue
+    work_queue = _WorkQueue()
+
+    # When I put messages with different priorities on it
+    for i, priority in enumerate([10, 0, 10, 5, 0, 10]):
+        work_queue.put((priority, i))
+
+    # Then I expect them to come out ordered by priority
+    # And messages with the same priority to come out in the order they were put in
+    items = [work_queue.get_nowait() for _ in range(work_queue.qsize())]
+    assert items == [(0, 1), (0, 4), (5, 3), (10, 0), (10, 2), (10, 5)]
+    assert work_queue.empty()
+
+
+def test_weighted_work_queue_takes_turns_between_queues_by_weight(stub_broker):
+    # Given that I have a weighted work queue
+    work_queue = _WeightedWorkQueue({"critical": 2})
+
+    # When I put a flood of messages on one queue followed by messages on other queues
+    for i in range(4):
+        work_queue.put((0, Message(queue_name="bulk", actor_name="a", args=(i,), kwargs={}, options={})))
+    for i in range(3):
+        work_queue.put((0, Message(queue_name="critical", actor_name="a", args=(i,), kwargs={}, options={})))
+    work_queue.put((0, Message(queue_name="default.DQ", actor_name="a", args=(0,), kwargs={}, options={})))
+
+    # Then I expect each queue to take turns according to its weight
+    items = [work_queue.get_nowait()[1] for _ in range(work_queue.qsize())]
+    assert [(m.queue_name, m.args[0]) for m in items] == [
+        ("bulk", 0),
+        ("critical", 0), ("critical", 1),
+        ("default.DQ", 0),
+        ("bulk", 1),
+        ("critical", 2),
+        ("bulk", 2), ("bulk", 3),
+    ]
+    assert work_queue.empty()
+
+
+def test_workers_can_process_messages_using_queue_weights(stub_broker):
+    # Given that I have actors on two different queues
+    calls = []
+
+    @dramatiq.actor(queue_name="bulk")
+    def bulk():
+        calls.append("bulk")
+
+    @dramatiq.actor(queue_name="critical")
+    def critical():
+        calls.append("critical")
+
+    # When I start a worker with queue weights
+    with worker(stub_broker, worker_threads=1, queue_weights={"critical": 5}) as stub_worker:
+        # And send both actors some messages
+        for _ in range(5):
+            bulk.send()
+            critical.send()
+
+        stub_broker.join(bulk.queue_name)
+        stub_broker.join(critical.queue_name)
+        stub_worker.join()
+
+    # Then I expect all of them to have been processed
+    assert sorted(calls) == ["bulk"] * 5 + ["critical"] * 5
+
+
+def test_adaptive_prefetch_only_covers_worker_threads_for_slow_actors():
+    # Given that I have an adaptive prefetch for 8 worker threads
+    adaptive_prefetch = _AdaptivePrefetch(worker_threads=8, max_prefetch=256)
+
+    # When messages take much longer to process than they do to fetch
+    adaptive_prefetch.record_fetch_time(0.0001)
+    adaptive_prefetch.record_processing_time(1)
+
+    # Then I expect the prefetch to be just above the number of worker threads
+    assert adaptive_prefetch.compute(16) == 9
+
+
+def test_adaptive_prefetch_grows_for_fast_actors_up_to_its_max():
+    # Given that I have an adaptive prefetch for 8 worker threads
+    adaptive_prefetch = _AdaptivePrefetch(worker_threads=8, max_prefetch=64)
+
+    # When messages take about as long to process as a batch takes to fetch
+    adaptive_prefetch.record_fetch_time(0.016)
+    adaptive_prefetch.record_processing_time(0.016)
+
+    # Then I expect the prefetch to cover the worker threads for another fetch
+    assert adaptive_prefetch.compute(16) == 16
+
+    # When messages take a lot less time to process
+    adaptive_prefetch = _AdaptivePrefetch(worker_threads=8, max_prefetch=64)
+    adaptive_prefetch.record_fetch_time(0.001)
+    adaptive_prefetch.record_processing_time(0.0001)
+
+    # Then I expect the prefetch to be capped
+    assert adaptive_prefetch.compute(16) == 64
+
+
+def test_consumers_dont_count_idle_waits_as_fetch_time(stub_broker):
+    # Given that I have an actor
+    @dramatiq.actor
+    def do_work():
+        pass
+
+    # And a consumer for its queue
+    consumer = stub_broker.consume(do_work.queue_name, timeout=1000)
+
+    # When a message is enqueued while that consumer is waiting on the empty queue
+    timer = threading.Timer(0.2, do_work.send)
+    timer.start()
+    assert next(consumer) is not None
+    timer.join()
+
+    # Then that wait shouldn't count as a fetch
+    assert consumer.fetch_time is None
+
+    # When a message is already enqueued by the time that consumer fetches it
+    do_work.send()
+    assert next(consumer) is not None
+
+    # Then the fetch should count
+    assert consumer.fetch_time is not None
+    assert consumer.fetch_time < 0.1
+
+
+def test_workers_can_adapt_their_prefetch(stub_broker):
+    # Given that I have a middleware that records prefetch adjustments
+    prefetches = []
+
+    class PrefetchRecorder(Middleware):
+        def after_adjust_prefetch(self, broker, queue_name, prefetch):
+            prefetches.append((queue_name, prefetch))
+
+    stub_broker.add_middleware(PrefetchRecorder())
+
+    # And an actor that takes a while to process messages
+    @dramatiq.actor
+    def do_work():
+        time.sleep(0.01)
+
+    # When I send that actor some messages
+    for _ in range(10):
+        do_work.send()
+
+    # And start a worker with adaptive prefetch
+    with patch("dramatiq.worker.ADAPTIVE_PREFETCH_INTERVAL_SECS", 0):
+        with worker(stub_broker, worker_threads=2, worker_timeout=50, adaptive_prefetch=True) as stub_worker:
+            stub_broker.join(do_work.queue_name)
+            stub_worker.join()
+
+            # And give its consumer time to adjust its prefetch
+            time.sleep(0.2)
+
+            # Then I expect the consumer's prefetch to have been adjusted
+            consumer_thread = stub_worker.consumers[do_work.queue_name]
+            assert prefetches and prefetches[-1] == (do_work.queue_name, consumer_thread.prefetch)
+            assert consumer_thread.consumer.prefetch == consumer_thread.prefetch
+
+
+def test_workers_can_defer_rate_limited_messages(stub_broker):
+    # Given that I have a distributed mutex
+    backend = StubBackend()
+    mutex = ConcurrentRateLimiter(backend, "defer-test", limit=1)
+    calls = []
+
+    # And an actor that holds that mutex for a short while
+    @dramatiq.actor
+    def do_work(i):
+        with mutex.acquire():
+            calls.append(i)
+            time.sleep(0.05)
+
+    # When I send that actor a few messages
+    for i in range(4):
+        do_work.send(i)
+
+    # And process them with a worker that defers rate limited messages
+    with patch("dramatiq.worker.RATE_LIMIT_DEFER_DELAY_SECS", 0.05), \
+         patch.object(stub_broker, "enqueue", wraps=stub_broker.enqueue) as enqueue:
+        with worker(stub_broker, worker_threads=4, worker_timeout=50, defer_rate_limited=True) as stub_worker:
+            stub_broker.join(do_work.queue_name, fail_fast=True)
+            stub_worker.join()
+
+    # Then I expect every message to have been processed
+    assert sorted(calls) == [0, 1, 2, 3]
+
+    # And none of them to have been retried via the broker
+    assert enqueue.call_count == 0
+
+
+def test_held_messages_are_released_one_at_a_time_after_successful_runs():
+    # Given that I have a few messages held under the same rate limit key
+    held_messages = _HeldMessages(delay=0, max_hold=60)
+    messages = [Message(queue_name="default", actor_name="do_work", args=(), kwargs={}, options={}) for _ in range(4)]
+    for message in messages:
+        assert held_messages.admit(message, "some-key")
+        held_messages.hold(message)
+
+    # When the first of them is dispatched as a probe and fails
+    dispatched = []
+    held_messages.dispatch_due(dispatched.append)
+    held_messages.release(messages[0], dispatched.append, succeeded=False)
+
+    # Then I expect no other messages to have been dispatched
+    assert dispatched == messages[:1]
+
+    # When the next probe runs successfully
+    held_messages.dispatch_due(dispatched.append)
+    held_messages.release(messages[1], dispatched.append, succeeded=True)
+
+    # Then I expect a single other message to have been dispatched
+    assert dispatched == messages[:3]
+    assert len(held_messages) == 1
+
+
+def test_workers_retry_messages_that_were_deferred_for_too_long(stub_broker):
+    # Given that I have a rate limiter that's always exhausted
+    backend = StubBackend()
+    mutex = ConcurrentRateLimiter(backend, "defer-max-test", limit=1)
+    backend.add(mutex.key, 1, mutex.ttl)
+
+    # And an actor that can't be retried and that acquires that rate limiter
+    @dramatiq.actor(max_retries=0)
+    def do_work():
+        with mutex.acquire():
+            pass
+
+    # When I send that actor a message
+    do_work.send()
+
+    # And process it with a worker that can't hold on to rate limited messages for long
+    with patch("dramatiq.worker.RATE_LIMIT_DEFER_MAX_SECS", 0):
+        with worker(stub_broker, worker_timeout=50, defer_rate_limited=True) as stub_worker:
+            stub_broker.join(do_work.queue_name)
+            stub_worker.join()
+
+    # Then I expect the message to have gone through the retries middleware
+    assert len(stub_broker.dead_letters) == 1